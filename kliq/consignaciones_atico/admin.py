@@ -1,3 +1,14 @@
 from django.contrib import admin
+from .models import LiquidacionJob, LiquidacionRun
 
-# Register your models here.
+@admin.register(LiquidacionJob)
+class LiquidacionJobAdmin(admin.ModelAdmin):
+    list_display    = ("id", "status", "done", "total", "created_at", "finished_at")
+    list_filter     = ("status",)
+    readonly_fields = ("created_at", "finished_at")
+
+@admin.register(LiquidacionRun)
+class LiquidacionRunAdmin(admin.ModelAdmin):
+    list_display    = ("id", "run_date", "source", "editorials", "line_count", "job", "finished_at")
+    list_filter     = ("source", "run_date")
+    readonly_fields = ("created_at", "finished_at", "master_digest")
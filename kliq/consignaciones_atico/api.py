@@ -0,0 +1,261 @@
+# WEB/kliq/consignaciones_atico/api.py
+"""
+API para generar liquidaciones sin pasar por el formulario de index
+(sin sesión ni formset), pensada para el cierre de mes desde un script.
+
+POST /consignaciones-atico/api/liquidaciones/  — multipart/form-data, HTTP Basic
+  - master:   uno o más maestros (.xlsx, .csv o .parquet)
+  - contacts: opcional, JSON {editorial: {"PROVEEDOR": ..., "FONO_MAIL" o
+              "FONO / MAIL": ..., ...}}; lo que no venga se completa con los
+              contactos guardados (contacts.load_contacts)
+  - mode:     "zip", "job" o "auto" (por defecto: job si los maestros pesan
+              más de CONSIGNACIONES_API_SYNC_MAX_BYTES)
+  - compression, level: opcionales, estrategia del ZIP (ver archive.py);
+              los jobs usan la de los settings
+
+Todo se valida antes de procesar nada. Responde el ZIP (con varios
+maestros, una carpeta por maestro) o 202 con un LiquidacionJob por maestro.
+Con varios maestros en modo zip, cada uno se procesa en su propio proceso
+(hasta CONSIGNACIONES_API_WORKERS a la vez): los procesos escriben las
+liquidaciones y sus tablas en una carpeta temporal y devuelven solo las
+rutas. El historial se guarda en el proceso de la petición, que es el único
+que usa la base, cargando las tablas de un maestro a la vez.
+"""
+import os
+import json
+import base64
+import pickle
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.db                     import connections
+from django.conf                   import settings
+from django.urls                   import reverse
+from django.http                   import JsonResponse, StreamingHttpResponse
+from django.contrib.auth           import authenticate
+from django.views.decorators.csrf  import csrf_exempt
+from django.views.decorators.http  import require_POST
+
+from . import jobs, uploads, history
+from .models       import LiquidacionRun
+from .forms        import MASTER_EXTENSIONS
+from .engine       import REQUIRED, consign_columns
+from .formats      import MasterFormatError
+from .archive      import stream_zip, resolve_strategy
+from .contacts     import load_contacts, contact_info
+from .master_cache import read_master_header
+from .streaming    import master_tables
+
+SYNC_MAX_BYTES = getattr(settings, 'CONSIGNACIONES_API_SYNC_MAX_BYTES', 20 * 1024 * 1024)
+API_WORKERS    = getattr(settings, 'CONSIGNACIONES_API_WORKERS', 4)
+
+
+def _basic_user(request):
+    """Usuario activo de la cabecera Authorization: Basic, o None."""
+    kind, _, value = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    if kind.lower() != 'basic':
+        return None
+    try:
+        username, _, password = base64.b64decode(value).decode('utf-8').partition(':')
+    except (ValueError, UnicodeDecodeError):
+        return None
+    user = authenticate(request, username=username, password=password)
+    return user if user is not None and user.is_active else None
+
+
+def _error(message, status=400, **extra):
+    return JsonResponse({'error': message, **extra}, status=status)
+
+
+def _parse_contacts(raw):
+    """JSON del campo contacts -> {editorial: contacto}; ValueError si no es válido."""
+    if not raw:
+        return {}
+    data = json.loads(raw)
+    if not isinstance(data, dict) or not all(isinstance(v, dict) for v in data.values()):
+        raise ValueError("contacts debe ser un objeto {editorial: {campo: valor}}")
+    return {str(ed).strip().upper(): contact_info(v) for ed, v in data.items()}
+
+
+def _validate_master(path):
+    """Motivo por el que el maestro no sirve, o None."""
+    try:
+        columns = read_master_header(path)
+    except MasterFormatError as e:
+        return str(e)
+    except Exception:
+        return "no se pudo leer el archivo"
+    missing = [c for c in REQUIRED if c not in columns]
+    if missing:
+        return "faltan columnas: " + ", ".join(missing)
+    if not consign_columns(columns):
+        return "no hay columnas de consignación"
+    return None
+
+
+def _folder_names(files):
+    """Una carpeta por maestro (nombre sin extensión, sin repetir)."""
+    seen, names = {}, []
+    for f in files:
+        stem = os.path.splitext(os.path.basename(f.name))[0] or 'maestro'
+        seen[stem] = seen.get(stem, 0) + 1
+        names.append(stem if seen[stem] == 1 else f"{stem}_{seen[stem]}")
+    return names
+
+
+def _dump_tables(tables, full):
+    """Las tablas (editorial, DataFrame) en `full`, un pickle tras otro."""
+    with open(full, 'wb') as f:
+        for table in tables:
+            pickle.dump(table, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _load_tables(full):
+    """Las tablas de _dump_tables, leídas de a una."""
+    with open(full, 'rb') as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+def process_master(path, contacts, folder, workers=None):
+    """
+    Liquidaciones de un maestro guardado, escritas en `folder`:
+    ([(nombre.xlsx, ruta)...], editoriales_sin_datos, ruta de las tablas).
+    Se ejecuta también en los procesos de la API: no toca la base, y recibe
+    y devuelve solo datos simples. Las tablas (para el historial) quedan en
+    `folder` junto a los .xlsx en vez de volver serializadas al proceso padre.
+    """
+    from .views import load_logo_bytes, render_liquidaciones
+
+    no_data = []
+    tables  = list(master_tables(path, no_data))
+    files   = []
+    for filename, content in render_liquidaciones(tables, load_logo_bytes(), contacts, workers):
+        full = os.path.join(folder, f"{len(files)}.xlsx")
+        with open(full, 'wb') as f:
+            f.write(content)
+        files.append((filename, full))
+    tables_path = os.path.join(folder, 'tablas.pkl')
+    _dump_tables(tables, tables_path)
+    return files, no_data, tables_path
+
+
+def _process_all(paths, contacts, folder):
+    """process_master para cada maestro (cada uno en su subcarpeta de `folder`); en paralelo si son varios."""
+    folders = [os.path.join(folder, str(i)) for i in range(len(paths))]
+    for f in folders:
+        os.mkdir(f)
+    if len(paths) == 1:
+        return [process_master(paths[0], contacts, folders[0])]
+    workers = max(1, min(API_WORKERS, len(paths)))
+    # los procesos hijos no deben heredar las conexiones abiertas de este
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+        futures = [pool.submit(process_master, p, contacts, f, 0) for p, f in zip(paths, folders)]
+        return [f.result() for f in futures]
+
+
+def _read(full):
+    with open(full, 'rb') as f:
+        return f.read()
+
+
+def _entries(results, paths, folders, contacts, tmp):
+    """
+    (nombre en el ZIP, bytes) de cada maestro, leídos de a uno desde `tmp`.
+    Las tablas de cada maestro se cargan recién al llegar a él y de a una,
+    y su corrida queda en el historial cuando sale su última liquidación;
+    al terminar (o cortarse la descarga) se borra `tmp`.
+    """
+    try:
+        for (produced, _, tables_path), path, folder in zip(results, paths, folders):
+            rec = history.Recording(LiquidacionRun.API, path, contacts)
+            for _ in rec.tables(_load_tables(tables_path)):
+                pass
+            yield from rec.files(
+                (f"{folder}/{filename}" if len(paths) > 1 else filename, _read(full))
+                for filename, full in produced
+            )
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+@csrf_exempt
+@require_POST
+def liquidaciones_api(request):
+    if _basic_user(request) is None:
+        resp = _error("Se requiere usuario y contraseña (HTTP Basic).", status=401)
+        resp['WWW-Authenticate'] = 'Basic realm="consignaciones"'
+        return resp
+
+    files = request.FILES.getlist('master')
+    mode  = request.POST.get('mode', 'auto')
+    if not files:
+        return _error("Falta el archivo maestro (campo master).")
+    if mode not in ('auto', 'zip', 'job'):
+        return _error("mode debe ser auto, zip o job.")
+    try:
+        payload = _parse_contacts(request.POST.get('contacts'))
+    except ValueError as e:
+        return _error(f"contacts inválido: {e}")
+    try:
+        compression = resolve_strategy(request.POST.get('compression'), request.POST.get('level'))
+    except ValueError as e:
+        return _error(str(e))
+
+    # validación única: extensión y encabezados de cada maestro
+    errors = {}
+    paths  = []
+    for f in files:
+        ext = os.path.splitext(f.name)[1].lower().lstrip('.')
+        if ext not in MASTER_EXTENSIONS:
+            errors[f.name] = "extensión no permitida"
+            continue
+        path  = uploads.save_upload(f)
+        error = _validate_master(path)
+        if error:
+            errors[f.name] = error
+        paths.append(path)
+    if errors:
+        return _error("Hay maestros que no se pueden procesar.", files=errors)
+    uploads.maybe_sweep()
+
+    contacts = {ed: contact_info(c) for ed, c in load_contacts().items()}
+    for ed, c in payload.items():
+        contacts[ed] = {**contacts.get(ed, {}), **c}
+
+    if mode == 'auto':
+        mode = 'job' if sum(f.size for f in files) > SYNC_MAX_BYTES else 'zip'
+
+    if mode == 'job':
+        created = [jobs.enqueue(path, contacts) for path in paths]
+        return JsonResponse({'jobs': [{
+            'id':           str(job.pk),
+            'master':       f.name,
+            'status_url':   request.build_absolute_uri(reverse('consignaciones_atico:job_status', args=[job.pk])),
+            'download_url': request.build_absolute_uri(reverse('consignaciones_atico:job_download', args=[job.pk])),
+        } for f, job in zip(files, created)]}, status=202)
+
+    tmp = tempfile.mkdtemp(prefix='liquidaciones_api_')
+    try:
+        results = _process_all(paths, contacts, tmp)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    folders = _folder_names(files)
+    no_data = {name: nd for name, (_, nd, _) in zip(folders, results) if nd}
+    count   = sum(len(produced) for produced, _, _ in results)
+    if not count:
+        shutil.rmtree(tmp, ignore_errors=True)
+        return _error("No se generaron liquidaciones.", status=422, no_data=no_data)
+
+    entries = _entries(results, paths, folders, contacts, tmp)
+    resp = StreamingHttpResponse(stream_zip(entries, *compression), content_type='application/zip')
+    resp['Content-Disposition'] = 'attachment; filename=Liquidaciones.zip'
+    resp['X-Liquidaciones'] = str(count)
+    return resp
@@ -0,0 +1,168 @@
+# WEB/kliq/consignaciones_atico/archive.py
+"""
+Escritura incremental de ZIP para StreamingHttpResponse.
+
+zipfile acepta destinos no "seekables": en ese caso escribe un data
+descriptor después de cada entrada, así que podemos ir entregando al
+navegador los bytes de cada liquidación apenas se comprimen, sin mantener
+el archivo completo en memoria.
+
+Estrategias (CONSIGNACIONES_ZIP_STRATEGY o el parámetro `compression` de la
+petición):
+  - "stored":   sin comprimir. Un .xlsx ya es un ZIP (y el logo un PNG), así
+                que deflate apenas lo achica; es la más rápida.
+  - "deflate":  zlib al nivel CONSIGNACIONES_ZIP_LEVEL (o "deflate-1" ...
+                "deflate-9").
+  - "parallel": deflate en CONSIGNACIONES_ZIP_THREADS hilos (zlib libera el
+                GIL), varias entradas a la vez; las entradas se escriben en
+                orden, ya comprimidas.
+"""
+import time
+import zlib
+import struct
+import zipfile
+from collections        import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from .metrics import timer
+
+STORED, DEFLATE, PARALLEL = 'stored', 'deflate', 'parallel'
+STRATEGIES = (STORED, DEFLATE, PARALLEL)
+
+ZIP_STRATEGY = getattr(settings, 'CONSIGNACIONES_ZIP_STRATEGY', STORED)
+ZIP_LEVEL    = getattr(settings, 'CONSIGNACIONES_ZIP_LEVEL', 6)
+ZIP_THREADS  = getattr(settings, 'CONSIGNACIONES_ZIP_THREADS', 4)
+
+# registros del formato ZIP (APPNOTE 4.3.7, 4.3.12 y 4.3.16)
+_LOCAL_HEADER  = struct.Struct('<4s5H3L2H')
+_CENTRAL_ENTRY = struct.Struct('<4s6H3L5H2L')
+_END_RECORD    = struct.Struct('<4s4H2LH')
+_UTF8_FLAG     = 0x800
+_VERSION       = 20
+_MADE_BY       = (3 << 8) | _VERSION   # unix, como zipfile
+_FILE_ATTR     = 0o600 << 16           # el mismo que usa ZipFile.writestr
+
+
+def resolve_strategy(name=None, level=None):
+    """
+    (estrategia, nivel) a partir de un nombre ("stored", "deflate",
+    "deflate-N", "parallel") o de los settings si no se indica.
+    ValueError si el nombre o el nivel no son válidos.
+    """
+    name = (name or ZIP_STRATEGY).strip().lower()
+    if name.startswith(DEFLATE + '-'):
+        name, level = DEFLATE, name[len(DEFLATE) + 1:]
+    if name not in STRATEGIES:
+        raise ValueError(f"compresión desconocida: {name} (use {', '.join(STRATEGIES)})")
+    level = ZIP_LEVEL if level in (None, '') else int(level)
+    if not 0 <= level <= 9:
+        raise ValueError("el nivel de compresión va de 0 a 9")
+    return name, level
+
+
+class _ChunkBuffer:
+    """Destino de solo escritura: acumula bytes hasta que los retiramos."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(entries, strategy=None, level=None):
+    """
+    Genera los bytes de un ZIP a partir de pares (nombre, contenido).
+    Consume `entries` de a uno: la memoria queda acotada por la entrada más
+    grande (con "parallel", por las que se están comprimiendo a la vez).
+    """
+    strategy, level = resolve_strategy(strategy, level)
+    if strategy == PARALLEL:
+        yield from _stream_parallel(entries, level)
+        return
+
+    compression = zipfile.ZIP_STORED if strategy == STORED else zipfile.ZIP_DEFLATED
+    buf = _ChunkBuffer()
+    with zipfile.ZipFile(buf, 'w', compression, compresslevel=level) as zp:
+        for name, content in entries:
+            with timer('zip', bytes=len(content), strategy=strategy):
+                zp.writestr(name, content)
+            chunk = buf.drain()
+            if chunk:
+                yield chunk
+    # directorio central
+    chunk = buf.drain()
+    if chunk:
+        yield chunk
+
+
+# — "parallel" —
+
+def _deflate(name, content, level):
+    """(nombre, contenido, crc, deflate crudo) de una entrada; corre en un hilo."""
+    with timer('zip', bytes=len(content), strategy=PARALLEL):
+        c    = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        data = c.compress(content) + c.flush()
+    return name, content, zlib.crc32(content), data
+
+
+def _dos_datetime(t):
+    return ((t.tm_year - 1980) << 9 | t.tm_mon << 5 | t.tm_mday,
+            t.tm_hour << 11 | t.tm_min << 5 | t.tm_sec // 2)
+
+
+def _stream_parallel(entries, level):
+    """
+    Comprime hasta ZIP_THREADS * 2 entradas por adelantado y escribe cada una
+    con su tamaño ya conocido (sin data descriptor). Sin ZIP64: más de 4 GB o
+    de 65535 entradas levanta zipfile.LargeZipFile.
+    """
+    date, time_ = _dos_datetime(time.localtime())
+    central     = []
+    offset      = 0
+    pending     = deque()
+    threads     = max(1, ZIP_THREADS)
+
+    def write(name, content, crc, data):
+        nonlocal offset
+        # entradas que no se achican van sin comprimir, como haría deflate con nivel 0
+        method = zipfile.ZIP_DEFLATED
+        if len(data) >= len(content):
+            method, data = zipfile.ZIP_STORED, content
+        raw    = name.encode('utf-8')
+        header = _LOCAL_HEADER.pack(
+            b'PK\x03\x04', _VERSION, _UTF8_FLAG, method, time_, date,
+            crc, len(data), len(content), len(raw), 0,
+        )
+        if offset + len(header) + len(raw) + len(data) > zipfile.ZIP64_LIMIT or len(central) >= 0xFFFF:
+            raise zipfile.LargeZipFile("el ZIP en paralelo no admite ZIP64")
+        central.append(_CENTRAL_ENTRY.pack(
+            b'PK\x01\x02', _MADE_BY, _VERSION, _UTF8_FLAG, method, time_, date,
+            crc, len(data), len(content), len(raw), 0, 0, 0, 0, _FILE_ATTR, offset,
+        ) + raw)
+        offset += len(header) + len(raw) + len(data)
+        return header + raw + data
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for name, content in entries:
+            pending.append(pool.submit(_deflate, name, content, level))
+            if len(pending) >= threads * 2:
+                yield write(*pending.popleft().result())
+        while pending:
+            yield write(*pending.popleft().result())
+
+    directory = b''.join(central)
+    yield directory + _END_RECORD.pack(
+        b'PK\x05\x06', 0, 0, len(central), len(central), len(directory), offset, 0,
+    )
@@ -0,0 +1,111 @@
+# WEB/kliq/consignaciones_atico/async_views.py
+"""
+Vistas async para servir la app bajo ASGI (uvicorn).
+
+Con ASGI, Django corre las vistas síncronas de a una en un único hilo
+(sync_to_async thread_sensitive): un pd.read_excel o una generación larga
+bloquea a todos los demás usuarios del worker. Estas vistas son las mismas
+de views.py, pero ejecutadas en un pool acotado de hilos propio
+(CONSIGNACIONES_ASYNC_WORKERS): el event loop queda libre y, como mucho, hay
+ese número de lecturas/renderizados en paralelo por worker. Lo que antes era
+un iterador síncrono (el ZIP, los archivos) se entrega como iterador async
+que pide cada bloque al mismo pool, así que la respuesta sigue saliendo por
+partes en vez de armarse completa en memoria. job_status es async nativa
+(ORM async): el polling no ocupa hilos.
+
+urls.py las usa si CONSIGNACIONES_ASYNC_VIEWS está activo (kliq/asgi.py lo
+activa); bajo WSGI siguen las vistas síncronas.
+"""
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync     import sync_to_async
+from django.conf      import settings
+from django.db        import close_old_connections
+from django.http      import JsonResponse, Http404
+
+from . import views, api
+from .models  import LiquidacionJob
+from .metrics import inc
+
+ASYNC_WORKERS = getattr(settings, 'CONSIGNACIONES_ASYNC_WORKERS', 4)
+
+_executor      = None
+_executor_lock = threading.Lock()
+_END           = object()
+
+
+def executor():
+    """Pool de hilos compartido por todas las vistas async del proceso."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(1, ASYNC_WORKERS),
+                thread_name_prefix='consignaciones',
+            )
+        return _executor
+
+
+def _call(fn, args, kwargs):
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        # como al terminar una petición: los hilos del pool no pasan por request_finished
+        close_old_connections()
+
+
+async def offload(fn, *args, **kwargs):
+    """fn(*args, **kwargs) en el pool acotado, sin bloquear el event loop."""
+    inc('async_offloaded')
+    return await sync_to_async(_call, thread_sensitive=False, executor=executor())(fn, args, kwargs)
+
+
+async def _aiter(iterator):
+    """Iterador async sobre uno síncrono: cada next() corre en el pool."""
+    try:
+        while True:
+            chunk = await offload(next, iterator, _END)
+            if chunk is _END:
+                break
+            yield chunk
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close:
+            await offload(close)
+
+
+def _async_response(response):
+    """Respuestas en streaming con iterador síncrono -> iterador async (ver _aiter)."""
+    if getattr(response, 'streaming', False) and not response.is_async:
+        response.streaming_content = _aiter(iter(response.streaming_content))
+    return response
+
+
+def offloaded(view):
+    """Versión async de una vista síncrona: la corre en el pool (ver offload)."""
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        return _async_response(await offload(view, request, *args, **kwargs))
+    return wrapper
+
+
+index              = offloaded(views.index)
+job_download       = offloaded(views.job_download)
+editoriales        = offloaded(views.editoriales)
+editorial_download = offloaded(views.editorial_download)
+liquidaciones_api  = offloaded(api.liquidaciones_api)
+history_totals     = offloaded(views.history_totals)
+history_runs       = offloaded(views.history_runs)
+history_download   = offloaded(views.history_download)
+master_diff        = offloaded(views.master_diff)
+
+
+async def job_status(request, pk):
+    """Como views.job_status, con el ORM async."""
+    try:
+        job = await LiquidacionJob.objects.aget(pk=pk)
+    except LiquidacionJob.DoesNotExist:
+        raise Http404("No existe ese job.")
+    return JsonResponse(views.job_payload(job))
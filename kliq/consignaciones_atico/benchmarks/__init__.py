@@ -0,0 +1,9 @@
+# WEB/kliq/consignaciones_atico/benchmarks/__init__.py
+"""
+Mediciones de rendimiento sobre maestros sintéticos (synthetic.py), una
+por módulo:
+  - pipeline: cada etapa de una generación (bench_consignaciones)
+  - load:     carga mixta WSGI vs ASGI (carga_consignaciones)
+  - sqlite:   workers concurrentes sobre SQLite (concurrencia_sqlite)
+Las comprobaciones de que las variantes dan el mismo resultado están en tests.py.
+"""
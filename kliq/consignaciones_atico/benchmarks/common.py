@@ -0,0 +1,85 @@
+# WEB/kliq/consignaciones_atico/benchmarks/common.py
+"""Piezas compartidas por las mediciones: tiempos, cachés y el formulario de index."""
+import time
+import shutil
+import tracemalloc
+
+from django.core.files.storage import default_storage
+
+
+class BenchmarkError(Exception):
+    """La aplicación respondió algo que no se puede medir (un error en vez de la página o el ZIP)."""
+
+
+def measure(fn, repeat=3, setup=None):
+    """
+    Mejor tiempo de `repeat` corridas de fn() y pico de memoria asignada
+    (tracemalloc) en una corrida extra. `setup` se llama antes de cada corrida.
+    """
+    best = None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'seconds': round(best, 4), 'peak_mb': round(peak / 2**20, 2)}
+
+
+def clear_caches():
+    """Borra las cachés en disco para medir el camino en frío."""
+    for folder in ('temp/cache', 'liquidaciones/cache'):
+        shutil.rmtree(default_storage.path(folder), ignore_errors=True)
+
+
+def upload_master(client, master_path):
+    """POST de la fase 1 (subida del maestro)."""
+    with open(master_path, 'rb') as f:
+        resp = client.post('/consignaciones-atico/', {'upload': '1', 'file': f})
+    if resp.status_code != 200:
+        raise BenchmarkError(f"index no aceptó la subida (HTTP {resp.status_code})")
+
+
+def generate_data(editorials):
+    """Datos del POST de generar (fase 3) para `editorials`."""
+    data = {
+        'form-TOTAL_FORMS':       len(editorials),
+        'form-INITIAL_FORMS':     len(editorials),
+        'generate_liquidaciones': '1',
+    }
+    for i, ed in enumerate(editorials):
+        data[f'form-{i}-editorial'] = ed
+        data[f'form-{i}-PROVEEDOR'] = f'Proveedor {ed}'
+    return data
+
+
+def generate_post(client, master_path, editorials):
+    """Sube el maestro por el formulario y devuelve la función que hace el POST de generar."""
+    upload_master(client, master_path)
+    data = generate_data(editorials)
+
+    def post():
+        resp = client.post('/consignaciones-atico/', data)
+        body = b''.join(resp.streaming_content) if resp.streaming else resp.content
+        if resp.status_code != 200 or not body.startswith(b'PK'):
+            raise BenchmarkError(f"index no devolvió un ZIP (HTTP {resp.status_code})")
+    return post
+
+
+def percentiles(samples):
+    """p50, p95 y máximo (segundos) de una lista de latencias."""
+    if not samples:
+        return {}
+    s = sorted(samples)
+    pick = lambda q: s[min(len(s) - 1, int(q * len(s)))]
+    return {'p50': round(pick(0.5), 4), 'p95': round(pick(0.95), 4), 'max': round(s[-1], 4)}
@@ -0,0 +1,171 @@
+# WEB/kliq/consignaciones_atico/benchmarks/load.py
+"""Carga mixta sobre un worker, WSGI vs ASGI (manage.py carga_consignaciones)."""
+import os
+import time
+import shutil
+import asyncio
+import tempfile
+import contextvars
+from unittest import mock
+
+from django.db                 import connections
+from django.conf               import settings
+from django.test               import Client, override_settings
+from django.utils.http         import urlencode
+from django.core.handlers.asgi import ASGIHandler
+from django.test.runner        import DiscoverRunner
+from django.test.utils         import setup_test_environment, teardown_test_environment
+
+from .. import views
+from ..models       import LiquidacionJob
+from ..synthetic    import write_synthetic_master
+from ..master_cache import read_master
+from .common        import BenchmarkError, clear_caches, upload_master, generate_data, percentiles
+
+
+def run_load_test(generations=4, polls=40, rows=5_000, editorials=10, log=None):
+    """
+    Carga mixta sobre un worker: `generations` POST de generar en modo
+    streaming (cada uno con su propio maestro, en frío) y `polls` GET de
+    job_status, todos llegando a la vez e intercalados.
+
+    El modo sale de settings.CONSIGNACIONES_ASYNC_VIEWS (las URLs se eligen al
+    importar, por eso manage.py carga_consignaciones corre cada modo en su
+    propio proceso):
+      - "wsgi": vistas síncronas atendidas de a una, como un worker sync de
+        gunicorn;
+      - "asgi": vistas de async_views, todas concurrentes, directo contra
+        ASGIHandler (como las recibe de uvicorn).
+    Devuelve {'mode', 'seconds', 'requests_per_second', 'generate': latencias,
+    'poll': latencias}; la latencia se mide desde que llegan todas.
+    """
+    log  = log or (lambda msg: None)
+    mode = 'asgi' if getattr(settings, 'CONSIGNACIONES_ASYNC_VIEWS', False) else 'wsgi'
+
+    workdir = tempfile.mkdtemp(prefix='carga_consignaciones_')
+    # base de prueba en un archivo, no en memoria: las generaciones
+    # concurrentes de ASGI escriben el historial a la vez, y la base en
+    # memoria compartida falla con "table is locked" en vez de esperar
+    connections['default'].settings_dict['TEST']['NAME'] = os.path.join(workdir, 'carga.sqlite3')
+    setup_test_environment()
+    runner     = DiscoverRunner(verbosity=0)
+    old_config = runner.setup_databases()
+    try:
+        with override_settings(MEDIA_ROOT=workdir), mock.patch.object(views, 'BACKGROUND_JOBS', False):
+            log(f"{mode}: {generations} maestros sintéticos de {rows} filas...")
+            clients, eds = [], None
+            for i in range(generations):
+                master = os.path.join(workdir, f'maestro_{i}.xlsx')
+                write_synthetic_master(master, rows, editorials, seed=i)
+                client = Client()
+                upload_master(client, master)
+                clients.append(client)
+                if eds is None:
+                    eds = views.extract_editoriales(read_master(master).columns)
+            data = generate_data(eds)
+            job  = LiquidacionJob.objects.create(master_path='temp/carga.xlsx')
+            poll = f'/consignaciones-atico/jobs/{job.pk}/'
+            clear_caches()
+
+            # llegada intercalada: una generación y luego polls // generations consultas
+            plan = []
+            for i in range(max(generations, polls)):
+                if i < generations:
+                    plan.append(('generate', clients[i]))
+                if i < polls:
+                    plan.append(('poll', clients[i % generations]))
+
+            log(f"{mode}: {len(plan)} peticiones...")
+            if mode == 'asgi':
+                # contexto vacío, como el de un servidor recién iniciado: el
+                # Client de arriba dejó estado de asgiref en las contextvars
+                # de este hilo, y asyncio.run lo copiaría a cada petición
+                done = contextvars.Context().run(asyncio.run, _load_asgi(plan, data, poll))
+            else:
+                done = _load_wsgi(plan, data, poll)
+    finally:
+        runner.teardown_databases(old_config)
+        teardown_test_environment()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    total = max(t for _, t in done)
+    return {
+        'mode':                mode,
+        'generations':         generations,
+        'polls':               polls,
+        'seconds':             round(total, 3),
+        'requests_per_second': round(len(done) / total, 2),
+        'generate':            percentiles([t for kind, t in done if kind == 'generate']),
+        'poll':                percentiles([t for kind, t in done if kind == 'poll']),
+    }
+
+
+def _check_load_response(kind, status, body):
+    if status != 200 or (kind == 'generate' and not body.startswith(b'PK')):
+        raise BenchmarkError(f"carga: {kind} respondió HTTP {status}")
+
+
+def _load_wsgi(plan, data, poll):
+    """Una petición a la vez, en orden de llegada: [(tipo, segundos hasta terminar)]."""
+    done = []
+    t0   = time.perf_counter()
+    for kind, client in plan:
+        resp = client.post('/consignaciones-atico/', data) if kind == 'generate' else client.get(poll)
+        body = b''.join(resp.streaming_content) if resp.streaming else resp.content
+        _check_load_response(kind, resp.status_code, body)
+        done.append((kind, time.perf_counter() - t0))
+    return done
+
+
+async def _asgi_request(app, method, path, cookies, body=b''):
+    """
+    Una petición HTTP directo a la aplicación ASGI (lo mismo que hace uvicorn
+    con cada conexión): (status, cuerpo).
+    """
+    headers = [
+        (b'host', b'testserver'),
+        (b'cookie', '; '.join(f'{k}={m.value}' for k, m in cookies.items()).encode()),
+    ]
+    if body:
+        headers += [(b'content-type', b'application/x-www-form-urlencoded'),
+                    (b'content-length', str(len(body)).encode())]
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': method, 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+        'query_string': b'', 'root_path': '', 'headers': headers,
+        'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+    }
+    pending = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    status, chunks = [None], []
+
+    async def receive():
+        if pending:
+            return pending.pop()
+        await asyncio.Event().wait()  # el cliente nunca se desconecta
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status[0] = message['status']
+        elif message['type'] == 'http.response.body':
+            chunks.append(message.get('body', b''))
+
+    await app(scope, receive, send)
+    return status[0], b''.join(chunks)
+
+
+async def _load_asgi(plan, data, poll):
+    """Todas las peticiones a la vez contra ASGIHandler: [(tipo, segundos hasta terminar)]."""
+    app = ASGIHandler()
+    t0  = time.perf_counter()
+
+    async def one(kind, client):
+        if kind == 'generate':
+            # sin el test client, el POST pasa por CsrfViewMiddleware
+            body = urlencode({**data, 'csrfmiddlewaretoken': client.cookies['csrftoken'].value}).encode()
+            status, content = await _asgi_request(app, 'POST', '/consignaciones-atico/', client.cookies, body)
+        else:
+            status, content = await _asgi_request(app, 'GET', poll, client.cookies)
+        _check_load_response(kind, status, content)
+        return kind, time.perf_counter() - t0
+
+    return await asyncio.gather(*(one(kind, client) for kind, client in plan))
@@ -0,0 +1,176 @@
+# WEB/kliq/consignaciones_atico/benchmarks/pipeline.py
+"""
+Mediciones del pipeline de consignaciones sobre maestros sintéticos.
+
+run_benchmarks() escribe un maestro con synthetic.write_synthetic_master,
+mide cada etapa (mejor tiempo de `repeat` corridas + pico de memoria de una
+corrida extra con tracemalloc) y devuelve un dict serializable a JSON, para
+comparar versiones con `manage.py bench_consignaciones --json/--compare`.
+"""
+import os
+import time
+import shutil
+import platform
+import tempfile
+from unittest import mock
+
+import openpyxl
+import pandas as pd
+from django.test               import Client, override_settings
+from django.test.runner        import DiscoverRunner
+from django.test.utils         import setup_test_environment, teardown_test_environment
+from django.core.files.storage import default_storage
+
+from .. import views
+from ..engine       import split_master, split_master_loop
+from ..archive      import stream_zip
+from ..streaming    import split_master_stream
+from ..render       import create_export_excel_write_only
+from ..diff         import master_diff, diff_workbook
+from ..synthetic    import synthetic_master_df, write_synthetic_master, editorial_label
+from ..master_cache import read_master, read_master_header, get_master_df, HEADER_ROW
+from .common        import measure, clear_caches, upload_master, generate_post
+
+
+def _liquidacion_frame(lines):
+    """Una liquidación de aproximadamente `lines` filas."""
+    big = synthetic_master_df(lines, 1, seed=1)
+    big = big[big["BODEGA GENERAL BARI"] >= 0].assign(**{f"Consignacion {editorial_label(0)}": 10**6})
+    return next(split_master(big))
+
+
+def run_benchmarks(rows=30_000, editorials=20, lines=10_000, repeat=3, client=True, log=None):
+    """Corre todas las mediciones y devuelve {'meta': ..., 'results': {etapa: {seconds, peak_mb}}}."""
+    log     = log or (lambda msg: None)
+    results = {}
+    workdir = tempfile.mkdtemp(prefix='bench_consignaciones_')
+    try:
+        with override_settings(MEDIA_ROOT=workdir):
+            master = os.path.join(workdir, 'maestro.xlsx')
+            write_synthetic_master(master, rows, editorials)
+            with open(master, 'rb') as f:
+                stored = default_storage.save('temp/maestro.xlsx', f)
+            contacts = {}
+
+            def run(name, fn, **kw):
+                log(f"{name}...")
+                results[name] = measure(fn, repeat, **kw)
+
+            run('extract_editoriales', lambda: views.extract_editoriales(read_master_header(stored)))
+            # lectura completa de pandas, como antes de proyectar columnas
+            run('read_excel_full',     lambda: pd.read_excel(master, sheet_name=0, header=HEADER_ROW - 1))
+            run('read_master',         lambda: read_master(master))
+
+            # exportaciones del ERP: mismas liquidaciones que el .xlsx
+            for fmt in ('csv', 'parquet'):
+                path = os.path.join(workdir, f'maestro.{fmt}')
+                try:
+                    write_synthetic_master(path, rows, editorials, fmt=fmt)
+                except ImportError:
+                    log(f"read_master_{fmt}: falta pyarrow, se omite")
+                    continue
+                run(f'read_master_{fmt}', lambda path=path: read_master(path))
+
+            # motor sin DataFrame: lectura + separación en una sola pasada
+            run('read_and_split_master', lambda: list(split_master(read_master(master))))
+            run('split_master_stream',   lambda: list(split_master_stream(master)))
+
+            df = get_master_df(stored)
+            run('split_master_loop',   lambda: list(split_master_loop(df)))
+            run('split_master',        lambda: list(split_master(df)))
+            run('process_master_file',
+                lambda: list(views.process_master_file(df, views.load_logo_bytes(), contacts)),
+                setup=clear_caches)
+            results.update(_bench_zip(
+                list(views.process_master_file(df, views.load_logo_bytes(), contacts)), repeat, log))
+
+            # diferencias contra otro maestro del mismo tamaño (otra semilla)
+            master_2 = os.path.join(workdir, 'maestro_2.xlsx')
+            write_synthetic_master(master_2, rows, editorials, seed=1)
+            with open(master_2, 'rb') as f:
+                other = get_master_df(default_storage.save('temp/maestro_2.xlsx', f))
+            run('master_diff',   lambda: master_diff(df, other))
+            run('diff_workbook', lambda: diff_workbook(*master_diff(df, other)))
+
+            name, export_df = _liquidacion_frame(lines)
+            contact = {'PROVEEDOR': 'Proveedor', 'CONTACTO': 'Contacto', 'FONO / MAIL': 'a@b.cl'}
+            run('create_export_excel',
+                lambda: views.create_export_excel(export_df, name, None, contact))
+            run('create_export_excel_write_only',
+                lambda: create_export_excel_write_only(export_df, name, None, contact))
+
+            if client:
+                eds = views.extract_editoriales(df.columns)
+                results.update(_bench_index(master, eds, repeat, log))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'meta': {
+            'rows':       rows,
+            'editorials': editorials,
+            'lines':      len(export_df),
+            'repeat':     repeat,
+            'timestamp':  time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python':     platform.python_version(),
+            'pandas':     pd.__version__,
+            'openpyxl':   openpyxl.__version__,
+            'backend':    views.RENDER_BACKEND,
+            'workers':    views.RENDER_WORKERS,
+        },
+        'results': results,
+    }
+
+
+ZIP_STRATEGIES = ('stored', 'deflate-1', 'deflate-6', 'deflate-9', 'parallel')
+
+
+def _bench_zip(files, repeat, log):
+    """
+    stream_zip con cada estrategia sobre las liquidaciones ya renderizadas
+    (zip_<estrategia>), con el tamaño del ZIP en 'bytes' y el de las
+    liquidaciones sin empaquetar en 'input_bytes'.
+    """
+    results = {}
+    raw     = sum(len(content) for _, content in files)
+    for strategy in ZIP_STRATEGIES:
+        name = f"zip_{strategy.replace('-', '')}"
+        log(f"{name}...")
+        results[name] = measure(lambda: b''.join(stream_zip(files, strategy)), repeat)
+        results[name].update(
+            bytes=sum(len(chunk) for chunk in stream_zip(files, strategy)),
+            input_bytes=raw,
+        )
+    return results
+
+
+def _bench_index(master, eds, repeat, log):
+    """
+    POST de subida y POST de generar de index (modo streaming) con el test
+    client, en frío. El pico de index_upload no debería crecer con el maestro.
+    """
+    setup_test_environment()
+    runner = DiscoverRunner(verbosity=0)
+    old_config = runner.setup_databases()
+    try:
+        client = Client()
+        log("index_upload...")
+        upload = measure(lambda: upload_master(client, master), repeat)
+        log("index_generate...")
+        post = generate_post(client, master, eds)
+        with mock.patch.object(views, 'BACKGROUND_JOBS', False):
+            generate = measure(post, repeat, setup=clear_caches)
+        return {'index_upload': upload, 'index_generate': generate}
+    finally:
+        runner.teardown_databases(old_config)
+        teardown_test_environment()
+
+
+def compare(current, previous):
+    """Filas (etapa, antes, ahora, razón) para las etapas presentes en ambos resultados."""
+    rows = []
+    for name, now in current['results'].items():
+        before = previous.get('results', {}).get(name)
+        if before and before['seconds']:
+            rows.append((name, before['seconds'], now['seconds'], now['seconds'] / before['seconds']))
+    return rows
@@ -0,0 +1,140 @@
+# WEB/kliq/consignaciones_atico/benchmarks/sqlite.py
+"""Varios workers sobre la misma base SQLite (manage.py concurrencia_sqlite)."""
+import os
+import sys
+import time
+
+from django.conf               import settings
+from django.db                 import connections
+from django.test               import RequestFactory, override_settings
+from django.core.signals       import got_request_exception
+from django.core.management    import call_command
+from django.core.handlers.wsgi import WSGIHandler
+
+from ..models    import LiquidacionJob
+from ..synthetic import write_synthetic_master
+from .common     import percentiles
+
+
+# "default": como venía el proyecto (journal por defecto, una conexión por
+# petición, sesiones solo en la base); "tuned": los settings actuales
+DB_PROFILES = ('default', 'tuned')
+DB_CYCLE    = ('upload', 'status', 'status', 'index')
+_CSRF       = 'benchmarkcsrfsecret0123456789abc'   # 32 caracteres, como un secreto de CSRF
+
+
+def _db_profile(profile):
+    """(settings_dict de la conexión, override_settings) de un perfil de DB_PROFILES."""
+    if profile == 'default':
+        return ({'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False, 'OPTIONS': {}},
+                {'SQLITE_PRAGMAS': {}, 'SQLITE_WAL': False,
+                 'SESSION_ENGINE': 'django.contrib.sessions.backends.db'})
+    if profile == 'tuned':
+        conf = settings.DATABASES['default']
+        return ({k: conf.get(k) for k in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS', 'OPTIONS')},
+                {'SQLITE_PRAGMAS': getattr(settings, 'SQLITE_PRAGMAS', {}),
+                 'SQLITE_WAL': True,  # como un worker de wsgi.py / asgi.py
+                 'SESSION_ENGINE': settings.SESSION_ENGINE})
+    raise ValueError(f"perfil desconocido: {profile} (use {', '.join(DB_PROFILES)})")
+
+
+def _use_database(path, **conf):
+    """Apunta la conexión default a `path` (antes de abrirla) con `conf`."""
+    conn = connections['default']
+    conn.close()
+    conn.settings_dict.update(NAME=path, **conf)
+
+
+def prepare_db_benchmark(workdir, rows=200, editorials=5):
+    """
+    Base SQLite migrada (en modo journal por defecto), un maestro chico y un
+    job para consultar, en `workdir`: {'db', 'master', 'job'}.
+    """
+    db     = os.path.join(workdir, 'base.sqlite3')
+    master = os.path.join(workdir, 'maestro.xlsx')
+    write_synthetic_master(master, rows, editorials)
+    _use_database(db)
+    with override_settings(SQLITE_PRAGMAS={}, SQLITE_WAL=False):
+        call_command('migrate', verbosity=0)
+        job = LiquidacionJob.objects.create(master_path='temp/concurrencia.xlsx')
+        connections['default'].close()
+    return {'db': db, 'master': master, 'job': str(job.pk)}
+
+
+def run_db_worker(db, master, job, profile, requests=200, ready=None):
+    """
+    Un worker de gunicorn (sync) contra la base `db`: `requests` peticiones
+    por WSGIHandler, en ciclos de DB_CYCLE (subir el maestro, dos consultas
+    de avance, volver al formulario). Llama a `ready()` ya cargado, justo
+    antes de empezar. Devuelve {'latencies', 'locked', 'errors', 'seconds'}.
+    """
+    conn_conf, overrides = _db_profile(profile)
+    workdir = os.path.dirname(db)
+    _use_database(db, **conn_conf)
+    overrides.update(
+        ALLOWED_HOSTS=['*'],
+        MEDIA_ROOT=os.path.join(workdir, 'media'),
+        CACHES={'default': {
+            'BACKEND':  'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.path.join(workdir, 'cache'),
+        }},
+    )
+    failures = []
+
+    def record(sender, request=None, **kwargs):
+        failures.append(repr(sys.exc_info()[1]))
+
+    got_request_exception.connect(record)
+    try:
+        with override_settings(**overrides):
+            handler = WSGIHandler()
+            factory = RequestFactory()
+            factory.cookies['csrftoken'] = _CSRF
+            paths = {'index': '/consignaciones-atico/', 'status': f'/consignaciones-atico/jobs/{job}/'}
+            if ready:
+                ready()
+            latencies, errors = [], 0
+            t0 = time.perf_counter()
+            for i in range(requests):
+                kind = DB_CYCLE[i % len(DB_CYCLE)]
+                if kind == 'upload':
+                    with open(master, 'rb') as f:
+                        request = factory.post(paths['index'], {
+                            'upload': '1', 'file': f, 'csrfmiddlewaretoken': _CSRF,
+                        })
+                else:
+                    request = factory.get(paths[kind])
+                start = time.perf_counter()
+                response = handler(request.environ, lambda status, headers: None)
+                b''.join(response)
+                response.close()   # request_finished: cierra (o no) la conexión según CONN_MAX_AGE
+                latencies.append(time.perf_counter() - start)
+                factory.cookies.update(response.cookies)
+                if response.status_code != 200:
+                    errors += 1
+            seconds = time.perf_counter() - t0
+    finally:
+        got_request_exception.disconnect(record)
+        connections['default'].close()
+    return {
+        'latencies': latencies,
+        'locked':    sum('database is locked' in f for f in failures),
+        'errors':    errors,
+        'seconds':   seconds,
+    }
+
+
+def summarize_db_workers(profile, results):
+    """Une los resultados de run_db_worker de todos los workers de un perfil."""
+    latencies = [t for r in results for t in r['latencies']]
+    seconds   = max(r['seconds'] for r in results)
+    return {
+        'profile':             profile,
+        'workers':             len(results),
+        'requests':            len(latencies),
+        'seconds':             round(seconds, 3),
+        'requests_per_second': round(len(latencies) / seconds, 1),
+        'locked':              sum(r['locked'] for r in results),
+        'errors':              sum(r['errors'] for r in results),
+        'latency':             percentiles(latencies),
+    }
@@ -0,0 +1,75 @@
+# WEB/kliq/consignaciones_atico/contacts.py
+"""
+Contactos por editorial (modelo EditorialContact) con caché versionada.
+
+load_contacts() entrega {editorial: {PROVEEDOR, CONTACTO, FONO_MAIL, ...}}
+con una sola consulta (in_bulk) y la guarda en el caché de Django bajo la
+versión vigente. La versión sale de la base (cuántos contactos hay y el
+último updated_at, en una consulta agregada), no del caché: cualquier
+escritura, venga de save_contacts() (un único bulk_create, upsert por
+editorial), del admin o de otro proceso, cambia la clave, y si el caché
+pierde una entrada solo se vuelve a leer la tabla.
+"""
+from django.core.cache import cache
+from django.db.models  import Count, Max
+
+from .models import EditorialContact
+
+CACHE_KEY     = 'consignaciones_atico:contactos'
+CACHE_TIMEOUT = 24 * 60 * 60  # las versiones viejas quedan sin uso; que venzan solas
+
+# campos de ContactInfoForm -> claves que espera create_export_excel
+CONTACT_KEYS = {
+    'PROVEEDOR': 'PROVEEDOR',
+    'CONTACTO':  'CONTACTO',
+    'FONO_MAIL': 'FONO / MAIL',
+    'DESCUENTO': 'DESCUENTO',
+    'PAGO':      'PAGO',
+    'FECHA':     'FECHA',
+}
+
+
+def contact_info(data):
+    """Contacto con claves de formulario o de liquidación -> claves de liquidación."""
+    info = {}
+    for key, value in (data or {}).items():
+        key = CONTACT_KEYS.get(key, key)
+        if key in CONTACT_KEYS.values():
+            info[key] = '' if value is None else str(value)
+    return info
+
+
+def _version():
+    """Versión de los contactos en la base: "<cantidad>:<último updated_at>"."""
+    agg  = EditorialContact.objects.aggregate(n=Count('pk'), last=Max('updated_at'))
+    last = agg['last'].timestamp() if agg['last'] else 0
+    return f"{agg['n']}:{last}"
+
+
+def load_contacts():
+    """Todos los contactos como dict de dicts, con los nombres de campo de ContactInfoForm."""
+    key  = f"{CACHE_KEY}:{_version()}"
+    data = cache.get(key)
+    if data is None:
+        rows = EditorialContact.objects.in_bulk(field_name='editorial')
+        data = {ed: obj.as_form_data() for ed, obj in rows.items()}
+        cache.set(key, data, timeout=CACHE_TIMEOUT)
+    return data
+
+
+def save_contacts(data):
+    """
+    Inserta o actualiza los contactos de `data` ({editorial: cleaned_data sin 'editorial'})
+    en una sola consulta; renueva updated_at, así cambia la versión del caché.
+    """
+    fields = list(EditorialContact.FORM_FIELDS)
+    objs = [
+        EditorialContact(editorial=ed, **{f: cd.get(form, '') or '' for f, form in EditorialContact.FORM_FIELDS.items()})
+        for ed, cd in data.items()
+    ]
+    EditorialContact.objects.bulk_create(
+        objs,
+        update_conflicts=True,
+        unique_fields=['editorial'],
+        update_fields=fields + ['updated_at'],
+    )
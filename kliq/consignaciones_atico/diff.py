@@ -0,0 +1,160 @@
+# WEB/kliq/consignaciones_atico/diff.py
+"""
+Diferencias entre dos maestros (p. ej. el del mes anterior y el actual).
+
+Usa las mismas columnas que split_master (Codigo, bodega y "Consignacion
+<EDITORIAL>"): de cada maestro arma, por ISBN normalizado, una matriz
+ISBN x editorial con la consignación y otra con las unidades a liquidar
+(consignación - bodega, solo donde split_master generaría una línea). Los
+dos maestros se alinean por ISBN (join por índice, sin recorrer filas) y
+quedan solo los pares (ISBN, editorial) en que cambió alguna de las dos.
+Las filas repetidas de un mismo ISBN se suman.
+
+master_diff() devuelve (resumen por editorial, cambios) y diff_workbook()
+los escribe en un único .xlsx con una hoja para cada uno.
+"""
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+from openpyxl       import Workbook
+from openpyxl.cell  import WriteOnlyCell
+
+from .engine  import (
+    REQUIRED, consign_columns, editorial_name, normalize_isbn, liquidation_mask, to_numpy,
+)
+from .formats import MasterFormatError
+from .metrics import timer
+from .render  import HEADER_FONT
+
+NEW, REMOVED, CHANGED = 'nuevo', 'retirado', 'cambió'
+
+CHANGE_COLS = [
+    "Editorial", "ISBN", "Producto", "Estado",
+    "Consignación anterior", "Consignación actual", "Diferencia consignación",
+    "Liquidar anterior", "Liquidar actual", "Diferencia liquidar",
+]
+SUMMARY_COLS = [
+    "Editorial", "ISBN con cambios", "Nuevos", "Retirados",
+    "Consignación anterior", "Consignación actual",
+    "Liquidar anterior", "Liquidar actual", "Diferencia liquidar",
+]
+
+
+def _positions(df, label):
+    """
+    (consignación, unidades a liquidar, Producto) del maestro `df` por ISBN:
+    dos DataFrame ISBN x editorial y una Series ISBN -> Producto.
+    """
+    consign_cols = consign_columns(df.columns)
+    if not consign_cols or not all(x in df.columns for x in REQUIRED):
+        raise MasterFormatError(f"El maestro {label} no tiene las columnas de consignación, Producto y Código.")
+
+    units, mask = liquidation_mask(df, consign_cols)
+    consigned   = np.nan_to_num(to_numpy(df[consign_cols]).astype('float64'))
+    to_settle   = np.where(mask, units, 0.0)
+    isbn  = normalize_isbn(df["Codigo"]).to_numpy()
+    names = [editorial_name(c) for c in consign_cols]
+
+    def by_isbn(values):
+        frame = pd.DataFrame(values, columns=names)
+        if len(set(names)) < len(names):
+            # varias columnas de la misma editorial: se suman
+            frame = frame.T.groupby(level=0, sort=False).sum().T
+        return frame.groupby(isbn, sort=False).sum()
+
+    producto = pd.Series(df["Producto"].astype(object).to_numpy()).groupby(isbn, sort=False).first()
+    return by_isbn(consigned), by_isbn(to_settle), producto
+
+
+def master_diff(old, new):
+    """
+    Cambios por editorial entre los maestros `old` y `new` (DataFrame como
+    los deja read_master). Devuelve (resumen, cambios): DataFrame con
+    SUMMARY_COLS y con CHANGE_COLS, en el orden de editoriales del maestro nuevo.
+    """
+    with timer('diff', rows=len(old) + len(new)) as m:
+        old_cons, old_units, old_prod = _positions(old, "anterior")
+        new_cons, new_units, new_prod = _positions(new, "actual")
+
+        editorials = list(dict.fromkeys([*new_cons.columns, *old_cons.columns]))
+        index      = new_cons.index.union(old_cons.index, sort=False)
+
+        def aligned(frame):
+            return frame.reindex(index=index, columns=editorials, fill_value=0.0).to_numpy()
+
+        cons_a, cons_b   = aligned(old_cons),  aligned(new_cons)
+        units_a, units_b = aligned(old_units), aligned(new_units)
+
+        # recorriendo la traspuesta, los pares salen agrupados por editorial
+        cols, rows = np.nonzero(((cons_a != cons_b) | (units_a != units_b)).T)
+
+        in_old   = index.isin(old_cons.index)
+        in_new   = index.isin(new_cons.index)
+        status   = np.where(~in_old, NEW, np.where(~in_new, REMOVED, CHANGED))
+        producto = new_prod.reindex(index).combine_first(old_prod.reindex(index)).to_numpy()
+
+        # dentro de cada editorial, por Producto (como las liquidaciones)
+        order = np.lexsort((producto[rows].astype(str), cols))
+        cols, rows = cols[order], rows[order]
+
+        changes = pd.DataFrame({
+            "Editorial":               np.array(editorials, dtype=object)[cols],
+            "ISBN":                    index.to_numpy()[rows],
+            "Producto":                producto[rows],
+            "Estado":                  status[rows],
+            "Consignación anterior":   cons_a[rows, cols],
+            "Consignación actual":     cons_b[rows, cols],
+            "Diferencia consignación": cons_b[rows, cols] - cons_a[rows, cols],
+            "Liquidar anterior":       units_a[rows, cols],
+            "Liquidar actual":         units_b[rows, cols],
+            "Diferencia liquidar":     units_b[rows, cols] - units_a[rows, cols],
+        }, columns=CHANGE_COLS)
+
+        changed = np.bincount(cols, minlength=len(editorials))
+        summary = pd.DataFrame({
+            "Editorial":             editorials,
+            "ISBN con cambios":      changed,
+            "Nuevos":                np.bincount(cols, weights=status[rows] == NEW, minlength=len(editorials)).astype(int),
+            "Retirados":             np.bincount(cols, weights=status[rows] == REMOVED, minlength=len(editorials)).astype(int),
+            "Consignación anterior": cons_a.sum(axis=0),
+            "Consignación actual":   cons_b.sum(axis=0),
+            "Liquidar anterior":     units_a.sum(axis=0),
+            "Liquidar actual":       units_b.sum(axis=0),
+            "Diferencia liquidar":   units_b.sum(axis=0) - units_a.sum(axis=0),
+        }, columns=SUMMARY_COLS)
+        m['changes'] = len(changes)
+    return summary, changes
+
+
+def _number(value):
+    """Enteros como int (se ven sin ",0" en Excel); el resto tal cual."""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _write_sheet(wb, title, df, widths):
+    ws = wb.create_sheet(title)
+    ws.freeze_panes = 'A2'
+    for letter, width in widths.items():
+        ws.column_dimensions[letter].width = width
+    header = []
+    for name in df.columns:
+        cell = WriteOnlyCell(ws, value=name)
+        cell.font = HEADER_FONT
+        header.append(cell)
+    ws.append(header)
+    for row in df.itertuples(index=False, name=None):
+        ws.append([_number(v) for v in row])
+
+
+def diff_workbook(summary, changes):
+    """Bytes de un .xlsx con las hojas "Resumen" y "Cambios" de master_diff."""
+    with timer('diff_workbook', rows=len(changes)):
+        wb = Workbook(write_only=True)
+        _write_sheet(wb, "Resumen", summary, {'A': 30, **{c: 16 for c in 'BCDEFGHI'}})
+        _write_sheet(wb, "Cambios", changes, {'A': 30, 'B': 16, 'C': 45, 'D': 10, **{c: 14 for c in 'EFGHIJ'}})
+        buf = BytesIO()
+        wb.save(buf)
+    return buf.getvalue()
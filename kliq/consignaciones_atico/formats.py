@@ -0,0 +1,143 @@
+# WEB/kliq/consignaciones_atico/formats.py
+"""
+Maestros exportados por el ERP como CSV o Parquet.
+
+El formato se reconoce por el contenido (master_format), no por la
+extensión: un .xlsx es un ZIP, un Parquet empieza con "PAR1" y un CSV tiene
+que ser texto; cualquier otra cosa (un .xls antiguo, un PDF) se rechaza con
+MasterFormatError. Los lectores reciben las posiciones de las columnas a cargar
+(las que usa split_master); master_cache se encarga de nombrarlas igual que
+con el .xlsx (strip, "Código" -> "Codigo", duplicados "X.1").
+
+  - CSV: la fila de encabezados es la primera que, separada por alguno de
+    SEPARATORS, tiene una celda "Producto" (entre las primeras HEADER_SCAN; si
+    no aparece, la primera). La codificación (utf-8 o latin-1) se detecta
+    sobre el comienzo del archivo. Las columnas de identificadores (Código)
+    se leen como texto, para no perder los ceros a la izquierda; por eso se
+    usa el motor de C de pandas (el de pyarrow convierte los dtype después
+    de inferir números).
+  - Parquet: requiere pyarrow (está en requirements.txt) o fastparquet.
+"""
+import csv
+import importlib.util
+
+import pandas as pd
+
+XLSX, CSV, PARQUET = 'xlsx', 'csv', 'parquet'
+
+SNIFF_BYTES = 64 * 1024
+HEADER_SCAN = 20
+SEPARATORS  = (',', ';', '\t', '|')
+ID_COLUMNS  = ('Codigo', 'Código')
+
+# bytes de control que no aparecen en un CSV (sí \t, \n, \r y \f)
+_BINARY = bytes(set(range(32)) - {9, 10, 12, 13})
+
+
+class MasterFormatError(ValueError):
+    """El maestro no se puede leer (formato no reconocido o falta la dependencia)."""
+
+
+def _installed(module):
+    return importlib.util.find_spec(module) is not None
+
+
+def _head(source, size):
+    """Primeros `size` bytes de una ruta o file-like binario (sin mover su posición)."""
+    if hasattr(source, 'read'):
+        pos  = source.tell()
+        data = source.read(size)
+        source.seek(pos)
+        return data
+    with open(source, 'rb') as f:
+        return f.read(size)
+
+
+def master_format(source):
+    """XLSX, PARQUET o CSV según la firma del archivo; MasterFormatError si no es ninguno."""
+    head = _head(source, SNIFF_BYTES)
+    if head.startswith(b'PK\x03\x04'):
+        return XLSX
+    if head.startswith(b'PAR1'):
+        return PARQUET
+    if head.strip() and head.translate(None, _BINARY) == head:
+        return CSV
+    if head.startswith(b'\xd0\xcf\x11\xe0'):
+        raise MasterFormatError("El maestro está en formato .xls antiguo: guárdalo como .xlsx.")
+    raise MasterFormatError("Formato de maestro no reconocido: se aceptan .xlsx, .csv o .parquet.")
+
+
+# — CSV —
+
+def _cells(line, sep):
+    return next(csv.reader([line], delimiter=sep), [])
+
+
+def _sniff_csv(source):
+    """(codificación, separador, líneas antes de los encabezados, celdas de esa fila)."""
+    raw = _head(source, SNIFF_BYTES)
+    try:
+        text, encoding = raw.decode('utf-8-sig'), 'utf-8'
+    except UnicodeDecodeError as e:
+        if e.start >= len(raw) - 3:  # un carácter cortado al final de la muestra
+            text, encoding = raw[:e.start].decode('utf-8-sig'), 'utf-8'
+        else:
+            text, encoding = raw.decode('latin-1'), 'latin-1'
+
+    lines = text.splitlines()[:HEADER_SCAN]
+    for i, line in enumerate(lines):
+        for sep in SEPARATORS:
+            cells = _cells(line, sep)
+            if 'Producto' in (c.strip() for c in cells):
+                return encoding, sep, i, cells
+
+    # sin "Producto": primera línea, con el separador que más celdas produce
+    first = lines[0] if lines else ''
+    sep   = max(SEPARATORS, key=lambda s: len(_cells(first, s)))
+    return encoding, sep, 0, _cells(first, sep)
+
+
+def csv_header(source):
+    """Celdas de la fila de encabezados del CSV, tal como están."""
+    return _sniff_csv(source)[3]
+
+
+def read_csv_master(source, usecols):
+    """
+    Solo las columnas en las posiciones `usecols`, en el orden del archivo;
+    las de ID_COLUMNS como texto ("00123" sigue siendo "00123").
+    """
+    # skiprows cuenta líneas del archivo; header=n saltaría las vacías
+    encoding, sep, skip, header = _sniff_csv(source)
+    dtype = {header[i]: str for i in usecols if i < len(header) and header[i].strip() in ID_COLUMNS}
+    return pd.read_csv(source, sep=sep, encoding=encoding, skiprows=skip,
+                       usecols=usecols, dtype=dtype, engine='c', memory_map=isinstance(source, str))
+
+
+# — Parquet —
+
+def _parquet_engine():
+    for engine in ('pyarrow', 'fastparquet'):
+        if _installed(engine):
+            return engine
+    raise MasterFormatError("Para leer maestros Parquet hay que instalar pyarrow.")
+
+
+def parquet_header(source):
+    """Nombres de columna del esquema, sin leer los datos."""
+    try:
+        if _parquet_engine() == 'pyarrow':
+            import pyarrow.parquet as pq
+            names = pq.read_schema(source).names
+        else:
+            import fastparquet
+            names = fastparquet.ParquetFile(source).columns
+    except (OSError, ValueError) as e:  # ArrowInvalid es un ValueError
+        raise MasterFormatError(f"El archivo Parquet está dañado o incompleto ({str(e).strip()}).") from e
+    # el índice que guarda DataFrame.to_parquet no es una columna del maestro
+    return [n for n in names if not n.startswith('__index_level_')]
+
+
+def read_parquet_master(source, columns):
+    """Solo las columnas `columns` (nombres tal como están en el archivo)."""
+    return pd.read_parquet(source, columns=columns, engine=_parquet_engine())
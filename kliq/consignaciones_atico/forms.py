@@ -1,8 +1,26 @@
 from django import forms
+from django.core.validators import FileExtensionValidator
+
+# .xlsx del ERP o su exportación en CSV/Parquet (ver formats.py)
+MASTER_EXTENSIONS = ['xlsx', 'xlsm', 'csv', 'parquet', 'pq']
 
 class UploadFileForm(forms.Form):
     file = forms.FileField(
-        label="Sube el archivo Excel maestro (.xlsx):",
+        label="Sube el archivo maestro (.xlsx, .csv o .parquet):",
+        validators=[FileExtensionValidator(MASTER_EXTENSIONS)],
+        widget=forms.ClearableFileInput(attrs={'accept': ','.join('.' + e for e in MASTER_EXTENSIONS)}),
+    )
+
+class MasterDiffForm(forms.Form):
+    anterior = forms.FileField(
+        label="Maestro anterior:",
+        validators=[FileExtensionValidator(MASTER_EXTENSIONS)],
+        widget=forms.ClearableFileInput(attrs={'accept': ','.join('.' + e for e in MASTER_EXTENSIONS)}),
+    )
+    actual = forms.FileField(
+        label="Maestro actual:",
+        validators=[FileExtensionValidator(MASTER_EXTENSIONS)],
+        widget=forms.ClearableFileInput(attrs={'accept': ','.join('.' + e for e in MASTER_EXTENSIONS)}),
     )
 
 class ContactInfoForm(forms.Form):
@@ -0,0 +1,16 @@
+# WEB/kliq/consignaciones_atico/fsutil.py
+"""
+Utilidades de archivos compartidas por las limpiezas de temp/, de la caché
+de maestros, de la de liquidaciones renderizadas y de los ZIP de los jobs.
+"""
+import os
+
+
+def remove_file(full):
+    """Borra `full` y devuelve los bytes liberados (None si no se pudo)."""
+    try:
+        size = os.path.getsize(full)
+        os.remove(full)
+        return size
+    except OSError:
+        return None
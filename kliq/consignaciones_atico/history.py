@@ -0,0 +1,225 @@
+# WEB/kliq/consignaciones_atico/history.py
+"""
+Historial de liquidaciones (LiquidacionRun / LiquidacionLine).
+
+Cada generación (formulario, job o API) pasa por una Recording: sus pares
+(editorial, DataFrame) por Recording.tables(), que va guardando las líneas
+con bulk_create en lotes de CONSIGNACIONES_HISTORY_BATCH_SIZE (en memoria
+nunca hay más que un lote), y sus archivos por Recording.files(). Recién
+cuando salió el último archivo la corrida se da por terminada (finished_at);
+si la generación se corta antes, la corrida a medias se borra. Solo las
+corridas terminadas cuentan en totals() y en las vistas.
+
+Una corrida se identifica por el sha256 del maestro y el mes: volver a
+generar el mismo maestro (desde el formulario, un job o la API) reemplaza
+la corrida anterior en vez de sumarse a ella.
+
+Así las consultas por editorial y período se resuelven en la base (totals)
+y una liquidación vieja se vuelve a exportar desde sus líneas (run_tables),
+sin el maestro original.
+"""
+import itertools
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from django.conf          import settings
+from django.db            import transaction
+from django.db.models     import Sum, Count
+from django.db.models.functions import TruncDay, TruncWeek, TruncMonth, TruncYear
+from django.utils         import timezone
+
+from .engine       import EXPORT_COLS
+from .models       import LiquidacionRun, LiquidacionLine
+from .metrics      import timer, inc
+from .uploads      import stored_digest
+from .master_cache import file_digest
+
+HISTORY_ENABLED = getattr(settings, 'CONSIGNACIONES_HISTORY', True)
+BATCH_SIZE      = getattr(settings, 'CONSIGNACIONES_HISTORY_BATCH_SIZE', 2000)
+UNFINISHED_AGE  = getattr(settings, 'CONSIGNACIONES_HISTORY_UNFINISHED_AGE', 24 * 60 * 60)
+
+PERIODS = {
+    'day':   TruncDay,
+    'week':  TruncWeek,
+    'month': TruncMonth,
+    'year':  TruncYear,
+}
+
+
+def _text(value):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ''
+    return str(value)
+
+
+def master_digest(master_path):
+    """sha256 del maestro: del nombre si lo guardó uploads.save_upload, si no leyéndolo."""
+    if not master_path:
+        return ''
+    try:
+        return stored_digest(master_path) or file_digest(master_path)
+    except OSError:
+        return ''
+
+
+class Recording:
+    """
+    Corrida del historial que se guarda mientras se genera:
+
+        rec   = Recording(LiquidacionRun.WEB, master_path, contactos)
+        files = rec.files(render_liquidaciones(rec.tables(tablas), ...))
+
+    tables() guarda las líneas a medida que pasan; files() termina la
+    corrida (finish) después del último archivo, o la borra (discard) si el
+    consumidor se detiene antes o hay un error.
+    """
+
+    def __init__(self, source, master_path='', contacts=None, job=None):
+        self.source      = source
+        self.master_path = master_path or ''
+        self.contacts    = contacts or {}
+        self.job         = job
+        self.run         = None
+        self.pending     = []
+        self.editorials  = 0
+        self.line_count  = 0
+
+    def tables(self, tables):
+        """Deja pasar los pares (editorial, DataFrame de EXPORT_COLS), guardando sus líneas."""
+        if not HISTORY_ENABLED:
+            yield from tables
+            return
+        for name, df in tables:
+            self._add(name, df)
+            yield name, df
+
+    def files(self, files):
+        """Deja pasar los archivos; al agotarse, finish(); si se corta, discard()."""
+        finished = False
+        try:
+            yield from files
+            finished = True
+        finally:
+            if finished:
+                self.finish()
+            else:
+                self.discard()
+
+    def _add(self, name, df):
+        if self.run is None:
+            today    = timezone.localdate()
+            self.run = LiquidacionRun.objects.create(
+                source=self.source, job=self.job, master_path=self.master_path,
+                master_digest=master_digest(self.master_path), contacts=self.contacts,
+                run_date=today, month=today.replace(day=1),
+            )
+        run = self.run
+        for units, producto, isbn in df[EXPORT_COLS].itertuples(index=False, name=None):
+            self.pending.append(LiquidacionLine(
+                run=run, editorial=name, isbn=_text(isbn)[:32],
+                producto=_text(producto), units=float(units), run_date=run.run_date,
+            ))
+            if len(self.pending) >= BATCH_SIZE:
+                self._flush()
+        self.editorials += 1
+        self.line_count += len(df)
+
+    def _flush(self):
+        if self.pending:
+            LiquidacionLine.objects.bulk_create(self.pending, batch_size=BATCH_SIZE)
+            self.pending = []
+
+    def finish(self):
+        """
+        Da la corrida por terminada y reemplaza a la anterior del mismo maestro
+        y mes. Devuelve la LiquidacionRun (None si no pasó ninguna tabla).
+        """
+        run = self.run
+        if run is None:
+            return None
+        with timer('history', editorials=self.editorials, rows=self.line_count), transaction.atomic():
+            self._flush()
+            if run.master_digest:
+                LiquidacionRun.objects.filter(
+                    master_digest=run.master_digest, month=run.month, finished_at__isnull=False,
+                ).exclude(pk=run.pk).delete()
+            run.editorials  = self.editorials
+            run.line_count  = self.line_count
+            run.finished_at = timezone.now()
+            run.save(update_fields=['editorials', 'line_count', 'finished_at'])
+        inc('history_lines', self.line_count)
+        self.run = None
+        return run
+
+    def discard(self):
+        """Borra la corrida a medias (con las líneas ya guardadas)."""
+        self.pending = []
+        if self.run is not None:
+            self.run.delete()
+            self.run = None
+
+
+def record(tables, source, master_path='', contacts=None, job=None):
+    """
+    Guarda de una vez los pares (editorial, DataFrame) de `tables` como una
+    corrida terminada. Devuelve la LiquidacionRun (None si no hay tablas).
+    """
+    rec = Recording(source, master_path, contacts, job)
+    try:
+        for _ in rec.tables(tables):
+            pass
+    except BaseException:
+        rec.discard()
+        raise
+    return rec.finish()
+
+
+def purge_unfinished(max_age=UNFINISHED_AGE, now=None):
+    """Borra las corridas que quedaron a medias (su proceso murió) hace más de `max_age` segundos."""
+    cutoff = (now or timezone.now()) - timedelta(seconds=max_age)
+    stale  = LiquidacionRun.objects.filter(finished_at__isnull=True, created_at__lt=cutoff)
+    return stale.delete()[1].get(LiquidacionRun._meta.label, 0)
+
+
+def run_tables(run, editorial=None):
+    """
+    Pares (editorial, DataFrame) de una corrida guardada, en el orden en que
+    se generaron: lo mismo que entregó split_master, listo para render_liquidaciones.
+    """
+    lines = run.lines.order_by('id')
+    if editorial is not None:
+        lines = lines.filter(editorial=editorial)
+    rows = lines.values_list('editorial', 'units', 'producto', 'isbn').iterator(chunk_size=BATCH_SIZE)
+    for name, group in itertools.groupby(rows, key=lambda r: r[0]):
+        _, units, producto, isbn = zip(*group)
+        units = np.array(units, dtype='float64')
+        if np.all(units == np.floor(units)):
+            units = units.astype('int64')
+        yield name, pd.DataFrame({
+            "Unidades a liquidar": units,
+            "Producto":            np.array(producto, dtype=object),
+            "ISBN":                np.array(isbn, dtype=object),
+        }, columns=EXPORT_COLS)
+
+
+def totals(period='month', since=None, until=None, editorial=None):
+    """
+    Unidades, líneas y corridas por editorial y período (day, week, month,
+    year), agregadas en la base: [{editorial, period, units, lines, runs}].
+    """
+    trunc = PERIODS[period]
+    lines = LiquidacionLine.objects.filter(run__finished_at__isnull=False)
+    if since:
+        lines = lines.filter(run_date__gte=since)
+    if until:
+        lines = lines.filter(run_date__lte=until)
+    if editorial:
+        lines = lines.filter(editorial=editorial)
+    return list(
+        lines
+        .annotate(period=trunc('run_date'))
+        .values('editorial', 'period')
+        .annotate(units=Sum('units'), lines=Count('id'), runs=Count('run', distinct=True))
+        .order_by('editorial', 'period')
+    )
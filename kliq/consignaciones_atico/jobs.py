@@ -0,0 +1,179 @@
+# WEB/kliq/consignaciones_atico/jobs.py
+"""
+Cola local de generación de liquidaciones.
+
+Cada LiquidacionJob se ejecuta en un hilo del proceso web (ThreadPoolExecutor
+con settings.CONSIGNACIONES_JOB_WORKERS hilos) o, si el proceso que lo creó
+murió, con `manage.py procesar_liquidaciones`. No hay broker: la tabla de
+jobs en SQLite es la cola, y el paso PENDING -> RUNNING se hace con un
+UPDATE condicional para que un job no lo tomen dos ejecutores.
+
+El ejecutor renueva heartbeat_at al tomar el job y con cada editorial; un
+RUNNING sin señales hace más de CONSIGNACIONES_JOB_TIMEOUT segundos (su
+proceso murió) vuelve a PENDING en run_pending. `manage.py limpiar_temp`
+borra (purge) los jobs terminados hace más de CONSIGNACIONES_JOB_MAX_AGE
+y sus ZIP.
+"""
+import os
+import logging
+import threading
+from datetime           import timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf               import settings
+from django.db                 import connection, transaction
+from django.db.models          import F, Q
+from django.utils              import timezone
+from django.core.files.storage import default_storage
+
+from .models  import LiquidacionJob, LiquidacionRun
+from .archive import stream_zip
+from .fsutil  import remove_file
+from .        import history
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = getattr(settings, 'CONSIGNACIONES_JOB_WORKERS', 1)
+JOB_TIMEOUT = getattr(settings, 'CONSIGNACIONES_JOB_TIMEOUT', 30 * 60)
+JOB_MAX_AGE = getattr(settings, 'CONSIGNACIONES_JOB_MAX_AGE', 7 * 24 * 60 * 60)
+RESULTS_DIR = 'liquidaciones'
+
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='liquidaciones')
+
+
+def enqueue(master_path, contacts):
+    """Crea el job y lo entrega al hilo de trabajo cuando la transacción se confirma."""
+    job = LiquidacionJob.objects.create(master_path=master_path, contacts=contacts)
+    transaction.on_commit(lambda: _executor.submit(_run_in_thread, job.pk))
+    return job
+
+
+def _run_in_thread(job_id):
+    try:
+        run_job(job_id)
+    finally:
+        # cada hilo abre su propia conexión
+        connection.close()
+
+
+def claim(job_id):
+    """Marca el job como RUNNING si seguía PENDING; False si otro ejecutor lo tomó."""
+    return bool(
+        LiquidacionJob.objects
+        .filter(pk=job_id, status=LiquidacionJob.PENDING)
+        .update(status=LiquidacionJob.RUNNING, heartbeat_at=timezone.now())
+    )
+
+
+def requeue_stale(timeout=None, now=None):
+    """
+    Devuelve a PENDING (desde cero) los jobs RUNNING sin señales hace más de
+    `timeout` segundos: su ejecutor murió a la mitad. Devuelve cuántos.
+    """
+    timeout = JOB_TIMEOUT if timeout is None else timeout
+    cutoff  = (now or timezone.now()) - timedelta(seconds=timeout)
+    stale   = (
+        LiquidacionJob.objects
+        .filter(status=LiquidacionJob.RUNNING)
+        .filter(Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, created_at__lt=cutoff))
+    )
+    n = stale.update(status=LiquidacionJob.PENDING, done=0, heartbeat_at=None)
+    if n:
+        logger.warning("%d jobs de liquidaciones sin avance; vuelven a la cola", n)
+    return n
+
+
+def run_job(job_id):
+    """Genera el ZIP del job en default_storage, actualizando el avance por editorial."""
+    from .views     import load_logo_bytes, render_liquidaciones
+    from .streaming import master_tables
+
+    if not claim(job_id):
+        return
+    job  = LiquidacionJob.objects.get(pk=job_id)
+    jobs = LiquidacionJob.objects.filter(pk=job_id)
+    rec  = history.Recording(LiquidacionRun.JOB, job.master_path, job.contacts, job)
+    try:
+        no_data = []
+        tables  = list(rec.tables(master_tables(job.master_path, no_data)))
+        jobs.update(total=len(tables), no_data=no_data)
+        if not tables:
+            jobs.update(status=LiquidacionJob.FAILED, error="No se generaron liquidaciones.",
+                        finished_at=timezone.now())
+            return
+
+        def tracked(files):
+            for item in files:
+                yield item
+                jobs.update(done=F('done') + 1, heartbeat_at=timezone.now())
+
+        result = f"{RESULTS_DIR}/{job.pk}.zip"
+        full   = default_storage.path(result)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        stats = {}
+        # a un temporal y después os.replace: si el job se reencoló, el ZIP
+        # de un ejecutor nunca se mezcla con el de otro
+        tmp = f"{full}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, 'wb') as out:
+                files = rec.files(render_liquidaciones(tables, load_logo_bytes(), job.contacts, cache_stats=stats))
+                for chunk in stream_zip(tracked(files)):
+                    out.write(chunk)
+            os.replace(tmp, full)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        jobs.update(cache_hits=stats.get('hits', 0), cache_misses=stats.get('misses', 0))
+
+        jobs.update(status=LiquidacionJob.DONE, result_path=result, finished_at=timezone.now())
+    except Exception as e:
+        rec.discard()
+        logger.exception("Falló la generación de liquidaciones %s", job_id)
+        jobs.update(status=LiquidacionJob.FAILED, error=str(e), finished_at=timezone.now())
+
+
+def run_pending():
+    """
+    Ejecuta en este proceso los jobs pendientes, del más antiguo al más
+    nuevo, incluidos los RUNNING abandonados (requeue_stale).
+    """
+    requeue_stale()
+    ids = (
+        LiquidacionJob.objects
+        .filter(status=LiquidacionJob.PENDING)
+        .order_by('created_at')
+        .values_list('pk', flat=True)
+    )
+    for job_id in list(ids):
+        run_job(job_id)
+
+
+def purge(max_age=None, now=None):
+    """
+    Borra los jobs DONE o FAILED terminados hace más de `max_age` segundos,
+    con su ZIP, y los ZIP de RESULTS_DIR de esa antigüedad que ya no son de
+    ningún job. Devuelve (jobs_borrados, archivos_borrados, bytes_liberados).
+    """
+    max_age = JOB_MAX_AGE if max_age is None else max_age
+    now     = now or timezone.now()
+    cutoff  = now - timedelta(seconds=max_age)
+
+    old = LiquidacionJob.objects.filter(
+        status__in=[LiquidacionJob.DONE, LiquidacionJob.FAILED], finished_at__lt=cutoff,
+    )
+    paths = [p for p in old.values_list('result_path', flat=True) if p]
+    n_jobs = old.delete()[1].get(LiquidacionJob._meta.label, 0)
+
+    freed = [remove_file(default_storage.path(p)) for p in paths]
+    # ZIP huérfanos: de jobs borrados a mano o de ejecutores que murieron
+    folder = default_storage.path(RESULTS_DIR)
+    if os.path.isdir(folder):
+        known = set(LiquidacionJob.objects.exclude(result_path='').values_list('result_path', flat=True))
+        with os.scandir(folder) as it:
+            for entry in it:
+                if (entry.is_file() and entry.name.endswith(('.zip', '.tmp'))
+                        and f"{RESULTS_DIR}/{entry.name}" not in known
+                        and entry.stat().st_mtime < cutoff.timestamp()):
+                    freed.append(remove_file(entry.path))
+    freed = [n for n in freed if n is not None]
+    return n_jobs, len(freed), sum(freed)
@@ -0,0 +1,54 @@
+# WEB/kliq/consignaciones_atico/management/commands/bench_consignaciones.py
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from consignaciones_atico.benchmarks.common   import BenchmarkError
+from consignaciones_atico.benchmarks.pipeline import run_benchmarks, compare
+
+
+class Command(BaseCommand):
+    help = "Mide el pipeline de consignaciones sobre un maestro sintético."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows',       type=int, default=30_000)
+        parser.add_argument('--editorials', type=int, default=20)
+        parser.add_argument('--lines',      type=int, default=10_000,
+                            help="filas de la liquidación usada para medir el renderizado")
+        parser.add_argument('--repeat',     type=int, default=3)
+        parser.add_argument('--no-client',  action='store_true',
+                            help="omitir el POST de generar vía test client")
+        parser.add_argument('--json',       help="guardar los resultados en este archivo")
+        parser.add_argument('--compare',    help="JSON de una corrida anterior para comparar")
+
+    def handle(self, *args, **opts):
+        try:
+            report = run_benchmarks(
+                rows=opts['rows'], editorials=opts['editorials'], lines=opts['lines'],
+                repeat=opts['repeat'], client=not opts['no_client'],
+                log=lambda msg: self.stderr.write(msg),
+            )
+        except BenchmarkError as e:
+            raise CommandError(str(e))
+
+        meta = report['meta']
+        self.stdout.write(
+            f"maestro sintético: {meta['rows']} filas x {meta['editorials']} consignaciones, "
+            f"liquidación de {meta['lines']} líneas"
+        )
+        for name, r in report['results'].items():
+            line = f"{name:32} {r['seconds']:9.3f} s {r['peak_mb']:9.1f} MB"
+            if 'bytes' in r:
+                line += f"  {r['bytes'] / 2**20:8.2f} MB ({r['bytes'] / r['input_bytes']:.1%} del original)"
+            self.stdout.write(line)
+
+        if opts['json']:
+            with open(opts['json'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+
+        if opts['compare']:
+            with open(opts['compare'], encoding='utf-8') as f:
+                previous = json.load(f)
+            self.stdout.write("\ncomparación (ahora / antes):")
+            for name, before, now, ratio in compare(report, previous):
+                self.stdout.write(f"{name:32} {before:9.3f} s -> {now:9.3f} s  x{ratio:.2f}")
@@ -0,0 +1,61 @@
+# WEB/kliq/consignaciones_atico/management/commands/carga_consignaciones.py
+import os
+import sys
+import json
+import subprocess
+
+from django.core.management.base import BaseCommand, CommandError
+
+from consignaciones_atico.benchmarks.common import BenchmarkError
+from consignaciones_atico.benchmarks.load   import run_load_test
+
+
+class Command(BaseCommand):
+    help = ("Prueba de carga de un worker: generaciones largas y consultas de avance "
+            "a la vez, con las vistas síncronas (WSGI) y las async (ASGI).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--generaciones', type=int, default=4)
+        parser.add_argument('--consultas',    type=int, default=40)
+        parser.add_argument('--rows',         type=int, default=5_000)
+        parser.add_argument('--editorials',   type=int, default=10)
+        parser.add_argument('--modo', choices=['wsgi', 'asgi'],
+                            help="correr solo este modo en este proceso (uso interno)")
+        parser.add_argument('--json', help="guardar los resultados en este archivo")
+
+    def handle(self, *args, **opts):
+        params = dict(generations=opts['generaciones'], polls=opts['consultas'],
+                      rows=opts['rows'], editorials=opts['editorials'])
+        if opts['modo']:
+            try:
+                result = run_load_test(log=lambda msg: self.stderr.write(msg), **params)
+            except BenchmarkError as e:
+                raise CommandError(str(e))
+            if result['mode'] != opts['modo']:
+                raise CommandError(f"este proceso sirve las vistas {result['mode']}; "
+                                   f"use CONSIGNACIONES_ASYNC_VIEWS=1 para asgi")
+            self.stdout.write(json.dumps(result))
+            return
+
+        # cada modo en su proceso: las URLs se eligen al importar
+        results = []
+        for mode in ('wsgi', 'asgi'):
+            env = {**os.environ, 'CONSIGNACIONES_ASYNC_VIEWS': '1' if mode == 'asgi' else '0'}
+            cmd = [sys.executable, sys.argv[0], 'carga_consignaciones', '--modo', mode,
+                   '--generaciones', str(params['generations']), '--consultas', str(params['polls']),
+                   '--rows', str(params['rows']), '--editorials', str(params['editorials'])]
+            proc = subprocess.run(cmd, env=env, capture_output=True, text=True)
+            if proc.returncode:
+                raise CommandError(f"falló el modo {mode}:\n{proc.stderr}")
+            results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+        self.stdout.write(f"{'modo':6} {'total':>9} {'req/s':>7}   {'poll p50':>9} {'poll p95':>9}   {'gen p50':>9} {'gen max':>9}")
+        for r in results:
+            self.stdout.write(
+                f"{r['mode']:6} {r['seconds']:8.2f}s {r['requests_per_second']:7.1f}   "
+                f"{r['poll']['p50']:8.3f}s {r['poll']['p95']:8.3f}s   "
+                f"{r['generate']['p50']:8.3f}s {r['generate']['max']:8.3f}s"
+            )
+        if opts['json']:
+            with open(opts['json'], 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
@@ -0,0 +1,90 @@
+# WEB/kliq/consignaciones_atico/management/commands/concurrencia_sqlite.py
+import os
+import sys
+import json
+import shutil
+import tempfile
+import subprocess
+
+from django.core.management.base import BaseCommand, CommandError
+
+from consignaciones_atico.benchmarks.sqlite import (
+    DB_PROFILES, prepare_db_benchmark, run_db_worker, summarize_db_workers,
+)
+
+
+class Command(BaseCommand):
+    help = ("Varios workers (procesos) sobre la misma base SQLite: latencia y errores "
+            "\"database is locked\" con la configuración de antes y la actual.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers',    type=int, default=4)
+        parser.add_argument('--peticiones', type=int, default=200, help="por worker")
+        parser.add_argument('--json', help="guardar los resultados en este archivo")
+        # uso interno: cada worker es un proceso aparte
+        parser.add_argument('--perfil', choices=DB_PROFILES)
+        parser.add_argument('--db')
+        parser.add_argument('--master')
+        parser.add_argument('--job')
+
+    def handle(self, *args, **opts):
+        if opts['perfil']:
+            def ready():
+                # avisa que cargó y espera la largada, para que todos partan juntos
+                self.stdout.write('ready')
+                self.stdout.flush()
+                sys.stdin.readline()
+            result = run_db_worker(opts['db'], opts['master'], opts['job'], opts['perfil'],
+                                   opts['peticiones'], ready=ready)
+            self.stdout.write(json.dumps(result))
+            return
+
+        workdir = tempfile.mkdtemp(prefix='concurrencia_sqlite_')
+        try:
+            self.stderr.write("preparando la base...")
+            base    = prepare_db_benchmark(workdir)
+            results = []
+            for profile in DB_PROFILES:
+                db = os.path.join(workdir, f'{profile}.sqlite3')
+                shutil.copy(base['db'], db)
+                self.stderr.write(f"{profile}: {opts['workers']} workers x {opts['peticiones']} peticiones...")
+                results.append(summarize_db_workers(profile, self._run_workers(profile, db, base, opts)))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        self.stdout.write(f"{'perfil':8} {'req/s':>7} {'p50':>9} {'p95':>9} {'max':>9} {'locked':>7} {'errores':>8}")
+        for r in results:
+            lat = r['latency']
+            self.stdout.write(
+                f"{r['profile']:8} {r['requests_per_second']:7.1f} {lat['p50']:8.4f}s "
+                f"{lat['p95']:8.4f}s {lat['max']:8.4f}s {r['locked']:7} {r['errors']:8}"
+            )
+        if opts['json']:
+            with open(opts['json'], 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+
+    def _run_workers(self, profile, db, base, opts):
+        cmd = [sys.executable, sys.argv[0], 'concurrencia_sqlite', '--perfil', profile,
+               '--db', db, '--master', base['master'], '--job', base['job'],
+               '--peticiones', str(opts['peticiones'])]
+        procs = [subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                  stderr=subprocess.PIPE, text=True)
+                 for _ in range(opts['workers'])]
+        try:
+            for proc in procs:
+                if proc.stdout.readline().strip() != 'ready':
+                    raise CommandError(f"un worker de {profile} no arrancó:\n{proc.stderr.read()}")
+            for proc in procs:
+                proc.stdin.write('\n')
+                proc.stdin.flush()
+            results = []
+            for proc in procs:
+                out, err = proc.communicate()
+                if proc.returncode:
+                    raise CommandError(f"falló un worker de {profile}:\n{err}")
+                results.append(json.loads(out.strip().splitlines()[-1]))
+            return results
+        finally:
+            for proc in procs:
+                if proc.poll() is None:
+                    proc.kill()
@@ -0,0 +1,45 @@
+# WEB/kliq/consignaciones_atico/management/commands/limpiar_temp.py
+from django.core.management.base import BaseCommand
+
+from consignaciones_atico               import render_cache, jobs, history
+from consignaciones_atico.uploads      import sweep, MAX_AGE, MAX_BYTES
+from consignaciones_atico.master_cache import evict
+
+
+class Command(BaseCommand):
+    help = (
+        "Borra de MEDIA_ROOT/temp los maestros subidos vencidos o que exceden "
+        "el tamaño máximo, poda la caché de maestros parseados y la de "
+        "liquidaciones renderizadas, y borra los jobs terminados antiguos con sus ZIP "
+        "y las corridas del historial que quedaron a medias."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-age', type=float, default=MAX_AGE,
+                            help="segundos sin uso tras los que se borra un maestro")
+        parser.add_argument('--max-bytes', type=int, default=MAX_BYTES,
+                            help="tamaño máximo de temp/; sobre él se borran los menos usados")
+        parser.add_argument('--render-max-age', type=float, default=render_cache.MAX_AGE,
+                            help="segundos sin uso tras los que se borra una liquidación renderizada")
+        parser.add_argument('--render-max-bytes', type=int, default=render_cache.MAX_BYTES,
+                            help="tamaño máximo de liquidaciones/cache/")
+        parser.add_argument('--job-max-age', type=float, default=jobs.JOB_MAX_AGE,
+                            help="segundos desde que terminó un job tras los que se borra, con su ZIP")
+        parser.add_argument('--history-max-age', type=float, default=history.UNFINISHED_AGE,
+                            help="segundos tras los que se borra una corrida del historial a medias")
+
+    def handle(self, *args, **opts):
+        files, freed = sweep(max_age=opts['max_age'], max_bytes=opts['max_bytes'])
+        self.stdout.write(f"maestros subidos: {files} archivos borrados, {freed / 2**20:.1f} MB liberados")
+
+        files, freed = evict()
+        self.stdout.write(f"caché de maestros: {files} archivos borrados, {freed / 2**20:.1f} MB liberados")
+
+        files, freed = render_cache.evict(max_age=opts['render_max_age'], max_bytes=opts['render_max_bytes'])
+        self.stdout.write(f"caché de liquidaciones: {files} archivos borrados, {freed / 2**20:.1f} MB liberados")
+
+        n_jobs, files, freed = jobs.purge(max_age=opts['job_max_age'])
+        self.stdout.write(f"jobs terminados: {n_jobs} borrados, {files} ZIP borrados, {freed / 2**20:.1f} MB liberados")
+
+        runs = history.purge_unfinished(max_age=opts['history_max_age'])
+        self.stdout.write(f"historial: {runs} corridas a medias borradas")
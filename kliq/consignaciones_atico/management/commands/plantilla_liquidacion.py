@@ -0,0 +1,18 @@
+# WEB/kliq/consignaciones_atico/management/commands/plantilla_liquidacion.py
+from django.core.management.base import BaseCommand
+
+from consignaciones_atico.render import Skeleton
+
+
+class Command(BaseCommand):
+    help = (
+        "Guarda el membrete por defecto de la liquidación como .xlsx editable. "
+        "Para usarlo, apunta settings.CONSIGNACIONES_TEMPLATE_PATH al archivo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="ruta del .xlsx a crear")
+
+    def handle(self, *args, **opts):
+        Skeleton.default().save(opts['path'])
+        self.stdout.write(self.style.SUCCESS(f"Plantilla guardada en {opts['path']}"))
@@ -0,0 +1,26 @@
+# WEB/kliq/consignaciones_atico/management/commands/procesar_liquidaciones.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from consignaciones_atico.jobs import run_pending
+
+
+class Command(BaseCommand):
+    help = (
+        "Ejecuta los LiquidacionJob pendientes en este proceso (p.ej. los que "
+        "quedaron en cola o a medias si se reinició el servidor web)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help="seguir esperando jobs nuevos en vez de terminar")
+        parser.add_argument('--interval', type=float, default=2.0,
+                            help="segundos entre revisiones con --loop")
+
+    def handle(self, *args, **opts):
+        while True:
+            run_pending()
+            if not opts['loop']:
+                break
+            time.sleep(opts['interval'])
@@ -0,0 +1,390 @@
+# WEB/kliq/consignaciones_atico/master_cache.py
+"""
+Caché en disco del maestro ya parseado.
+
+El Excel maestro se parsea una sola vez por contenido: el DataFrame limpio se
+guarda como pickle en MEDIA_ROOT/temp/cache/<sha256>.pkl y las fases
+siguientes (guardar contactos, generar) lo cargan desde ahí en milisegundos.
+La caché se poda por antigüedad (TTL) y por número de entradas (LRU, usando
+el mtime del archivo como marca del último acceso).
+
+read_master_header() resuelve solo los encabezados (fila 6) leyendo el XML
+de la hoja en streaming, sin cargar el resto del maestro. read_master()
+parte de esos encabezados y lee solo las columnas que usa split_master.
+
+El maestro también puede venir como CSV o Parquet (ver formats.py): se
+reconoce por el contenido y se lee con las mismas reglas de columnas.
+"""
+import os
+import time
+import zipfile
+import hashlib
+import posixpath
+import threading
+from xml.etree.ElementTree import iterparse
+
+import numpy as np
+import pandas as pd
+from pandas.io.parsers         import TextParser
+from openpyxl.utils            import get_column_letter
+from django.conf               import settings
+from django.core.files.storage import default_storage
+
+from .engine  import is_needed_col, compact_dtypes
+from .fsutil  import remove_file
+from .formats import (
+    XLSX, PARQUET, master_format,
+    csv_header, read_csv_master, parquet_header, read_parquet_master,
+)
+from .metrics import timer, inc
+from .uploads import stored_digest
+
+CACHE_DIR         = 'temp/cache'
+CACHE_MAX_ENTRIES = getattr(settings, 'CONSIGNACIONES_MASTER_CACHE_MAX_ENTRIES', 20)
+CACHE_TTL         = getattr(settings, 'CONSIGNACIONES_MASTER_CACHE_TTL', 24 * 60 * 60)
+HEADER_ROW        = 6  # header=5 en pd.read_excel
+
+
+def read_master(source):
+    """
+    Lee el maestro (ruta o file-like; .xlsx, CSV o Parquet).
+    Resuelve primero los encabezados y carga solo las columnas que usa
+    split_master (engine.is_needed_col), con los nombres que dejaría
+    pd.read_excel(header=5) tras quitar espacios y renombrar "Código" a
+    "Codigo". Los dtypes quedan compactos (engine.compact_dtypes).
+    """
+    fmt = master_format(source)
+    if fmt == XLSX:
+        raw = _xlsx_header_values(source)
+    elif fmt == PARQUET:
+        raw = parquet_header(source)
+    else:
+        raw = csv_header(source)
+    names = column_names(raw)
+    keep  = [i for i, name in enumerate(names) if is_needed_col(name)]
+
+    with timer(f'read_{fmt}', columns=len(keep)) as m:
+        if fmt == XLSX:
+            df = read_xlsx_columns(source, keep)
+        elif fmt == PARQUET:
+            df = read_parquet_master(source, [raw[i] for i in keep])
+        else:
+            df = read_csv_master(source, keep)
+        m['rows'] = len(df)
+    inc('master_rows_read', len(df))
+    df.columns = [names[i] for i in keep]
+    return compact_dtypes(df)
+
+
+def column_names(raw):
+    """Nombres de pandas para las celdas de encabezado `raw`: "Unnamed: i", duplicados y normalize_columns."""
+    names = [value if value not in (None, '') else f"Unnamed: {i}" for i, value in enumerate(raw)]
+    return normalize_columns(_dedup(names))
+
+
+def normalize_columns(columns):
+    """Mismo tratamiento que read_master: strip y "Código" -> "Codigo"."""
+    cols = [c.strip() if isinstance(c, str) else c for c in columns]
+    return ["Codigo" if c == "Código" else c for c in cols]
+
+
+def _local(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def _first_sheet_path(zf):
+    """Ruta dentro del .xlsx de la primera hoja, según workbook.xml y sus relaciones."""
+    with zf.open('xl/workbook.xml') as f:
+        for _, el in iterparse(f):
+            if _local(el.tag) == 'sheet':
+                rid = next(v for k, v in el.attrib.items() if _local(k) == 'id')
+                break
+    with zf.open('xl/_rels/workbook.xml.rels') as f:
+        for _, el in iterparse(f):
+            if _local(el.tag) == 'Relationship' and el.get('Id') == rid:
+                target = el.get('Target')
+                break
+    if target.startswith('/'):
+        return target.lstrip('/')
+    return posixpath.normpath(posixpath.join('xl', target))
+
+
+def _col_index(ref):
+    n = 0
+    for ch in ref:
+        if not ch.isalpha():
+            break
+        n = n * 26 + ord(ch.upper()) - 64
+    return n
+
+
+def _shared_strings(zf, wanted):
+    """Solo las cadenas compartidas con índice en `wanted`; deja de leer al pasar el mayor."""
+    out = {}
+    if not wanted or 'xl/sharedStrings.xml' not in zf.namelist():
+        return out
+    last = max(wanted)
+    idx  = 0
+    with zf.open('xl/sharedStrings.xml') as f:
+        for _, el in iterparse(f):
+            if _local(el.tag) != 'si':
+                continue
+            if idx in wanted:
+                # texto plano o suma de runs; se omite la fonética (rPh)
+                parts = []
+                for child in el:
+                    name = _local(child.tag)
+                    if name == 't':
+                        parts.append(child.text or '')
+                    elif name == 'r':
+                        parts += [t.text or '' for t in child if _local(t.tag) == 't']
+                out[idx] = ''.join(parts)
+            el.clear()
+            idx += 1
+            if idx > last:
+                break
+    return out
+
+
+def _dedup(names):
+    """Duplicados como los renombra el parser de pandas: "X", "X.1", "X.2"... sin chocar con nombres existentes."""
+    names  = list(names)
+    counts = {}
+    for i, col in enumerate(names):
+        old_col   = col
+        cur_count = counts.get(col, 0)
+        while cur_count > 0:
+            counts[old_col] = cur_count + 1
+            col = f"{old_col}.{cur_count}"
+            if col in names:
+                cur_count += 1
+            else:
+                cur_count = counts.get(col, 0)
+        names[i] = col
+        counts[col] = cur_count + 1
+    return names
+
+
+def read_master_header(path):
+    """
+    Encabezados del maestro guardado en `path`, ya normalizados (mismos
+    nombres de texto que read_master, incluidos los duplicados).
+    Del .xlsx recorre el XML de la primera hoja solo hasta la fila 6 y lee de
+    sharedStrings.xml solo lo necesario; de CSV y Parquet lee la fila de
+    encabezados o el esquema. El tiempo no depende de la cantidad de filas.
+    """
+    with timer('read_header'):
+        full = default_storage.path(path)
+        fmt  = master_format(full)
+        if fmt == XLSX:
+            raw = _xlsx_header_values(full)
+        elif fmt == PARQUET:
+            raw = parquet_header(full)
+        else:
+            raw = csv_header(full)
+        return column_names(raw)
+
+
+def _xlsx_header_values(source):
+    """Valores de las celdas de la fila HEADER_ROW (None en las vacías)."""
+    with zipfile.ZipFile(source) as zf:
+        raw = {}
+        with zf.open(_first_sheet_path(zf)) as f:
+            row_no = 0
+            for _, el in iterparse(f):
+                if _local(el.tag) != 'row':
+                    continue
+                row_no = int(el.get('r') or row_no + 1)
+                if row_no == HEADER_ROW:
+                    for pos, c in enumerate(el, start=1):
+                        if _local(c.tag) != 'c':
+                            continue
+                        col = _col_index(c.get('r')) if c.get('r') else pos
+                        kind, value = c.get('t'), None
+                        for child in c:
+                            name = _local(child.tag)
+                            if name == 'v':
+                                value = child.text
+                            elif name == 'is':
+                                value = ''.join(t.text or '' for t in child.iter() if _local(t.tag) == 't')
+                        raw[col] = (kind, value)
+                el.clear()
+                if row_no >= HEADER_ROW:
+                    break
+
+        strings = _shared_strings(zf, {int(v) for k, v in raw.values() if k == 's' and v is not None})
+
+    values = []
+    for col in range(1, max(raw, default=0) + 1):
+        kind, value = raw.get(col, (None, None))
+        if kind == 's' and value is not None:
+            value = strings.get(int(value))
+        elif kind in (None, 'n') and value is not None:
+            num   = float(value)
+            value = int(num) if num.is_integer() else num
+        values.append(value)
+    return values
+
+
+def _number(text):
+    """Como openpyxl + pandas: los números enteros quedan como int."""
+    try:
+        return int(text)
+    except ValueError:
+        num = float(text)
+        return int(num) if num.is_integer() else num
+
+
+def read_xlsx_columns(source, keep):
+    """
+    Filas de datos (debajo de HEADER_ROW) de la primera hoja, solo con las
+    columnas en las posiciones `keep` (desde 0), como DataFrame.
+    Recorre el XML de la hoja en streaming y convierte solo las celdas de esas
+    columnas, con las reglas de pd.read_excel sobre openpyxl (número entero ->
+    int, error -> NaN, vacía -> NaN; se descartan las filas vacías del final);
+    la inferencia de dtypes y los valores NA ("NA", "N/A"...) quedan a cargo
+    del mismo TextParser de pandas. No interpreta formatos de fecha: ninguna
+    de las columnas necesarias es una fecha.
+    """
+    slots  = {get_column_letter(i + 1): j for j, i in enumerate(keep)}
+    width  = len(keep)
+    rows   = []
+    shared = []   # (fila, posición, índice) de las cadenas compartidas
+    last   = -1   # última fila con algún valor, en cualquier columna
+    row_no = 0
+
+    with zipfile.ZipFile(source) as zf:
+        with zf.open(_first_sheet_path(zf)) as f:
+            ns = None
+            cur, has_data, pos = [''] * width, False, 0
+            for _, el in iterparse(f):
+                if ns is None:
+                    ns = el.tag[:el.tag.index('}') + 1] if el.tag.startswith('{') else ''
+                    C, ROW, V, IS, T = (ns + t for t in ('c', 'row', 'v', 'is', 't'))
+                tag = el.tag
+                if tag == C:
+                    ref = el.get('r')
+                    if ref is None:  # sin referencia: posición dentro de la fila
+                        pos += 1
+                        ref  = get_column_letter(pos)
+                    j = slots.get(ref.rstrip('0123456789'))
+                    if j is None:
+                        has_data = has_data or len(el) > 0
+                        continue
+                    kind, value = el.get('t'), None
+                    for child in el:
+                        if child.tag == V:
+                            value = child.text
+                        elif child.tag == IS:
+                            value = ''.join(t.text or '' for t in child.iter(T))
+                    if value is None:
+                        continue
+                    has_data = True
+                    if kind == 's':
+                        shared.append((cur, j, int(value)))
+                    elif kind in (None, 'n'):
+                        cur[j] = _number(value)
+                    elif kind == 'b':
+                        cur[j] = value == '1'
+                    elif kind == 'e':
+                        cur[j] = np.nan
+                    else:
+                        cur[j] = value
+                elif tag == ROW:
+                    r = int(el.get('r') or row_no + 1)
+                    if r > HEADER_ROW:
+                        # filas ausentes del XML: vacías, como las entrega openpyxl
+                        for _ in range(max(row_no, HEADER_ROW) + 1, r):
+                            rows.append([''] * width)
+                        rows.append(cur)
+                        if has_data:
+                            last = len(rows) - 1
+                    row_no = r
+                    cur, has_data, pos = [''] * width, False, 0
+                    el.clear()
+
+        strings = _shared_strings(zf, {idx for _, _, idx in shared})
+    for row, j, idx in shared:
+        row[j] = strings.get(idx, '')
+
+    rows = rows[:last + 1]
+    if not rows:
+        return pd.DataFrame({j: pd.Series(dtype=object) for j in range(width)})
+    return TextParser(rows, header=None, skip_blank_lines=False).read()
+
+
+def file_digest(path):
+    """sha256 del archivo guardado en default_storage, leído por bloques."""
+    h = hashlib.sha256()
+    with default_storage.open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _cache_dir():
+    path = default_storage.path(CACHE_DIR)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def evict(now=None):
+    """
+    Borra entradas vencidas y, si sobran, las menos usadas recientemente.
+    Devuelve (archivos_borrados, bytes_liberados).
+    """
+    now     = now or time.time()
+    folder  = _cache_dir()
+    entries = []
+    freed   = []
+    for name in os.listdir(folder):
+        if not name.endswith('.pkl'):
+            continue
+        full = os.path.join(folder, name)
+        try:
+            mtime = os.path.getmtime(full)
+        except OSError:
+            continue
+        if now - mtime > CACHE_TTL:
+            freed.append(remove_file(full))
+        else:
+            entries.append((mtime, full))
+
+    entries.sort(reverse=True)
+    for _, full in entries[CACHE_MAX_ENTRIES:]:
+        freed.append(remove_file(full))
+    freed = [n for n in freed if n is not None]
+    return len(freed), sum(freed)
+
+
+def get_master_df(path):
+    """
+    Devuelve el DataFrame limpio del maestro guardado en `path`.
+    Si ya se parseó un archivo con el mismo contenido, se carga desde la caché.
+    Para los maestros de uploads.save_upload la huella sale del nombre.
+    """
+    folder = _cache_dir()
+    digest = stored_digest(path) or file_digest(path)
+    cached = os.path.join(folder, digest + '.pkl')
+
+    if os.path.exists(cached):
+        try:
+            with timer('master_cache_load'):
+                df = pd.read_pickle(cached)
+            os.utime(cached)  # marca de último acceso para el LRU
+            inc('master_cache_hits')
+            return df
+        except Exception:
+            remove_file(cached)
+
+    # desde la ruta: openpyxl abre el .xlsx como zip en disco y descomprime
+    # la hoja de a poco, sin copiar el archivo completo a memoria
+    df = read_master(default_storage.path(path))
+
+    # escritura atómica: otro worker puede estar leyendo la misma entrada
+    tmp = f"{cached}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with timer('master_cache_store'):
+        df.to_pickle(tmp)
+    os.replace(tmp, cached)
+    evict()
+    return df
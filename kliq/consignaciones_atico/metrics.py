@@ -0,0 +1,117 @@
+# WEB/kliq/consignaciones_atico/metrics.py
+"""
+Instrumentación liviana del pipeline de consignaciones.
+
+  - timer(stage):       mide un bloque, lo suma al histograma del proceso,
+                        escribe una línea de log (DEBUG) y, si hay una
+                        petición en curso (server_timing), lo agrega a su
+                        header Server-Timing.
+  - log_event:          línea de log clave=valor (INFO), p. ej. el resumen
+                        de cada generación con filas y editoriales.
+  - inc(name, n):       contadores (filas leídas, liquidaciones generadas...).
+  - render_prometheus:  texto en formato de exposición de Prometheus.
+
+Los datos viven en memoria de cada proceso: con varios workers de gunicorn
+cada uno expone los suyos, y lo medido dentro de los procesos de
+CONSIGNACIONES_RENDER_WORKERS no llega al registro del proceso web.
+"""
+import time
+import logging
+import threading
+import contextvars
+from functools  import wraps
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# límites superiores de los buckets, en segundos
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+_lock       = threading.Lock()
+_histograms = {}   # stage -> [counts por bucket + inf, suma, cantidad]
+_counters   = {}   # nombre -> valor
+_request    = contextvars.ContextVar('consignaciones_server_timing', default=None)
+
+
+def observe(stage, seconds):
+    with _lock:
+        h = _histograms.get(stage)
+        if h is None:
+            h = _histograms[stage] = [[0] * (len(BUCKETS) + 1), 0.0, 0]
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                h[0][i] += 1
+                break
+        else:
+            h[0][-1] += 1
+        h[1] += seconds
+        h[2] += 1
+
+    timings = _request.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+def inc(name, value=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+@contextmanager
+def timer(stage, **fields):
+    """Mide el bloque como `stage`; `fields` (rows=..., editorials=...) van a la línea de log."""
+    t0 = time.perf_counter()
+    try:
+        yield fields
+    finally:
+        dt = time.perf_counter() - t0
+        observe(stage, dt)
+        extra = ''.join(f" {k}={v}" for k, v in fields.items())
+        logger.debug("stage=%s seconds=%.4f%s", stage, dt, extra)
+
+
+def log_event(event, **fields):
+    """Línea de log estructurada (clave=valor) sin medición."""
+    logger.info("event=%s%s", event, ''.join(f" {k}={v}" for k, v in fields.items()))
+
+
+def server_timing(view):
+    """Decorador: junta las etapas medidas durante la vista en el header Server-Timing."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        token = _request.set({})
+        try:
+            response = view(request, *args, **kwargs)
+            timings  = _request.get()
+        finally:
+            _request.reset(token)
+        if timings:
+            response['Server-Timing'] = ', '.join(
+                f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items()
+            )
+        return response
+    return wrapper
+
+
+def render_prometheus():
+    """Histogramas y contadores en formato de texto de Prometheus (versión 0.0.4)."""
+    with _lock:
+        histograms = {k: ([*v[0]], v[1], v[2]) for k, v in _histograms.items()}
+        counters   = dict(_counters)
+
+    lines = [
+        "# HELP consignaciones_stage_seconds Duración de cada etapa del pipeline de consignaciones.",
+        "# TYPE consignaciones_stage_seconds histogram",
+    ]
+    for stage, (counts, total, n) in sorted(histograms.items()):
+        acc = 0
+        for bound, count in zip(BUCKETS + ('+Inf',), counts):
+            acc += count
+            lines.append(f'consignaciones_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {acc}')
+        lines.append(f'consignaciones_stage_seconds_sum{{stage="{stage}"}} {total:.6f}')
+        lines.append(f'consignaciones_stage_seconds_count{{stage="{stage}"}} {n}')
+
+    for name, value in sorted(counters.items()):
+        lines.append(f"# TYPE consignaciones_{name}_total counter")
+        lines.append(f"consignaciones_{name}_total {value}")
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-18 17:51
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LiquidacionJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('running', 'En proceso'), ('done', 'Terminado'), ('failed', 'Con error')], db_index=True, default='pending', max_length=10)),
+                ('master_path', models.CharField(help_text='Maestro subido (ruta en default_storage)', max_length=255)),
+                ('contacts', models.JSONField(blank=True, default=dict)),
+                ('total', models.PositiveIntegerField(default=0, help_text='Editoriales a generar')),
+                ('done', models.PositiveIntegerField(default=0, help_text='Editoriales generadas')),
+                ('no_data', models.JSONField(blank=True, default=list, help_text='Editoriales sin datos a liquidar')),
+                ('result_path', models.CharField(blank=True, help_text='ZIP generado (ruta en default_storage)', max_length=255)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-18 17:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consignaciones_atico', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='liquidacionjob',
+            name='cache_hits',
+            field=models.PositiveIntegerField(default=0, help_text='Liquidaciones reutilizadas de render_cache'),
+        ),
+        migrations.AddField(
+            model_name='liquidacionjob',
+            name='cache_misses',
+            field=models.PositiveIntegerField(default=0, help_text='Liquidaciones renderizadas de nuevo'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2 on 2026-10-18 17:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consignaciones_atico', '0002_liquidacionjob_cache_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EditorialContact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('editorial', models.CharField(max_length=200, unique=True)),
+                ('proveedor', models.CharField(blank=True, max_length=255)),
+                ('contacto', models.CharField(blank=True, max_length=255)),
+                ('fono_mail', models.CharField(blank=True, max_length=255)),
+                ('descuento', models.CharField(blank=True, max_length=255)),
+                ('pago', models.CharField(blank=True, max_length=255)),
+                ('fecha', models.CharField(blank=True, max_length=255)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['editorial'],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Importa los contactos que estaban en contact_data.json
+
+import json
+import os
+
+from django.db import migrations
+
+FORM_FIELDS = {
+    'proveedor': 'PROVEEDOR',
+    'contacto':  'CONTACTO',
+    'fono_mail': 'FONO_MAIL',
+    'descuento': 'DESCUENTO',
+    'pago':      'PAGO',
+    'fecha':     'FECHA',
+}
+
+
+def import_json(apps, schema_editor):
+    EditorialContact = apps.get_model('consignaciones_atico', 'EditorialContact')
+    path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'contact_data.json')
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return
+
+    EditorialContact.objects.bulk_create(
+        [
+            EditorialContact(editorial=ed, **{f: (cd or {}).get(form) or '' for f, form in FORM_FIELDS.items()})
+            for ed, cd in data.items()
+        ],
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consignaciones_atico', '0003_editorialcontact'),
+    ]
+
+    operations = [
+        migrations.RunPython(import_json, migrations.RunPython.noop),
+    ]
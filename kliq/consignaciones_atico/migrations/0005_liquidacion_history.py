@@ -0,0 +1,46 @@
+# Generated by Django 5.2 on 2026-10-18 18:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consignaciones_atico', '0004_import_contact_data_json'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LiquidacionRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('web', 'Formulario'), ('job', 'Segundo plano'), ('api', 'API')], max_length=10)),
+                ('master_path', models.CharField(blank=True, help_text='Maestro de origen (ruta en default_storage)', max_length=255)),
+                ('contacts', models.JSONField(blank=True, default=dict, help_text='Contactos usados, para volver a exportar igual')),
+                ('editorials', models.PositiveIntegerField(default=0)),
+                ('line_count', models.PositiveIntegerField(default=0)),
+                ('run_date', models.DateField(db_index=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('job', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='runs', to='consignaciones_atico.liquidacionjob')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LiquidacionLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('editorial', models.CharField(max_length=200)),
+                ('isbn', models.CharField(blank=True, max_length=32)),
+                ('producto', models.TextField(blank=True)),
+                ('units', models.FloatField()),
+                ('run_date', models.DateField()),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='consignaciones_atico.liquidacionrun')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['editorial', 'run_date'], name='liq_line_editorial_date'), models.Index(fields=['run_date'], name='liq_line_date'), models.Index(fields=['isbn'], name='liq_line_isbn')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 19:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consignaciones_atico', '0005_liquidacion_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='liquidacionjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, help_text='Última señal del ejecutor (al tomarlo y por editorial generada)', null=True),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2 on 2026-10-18 19:45
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def finish_existing(apps, schema_editor):
+    """Las corridas de antes ya estaban completas: se marcan terminadas, con su mes."""
+    LiquidacionRun = apps.get_model('consignaciones_atico', 'LiquidacionRun')
+    for run in LiquidacionRun.objects.only('pk', 'run_date').iterator():
+        LiquidacionRun.objects.filter(pk=run.pk).update(
+            month=run.run_date.replace(day=1), finished_at=F('created_at'),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consignaciones_atico', '0006_liquidacionjob_heartbeat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='liquidacionrun',
+            name='finished_at',
+            field=models.DateTimeField(blank=True, help_text='Vacío mientras se genera', null=True),
+        ),
+        migrations.AddField(
+            model_name='liquidacionrun',
+            name='master_digest',
+            field=models.CharField(blank=True, db_index=True, help_text='sha256 del maestro', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='liquidacionrun',
+            name='month',
+            field=models.DateField(blank=True, help_text='Primer día del mes de la corrida', null=True),
+        ),
+        migrations.RunPython(finish_existing, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='liquidacionrun',
+            constraint=models.UniqueConstraint(condition=models.Q(('finished_at__isnull', False), models.Q(('master_digest', ''), _negated=True)), fields=('master_digest', 'month'), name='liq_run_master_month'),
+        ),
+    ]
@@ -1,3 +1,132 @@
+import uuid
+
 from django.db import models
 
-# Create your models here.
+
+class LiquidacionJob(models.Model):
+    """Generación de liquidaciones en segundo plano (ver jobs.py)."""
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE    = 'done'
+    FAILED  = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pendiente'),
+        (RUNNING, 'En proceso'),
+        (DONE,    'Terminado'),
+        (FAILED,  'Con error'),
+    ]
+
+    id           = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    status       = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING, db_index=True)
+    master_path  = models.CharField(max_length=255, help_text="Maestro subido (ruta en default_storage)")
+    contacts     = models.JSONField(default=dict, blank=True)
+    total        = models.PositiveIntegerField(default=0, help_text="Editoriales a generar")
+    done         = models.PositiveIntegerField(default=0, help_text="Editoriales generadas")
+    no_data      = models.JSONField(default=list, blank=True, help_text="Editoriales sin datos a liquidar")
+    cache_hits   = models.PositiveIntegerField(default=0, help_text="Liquidaciones reutilizadas de render_cache")
+    cache_misses = models.PositiveIntegerField(default=0, help_text="Liquidaciones renderizadas de nuevo")
+    result_path  = models.CharField(max_length=255, blank=True, help_text="ZIP generado (ruta en default_storage)")
+    error        = models.TextField(blank=True)
+    created_at   = models.DateTimeField(auto_now_add=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True,
+                                        help_text="Última señal del ejecutor (al tomarlo y por editorial generada)")
+    finished_at  = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.id} ({self.get_status_display()} {self.done}/{self.total})"
+
+
+class EditorialContact(models.Model):
+    """Datos de contacto que se imprimen en la liquidación de cada editorial."""
+
+    editorial  = models.CharField(max_length=200, unique=True)
+    proveedor  = models.CharField(max_length=255, blank=True)
+    contacto   = models.CharField(max_length=255, blank=True)
+    fono_mail  = models.CharField(max_length=255, blank=True)
+    descuento  = models.CharField(max_length=255, blank=True)
+    pago       = models.CharField(max_length=255, blank=True)
+    fecha      = models.CharField(max_length=255, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # campo del modelo -> campo de ContactInfoForm
+    FORM_FIELDS = {
+        'proveedor': 'PROVEEDOR',
+        'contacto':  'CONTACTO',
+        'fono_mail': 'FONO_MAIL',
+        'descuento': 'DESCUENTO',
+        'pago':      'PAGO',
+        'fecha':     'FECHA',
+    }
+
+    class Meta:
+        ordering = ["editorial"]
+
+    def __str__(self):
+        return self.editorial
+
+    def as_form_data(self):
+        return {form: getattr(self, field) for field, form in self.FORM_FIELDS.items()}
+
+
+class LiquidacionRun(models.Model):
+    """Una generación de liquidaciones guardada en el historial (ver history.py)."""
+
+    WEB = 'web'
+    JOB = 'job'
+    API = 'api'
+    SOURCE_CHOICES = [
+        (WEB, 'Formulario'),
+        (JOB, 'Segundo plano'),
+        (API, 'API'),
+    ]
+
+    source      = models.CharField(max_length=10, choices=SOURCE_CHOICES)
+    job         = models.ForeignKey(LiquidacionJob, null=True, blank=True, on_delete=models.SET_NULL, related_name='runs')
+    master_path = models.CharField(max_length=255, blank=True, help_text="Maestro de origen (ruta en default_storage)")
+    master_digest = models.CharField(max_length=64, blank=True, db_index=True, help_text="sha256 del maestro")
+    contacts    = models.JSONField(default=dict, blank=True, help_text="Contactos usados, para volver a exportar igual")
+    editorials  = models.PositiveIntegerField(default=0)
+    line_count  = models.PositiveIntegerField(default=0)
+    run_date    = models.DateField(db_index=True)
+    month       = models.DateField(null=True, blank=True, help_text="Primer día del mes de la corrida")
+    created_at  = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True, help_text="Vacío mientras se genera")
+
+    class Meta:
+        ordering = ["-created_at"]
+        constraints = [
+            # un mismo maestro se liquida una vez por mes: regenerarlo reemplaza la corrida
+            models.UniqueConstraint(
+                fields=['master_digest', 'month'], name='liq_run_master_month',
+                condition=models.Q(finished_at__isnull=False) & ~models.Q(master_digest=''),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.run_date} {self.get_source_display()} ({self.editorials} editoriales)"
+
+
+class LiquidacionLine(models.Model):
+    """Línea de una liquidación del historial; run_date se copia de la corrida para filtrar sin JOIN."""
+
+    run       = models.ForeignKey(LiquidacionRun, on_delete=models.CASCADE, related_name='lines')
+    editorial = models.CharField(max_length=200)
+    isbn      = models.CharField(max_length=32, blank=True)
+    producto  = models.TextField(blank=True)
+    units     = models.FloatField()
+    run_date  = models.DateField()
+
+    class Meta:
+        indexes = [
+            # "qué se le liquidó a X en tal período" y totales por período
+            models.Index(fields=['editorial', 'run_date'], name='liq_line_editorial_date'),
+            models.Index(fields=['run_date'],              name='liq_line_date'),
+            models.Index(fields=['isbn'],                  name='liq_line_isbn'),
+        ]
+
+    def __str__(self):
+        return f"{self.editorial} {self.isbn} x{self.units:g}"
@@ -0,0 +1,327 @@
+# WEB/kliq/consignaciones_atico/render.py
+"""
+Renderizador rápido de la liquidación (openpyxl en modo write-only).
+
+Produce la misma hoja que views.create_export_excel (logo en A1, título
+B1:D2, bloque cliente B3:D6, contactos en filas 8–13, datos desde la 16),
+pero escribe las filas en streaming y no crea estilos por celda: cada
+estilo se registra una vez por libro en una celda modelo y las celdas
+reales copian su StyleArray.
+
+El encabezado estático (filas 1–15) es una plantilla que se arma una vez
+por proceso: la de código (Skeleton.default) o, si se configura
+settings.CONSIGNACIONES_TEMPLATE_PATH, la primera hoja de ese .xlsx.
+En la plantilla, los textos "{titulo}", "{editorial}", "{PROVEEDOR}",
+"{CONTACTO}", "{FONO / MAIL}", "{DESCUENTO}", "{PAGO}" y "{FECHA}" se
+reemplazan por los datos de cada editorial. La plantilla también guarda el
+logo ya decodificado (Skeleton.logo), para no abrirlo con PIL en cada libro.
+"""
+import os
+import re
+from copy      import copy
+from functools import lru_cache
+from io        import BytesIO
+
+from django.conf               import settings
+from openpyxl                  import Workbook, load_workbook
+from openpyxl.cell             import WriteOnlyCell
+from openpyxl.drawing.image    import Image as OpenpyxlImage
+from openpyxl.styles           import Alignment, Font, Border, Side
+from openpyxl.utils            import get_column_letter
+
+from .metrics import timer
+
+TITLE_FONT  = Font(name="Arial", size=16, bold=True)
+HEADER_FONT = Font(name="Arial", size=11, bold=True)
+NORMAL_FONT = Font(name="Arial", size=10)
+THIN_BORDER = Border(
+    left=Side(style="thin"),
+    right=Side(style="thin"),
+    top=Side(style="thin"),
+    bottom=Side(style="thin")
+)
+CENTER      = Alignment(horizontal="center", vertical="center")
+LEFT        = Alignment(horizontal="left", vertical="center")
+CLIENT_WRAP = Alignment(wrap_text=True, vertical="top", horizontal="center")
+
+CLIENT_BLOCK = (
+    "CLIENTE: Librería Virtual y Distribuidora El Ático Ltda.\n"
+    "Venta y Distribución de Libros\n"
+    "General Bari 234, Providencia - Santiago, Teléfono: (56)2 21452308\n"
+    "Rut: 76082908-0"
+)
+CONTACT_FIELDS = ["PROVEEDOR:", "CONTACTO:", "FONO / MAIL:", "DESCUENTO:", "PAGO:", "FECHA:"]
+CONTACT_ROW    = 8
+DATA_ROW       = 16
+LOGO_SIZE      = (80, 50)
+
+# estilo = (font, alignment, border, number_format); None = sin estilo
+TITLE_STYLE   = (TITLE_FONT,  CENTER,      None,        None)
+CLIENT_STYLE  = (NORMAL_FONT, CLIENT_WRAP, None,        None)
+LABEL_STYLE   = (HEADER_FONT, None,        THIN_BORDER, None)
+CONTACT_STYLE = (NORMAL_FONT, None,        THIN_BORDER, None)
+BORDER_STYLE  = (None,        None,        THIN_BORDER, None)
+HEADER_STYLE  = (HEADER_FONT, CENTER,      THIN_BORDER, None)
+DATA_STYLE    = (NORMAL_FONT, LEFT,        THIN_BORDER, None)
+ISBN_STYLE    = (NORMAL_FONT, LEFT,        THIN_BORDER, "0")
+
+PLACEHOLDER = re.compile(r'\{([^{}]+)\}')
+
+
+def isbn_value(val):
+    """ISBN como entero cuando int() lo acepta; si no, el valor tal cual."""
+    if isinstance(val, str) and val.isdecimal():
+        return int(val)
+    try:
+        return int(val)
+    except (TypeError, ValueError):
+        return val
+
+
+def column_widths(df, titulo):
+    """Anchos de B, C y D: Producto se estira para que quepa el título."""
+    unidades_w = len("Unidades a liquidar") + 2
+    prod_w     = max(df["Producto"].astype(str).map(len).max() if not df.empty else len("Producto"), len("Producto")) + 5
+    isbn_w     = 15
+    required = 2 * len(titulo)
+    current  = unidades_w + prod_w + isbn_w
+    if required > current:
+        prod_w += (required - current)
+    return unidades_w, prod_w, isbn_w
+
+
+def _inject(value, values):
+    """Reemplaza los marcadores {campo}; si la celda es solo un marcador, toma el valor tal cual."""
+    if not isinstance(value, str) or '{' not in value:
+        return value
+    m = PLACEHOLDER.fullmatch(value)
+    if m and m[1] in values:
+        return values[m[1]]
+    return PLACEHOLDER.sub(lambda m: str(values[m[1]]) if m[1] in values else m[0], value)
+
+
+class Skeleton:
+    """
+    Encabezado estático de la liquidación (filas 1 a DATA_ROW-1).
+    Guarda valores y estilos como objetos, independientes de cualquier libro.
+    """
+
+    def __init__(self):
+        self.cells     = {}   # (fila, columna) -> (valor, estilo)
+        self.merged    = []
+        self.heights   = {}
+        self.widths    = {}
+        self.show_grid = False
+        self._logo     = None  # (bytes del logo, lo que devuelve logo())
+
+    def logo(self, logo_content):
+        """
+        (bytes, formato) del logo como van dentro del .xlsx, decodificados una
+        vez por contenido; None si no se puede abrir (p. ej. sin Pillow).
+        """
+        cached = self._logo
+        if cached is None or cached[0] != logo_content:
+            try:
+                img    = OpenpyxlImage(BytesIO(logo_content))
+                cached = (logo_content, (img._data(), img.format))
+            except Exception:
+                cached = (logo_content, None)
+            self._logo = cached
+        return cached[1]
+
+    @classmethod
+    def default(cls):
+        """Membrete de El Ático, igual al de create_export_excel."""
+        sk = cls()
+        sk.heights[1] = 45
+        sk.merged += ["B1:D2", "B3:D6"]
+        sk.cells[(1, 2)] = ("{titulo}", TITLE_STYLE)
+        sk.cells[(3, 2)] = (CLIENT_BLOCK, CLIENT_STYLE)
+        for i, field in enumerate(CONTACT_FIELDS, start=CONTACT_ROW):
+            sk.merged.append(f"C{i}:D{i}")
+            sk.cells[(i, 2)] = (field, LABEL_STYLE)
+            sk.cells[(i, 3)] = ("{%s}" % field.replace(":", ""), CONTACT_STYLE)
+            sk.cells[(i, 4)] = (None, BORDER_STYLE)
+        return sk
+
+    @classmethod
+    def from_xlsx(cls, path):
+        """Lee el membrete desde la primera hoja de un .xlsx (filas sobre DATA_ROW)."""
+        ws = load_workbook(path).worksheets[0]
+        sk = cls()
+        sk.show_grid = ws.sheet_view.showGridLines
+        for row in ws.iter_rows(min_row=1, max_row=DATA_ROW - 1):
+            for c in row:
+                if c.value is None and not c.has_style:
+                    continue
+                style = None
+                if c.has_style:
+                    style = (copy(c.font), copy(c.alignment), copy(c.border), c.number_format)
+                sk.cells[(c.row, c.column)] = (c.value, style)
+        sk.merged  = [str(r) for r in ws.merged_cells.ranges if r.max_row < DATA_ROW]
+        sk.heights = {r: d.height for r, d in ws.row_dimensions.items() if r < DATA_ROW and d.height}
+        sk.widths  = {k: d.width for k, d in ws.column_dimensions.items() if d.width}
+        return sk
+
+    def save(self, path):
+        """Guarda la plantilla como .xlsx editable (punto de partida para from_xlsx)."""
+        wb = Workbook()
+        ws = wb.active
+        ws.title = "Liquidación"
+        ws.sheet_view.showGridLines = self.show_grid
+        for (r, c), (value, style) in self.cells.items():
+            cl = ws.cell(row=r, column=c, value=value)
+            if style:
+                font, alignment, border, number_format = style
+                if font:
+                    cl.font = font
+                if alignment:
+                    cl.alignment = alignment
+                if border:
+                    cl.border = border
+                if number_format:
+                    cl.number_format = number_format
+        for ref in self.merged:
+            ws.merge_cells(ref)
+        for r, height in self.heights.items():
+            ws.row_dimensions[r].height = height
+        for col, width in self.widths.items():
+            ws.column_dimensions[col].width = width
+        wb.save(path)
+
+    def rows(self, values, cell):
+        """Filas del encabezado con los marcadores reemplazados, listas para ws.append."""
+        for r in range(1, DATA_ROW):
+            cols = [c for (row, c) in self.cells if row == r]
+            line = [None] * max(cols, default=0)
+            for c in cols:
+                value, style = self.cells[(r, c)]
+                line[c - 1] = cell(style, _inject(value, values))
+            yield line
+
+
+def template_signature():
+    """
+    (ruta, mtime) de CONSIGNACIONES_TEMPLATE_PATH, o None sin plantilla: lo
+    que identifica la versión del membrete (get_skeleton y render_cache).
+    """
+    path = getattr(settings, 'CONSIGNACIONES_TEMPLATE_PATH', None)
+    if not path:
+        return None
+    try:
+        return str(path), os.path.getmtime(path)
+    except OSError:
+        return str(path), None
+
+
+@lru_cache(maxsize=4)
+def _skeleton(signature):
+    return Skeleton.from_xlsx(signature[0]) if signature else Skeleton.default()
+
+
+def get_skeleton():
+    """
+    Plantilla del encabezado, armada una vez por versión de la plantilla: si
+    alguien edita el archivo, el próximo libro ya usa el membrete nuevo.
+    """
+    return _skeleton(template_signature())
+
+
+class _LogoImage(OpenpyxlImage):
+    """Imagen de openpyxl a partir de bytes ya decodificados (Skeleton.logo), sin PIL."""
+
+    def __init__(self, data, fmt):
+        self.ref    = None
+        self.format = fmt
+        self._bytes = data
+        self.width, self.height = LOGO_SIZE
+
+    def _data(self):
+        return self._bytes
+
+
+class _StyleRegistry:
+    """Registra cada estilo una sola vez en el libro y reparte copias de su StyleArray."""
+
+    def __init__(self, ws):
+        self.ws     = ws
+        self.arrays = {}
+
+    def array(self, style):
+        if style not in self.arrays:
+            font, alignment, border, number_format = style
+            model = WriteOnlyCell(self.ws)
+            if font:
+                model.font = font
+            if alignment:
+                model.alignment = alignment
+            if border:
+                model.border = border
+            if number_format:
+                model.number_format = number_format
+            self.arrays[style] = model._style
+        return self.arrays[style]
+
+    def __call__(self, style, value=None):
+        c = WriteOnlyCell(self.ws, value)
+        if style is not None:
+            c._style = copy(self.array(style))
+        return c
+
+
+def create_export_excel_write_only(df, editorial, logo_content=None, contact_info=None):
+    """
+    Igual que views.create_export_excel, en modo write-only y a partir de la
+    plantilla de get_skeleton(). Parámetros y retorno idénticos: bytes del .xlsx.
+    """
+    sk = get_skeleton()
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Liquidación")
+    ws.sheet_view.showGridLines = sk.show_grid
+    cell = _StyleRegistry(ws)
+
+    titulo = f"LIQUIDACION CONSIGNACIONES {editorial}"
+    values = {key.replace(":", ""): "" for key in CONTACT_FIELDS}
+    values.update(contact_info or {})
+    values.update(titulo=titulo, editorial=editorial)
+
+    # dimensiones y fusiones: deben quedar definidas antes de la primera fila
+    for r, height in sk.heights.items():
+        ws.row_dimensions[r].height = height
+    for col, width in sk.widths.items():
+        ws.column_dimensions[col].width = width
+    for col, width in zip((2, 3, 4), column_widths(df, titulo)):
+        ws.column_dimensions[get_column_letter(col)].width = width
+    for ref in sk.merged:
+        ws.merged_cells.add(ref)
+
+    logo = sk.logo(logo_content) if logo_content else None
+    if logo:
+        ws.add_image(_LogoImage(*logo), "A1")
+
+    # Encabezado (filas 1–15) desde la plantilla
+    for line in sk.rows(values, cell):
+        ws.append(line)
+
+    # Datos (fila 16 en adelante); estilos resueltos una vez fuera del loop
+    ws.append([None] + [cell(HEADER_STYLE, h) for h in df.columns])
+    data_style = cell.array(DATA_STYLE)
+    isbn_style = cell.array(ISBN_STYLE)
+
+    def styled(value, style):
+        c = WriteOnlyCell(ws, value)
+        c._style = copy(style)
+        return c
+
+    for units, producto, isbn in df.itertuples(index=False):
+        ws.append([
+            None,
+            styled(units, data_style),
+            styled(producto, data_style),
+            styled(isbn_value(isbn), isbn_style),
+        ])
+
+    out = BytesIO()
+    with timer('save', rows=len(df)):
+        wb.save(out)
+    return out.getvalue()
@@ -0,0 +1,126 @@
+# WEB/kliq/consignaciones_atico/render_cache.py
+"""
+Caché de liquidaciones ya renderizadas, direccionada por contenido.
+
+La huella de una editorial combina sus filas filtradas, su contacto, el
+logo, el renderizador y el membrete. Si la huella no cambió desde la última
+generación, se reutilizan los bytes guardados en
+default_storage/liquidaciones/cache/<huella>.xlsx en vez de renderizar.
+
+Cada lectura renueva el mtime de la entrada; evict() borra las que llevan
+más de CONSIGNACIONES_RENDER_CACHE_MAX_AGE sin usarse y, si la carpeta pasa
+de CONSIGNACIONES_RENDER_CACHE_MAX_BYTES, las de uso más antiguo. Corre con
+la limpieza de maestros subidos (uploads.maybe_sweep y manage.py limpiar_temp).
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+
+import pandas as pd
+from django.conf               import settings
+from django.core.files.storage import default_storage
+
+from .fsutil import remove_file
+from .render import template_signature
+
+CACHE_DIR = 'liquidaciones/cache'
+MAX_AGE   = getattr(settings, 'CONSIGNACIONES_RENDER_CACHE_MAX_AGE', 7 * 24 * 60 * 60)
+MAX_BYTES = getattr(settings, 'CONSIGNACIONES_RENDER_CACHE_MAX_BYTES', 200 * 1024 * 1024)
+
+# subir si cambia la forma de la hoja, para invalidar lo ya guardado
+RENDER_VERSION = 1
+
+
+def logo_digest(logo_content):
+    return hashlib.sha256(logo_content).hexdigest() if logo_content else ''
+
+
+def fingerprint(export_df, name, contact_info, logo_hash, backend):
+    """Huella sha256 de todo lo que determina el .xlsx de una editorial."""
+    h = hashlib.sha256()
+    h.update(json.dumps([
+        RENDER_VERSION, backend, template_signature(), logo_hash, name,
+        list(export_df.columns), contact_info or {},
+    ], sort_keys=True, default=str).encode())
+    h.update(pd.util.hash_pandas_object(export_df, index=False).to_numpy().tobytes())
+    # hash_pandas_object no distingue "1" de 1; lo desambiguamos con los dtypes
+    h.update(str(export_df.dtypes.tolist()).encode())
+    return h.hexdigest()
+
+
+def _path(fp):
+    return f"{CACHE_DIR}/{fp}.xlsx"
+
+
+def cached(fp):
+    """
+    Si hay bytes guardados para la huella. Solo para informar: get() puede
+    igual no encontrarlos si evict() los borra entretanto.
+    """
+    return os.path.exists(default_storage.path(_path(fp)))
+
+
+def get(fp):
+    """Bytes guardados para la huella, o None (también si evict() la borró recién)."""
+    full = default_storage.path(_path(fp))
+    try:
+        with open(full, 'rb') as f:
+            content = f.read()
+    except FileNotFoundError:
+        return None
+    try:
+        os.utime(full)
+    except OSError:
+        pass
+    return content
+
+
+def put(fp, content):
+    """Guarda los bytes bajo su huella (escritura atómica, sin sufijos de colisión)."""
+    full = default_storage.path(_path(fp))
+    if os.path.exists(full):
+        return
+    os.makedirs(os.path.dirname(full), exist_ok=True)
+    tmp = f"{full}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(content)
+    os.replace(tmp, full)
+
+
+def evict(max_age=None, max_bytes=None, now=None):
+    """
+    Borra las liquidaciones guardadas sin uso hace más de `max_age` segundos
+    y, si el resto pasa de `max_bytes`, las de uso más antiguo.
+    Devuelve (archivos_borrados, bytes_liberados).
+    """
+    max_age   = MAX_AGE if max_age is None else max_age
+    max_bytes = MAX_BYTES if max_bytes is None else max_bytes
+    now       = now or time.time()
+    folder    = default_storage.path(CACHE_DIR)
+    if not os.path.isdir(folder):
+        return 0, 0
+
+    entries = []
+    freed   = []
+    with os.scandir(folder) as it:
+        for entry in it:
+            if not entry.is_file() or not entry.name.endswith('.xlsx'):
+                continue  # los .tmp son escrituras de put() en curso
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            if now - st.st_mtime > max_age:
+                freed.append(remove_file(entry.path))
+            else:
+                entries.append((st.st_mtime, st.st_size, entry.path))
+
+    total = 0
+    for _, size, full in sorted(entries, reverse=True):
+        total += size
+        if total > max_bytes:
+            freed.append(remove_file(full))
+    freed = [n for n in freed if n is not None]
+    return len(freed), sum(freed)
@@ -0,0 +1,273 @@
+# WEB/kliq/consignaciones_atico/streaming.py
+"""
+Motor de liquidaciones sin pandas para maestros .xlsx muy grandes.
+
+split_master_stream recorre la hoja con openpyxl (read_only, values_only)
+una sola vez: resuelve los encabezados en la fila 6 y, fila a fila, agrega a
+un búfer compacto por editorial (array de unidades + índice de fila) las que
+califican. Solo se guardan Producto y Código de esas filas, así que la
+memoria queda cerca del tamaño de las liquidaciones y no del maestro.
+Al final ordena cada búfer por Producto y arma los DataFrame.
+
+Las liquidaciones salen iguales a las de split_master(get_master_df(...)):
+para eso se lleva, por columna, lo que pandas infiere al leer (si todos los
+valores son enteros, si hay vacíos), y los valores se convierten al final
+con esas reglas (p. ej. el ISBN de una columna Código float sale "978.0").
+
+master_tables() elige el motor según CONSIGNACIONES_ENGINE ("pandas" o
+"streaming"); CSV y Parquet siempre pasan por el DataFrame.
+"""
+import re
+import math
+from array import array
+
+import numpy as np
+import pandas as pd
+from openpyxl                  import load_workbook
+from openpyxl.cell.cell        import ERROR_CODES
+from django.conf               import settings
+from django.core.files.storage import default_storage
+
+from .engine       import (
+    BODEGA_COL, REQUIRED, EXPORT_COLS, consign_columns, editorial_groups, split_master,
+)
+from .formats      import XLSX, master_format, MasterFormatError
+from .master_cache import HEADER_ROW, get_master_df, column_names
+from .metrics      import timer, inc
+
+ENGINE = getattr(settings, 'CONSIGNACIONES_ENGINE', 'pandas')
+
+_MISSING = object()
+_INT_RE  = re.compile(r'\s*[+-]?\d+\s*')
+
+# valores que pandas lee como vacíos por defecto (na_values de read_excel / read_csv)
+NA_STRINGS = frozenset([
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND',
+    '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+])
+
+
+def _number(value):
+    """Número que dejaría pandas para `value` (int si es entero), o None si no es numérico."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else value
+    if isinstance(value, str) and '_' not in value:
+        if _INT_RE.fullmatch(value):
+            return int(value)
+        try:
+            return _number(float(value))
+        except ValueError:
+            return None
+    return None
+
+
+def _cell(value):
+    """Valor de la celda tal como lo ve pandas: _MISSING para vacías, errores y "NA", "N/A"..."""
+    if value.__class__ is int:
+        return value
+    if value is None or (isinstance(value, str) and value in ERROR_CODES):
+        return _MISSING
+    if isinstance(value, float):
+        if math.isnan(value):
+            return _MISSING
+        return int(value) if value.is_integer() else value
+    if isinstance(value, str) and value in NA_STRINGS:
+        return _MISSING
+    return value
+
+
+class _Column:
+    """
+    Lo que infiere pandas de una columna: numérica o no, entera o no, con
+    vacíos o no. Los booleanos cuentan como 1/0 entre números; si la columna
+    solo tiene booleanos (sin vacíos) queda bool.
+    """
+    __slots__ = ('missing', 'numeric', 'integer', 'bools', 'others')
+
+    def __init__(self):
+        self.missing = False
+        self.numeric = True
+        self.integer = True
+        self.bools   = False
+        self.others  = False
+
+    def add(self, value):
+        if value is _MISSING:
+            self.missing = True
+            return
+        if value.__class__ is bool:
+            self.bools = True
+            return
+        self.others = True
+        if self.numeric and value.__class__ is not int:
+            num = _number(value)
+            if num is None:
+                self.numeric = False
+            elif not isinstance(num, int):
+                self.integer = False
+
+    def only_bools(self):
+        return self.bools and not self.others and not self.missing
+
+    def is_int(self):
+        """La columna quedaría int64 (y no float64, bool u object)."""
+        return self.numeric and self.integer and not self.missing and not self.only_bools()
+
+    def dtype(self):
+        if not self.numeric:
+            return object
+        if self.only_bools():
+            return bool
+        return 'int64' if self.is_int() else 'float64'
+
+    def final(self, value):
+        """`value` con el dtype que tendría la columna completa."""
+        if value is _MISSING:
+            return np.nan
+        if not self.numeric or self.only_bools():
+            return value
+        num = int(value) if value.__class__ is bool else _number(value)
+        return num if self.is_int() else float(num)
+
+
+class _Buffer:
+    """Liquidación de una editorial en construcción: unidades y fila (en `records`) por línea."""
+    __slots__ = ('units', 'rows')
+
+    def __init__(self):
+        self.units = array('d')
+        self.rows  = array('q')
+
+
+def _units(value, col):
+    if value.__class__ is bool:
+        # como en pandas, True/False restan como 1/0
+        return int(value)
+    num = _number(value)
+    if num is None:
+        raise MasterFormatError(f'La columna "{col}" tiene valores que no son números (p. ej. "{value}").')
+    return num
+
+
+def split_master_stream(source, no_data_editorials=None):
+    """
+    Como split_master(read_master(source)) para un .xlsx (ruta o file-like),
+    sin cargar el maestro en un DataFrame. Produce (editorial, DataFrame).
+    """
+    if no_data_editorials is None:
+        no_data_editorials = []
+
+    wb = load_workbook(source, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        ws.reset_dimensions()  # algunos ERP declaran mal el rango de la hoja
+        rows = ws.iter_rows(min_row=1, values_only=True)
+
+        header = None
+        for row_no, values in enumerate(rows, start=1):
+            if row_no == HEADER_ROW:
+                header = list(values)
+                break
+        names        = column_names(header or [])
+        consign_cols = consign_columns(names)
+        if not consign_cols or not all(x in names for x in REQUIRED):
+            return
+
+        i_prod, i_cod, i_bod = (names.index(c) for c in REQUIRED)
+        i_cons  = [names.index(c) for c in consign_cols]
+        tracked = [i_prod, i_cod, i_bod] + i_cons
+        columns = [_Column() for _ in tracked]
+        buffers = [_Buffer() for _ in consign_cols]
+        records = []   # (Producto, Código) crudos de las filas que califican
+        blank   = 0    # filas vacías pendientes: cuentan como vacíos si viene otra con datos
+        width   = max(tracked) + 1
+
+        with timer('split_stream', editorials=len(consign_cols)) as m:
+            n = 0
+            for values in rows:
+                if values.count(None) == len(values):
+                    blank += 1
+                    continue
+                if blank:
+                    for c in columns:
+                        c.missing = True
+                    n    += blank
+                    blank = 0
+                n += 1
+
+                if len(values) < width:
+                    values = tuple(values) + (None,) * (width - len(values))
+                cells = [_cell(values[i]) for i in tracked]
+                for c, v in zip(columns, cells):
+                    c.add(v)
+
+                bodega = cells[2]
+                if bodega is _MISSING:
+                    continue
+                bodega = _units(bodega, BODEGA_COL)
+                if bodega < 0:
+                    continue
+                record = None
+                for buf, cons, col in zip(buffers, cells[3:], consign_cols):
+                    if cons is _MISSING:
+                        continue
+                    units = _units(cons, col) - bodega
+                    if units > 0:
+                        if record is None:
+                            record = len(records)
+                            records.append((cells[0], cells[1]))
+                        buf.units.append(units)
+                        buf.rows.append(record)
+            m['rows'] = n
+        inc('master_rows_read', n)
+    finally:
+        wb.close()
+
+    prod, cod, bod = columns[:3]
+    producto = [prod.final(p) for p, _ in records]
+    isbn     = [str(cod.final(c)).split("/")[0][:13] for _, c in records]
+
+    for name, group in editorial_groups(consign_cols).items():
+        # varias columnas de la misma editorial: sus líneas, una tras otra
+        units = [u for j in group for u in buffers[j].units]
+        lines = [r for j in group for r in buffers[j].rows]
+        if not lines:
+            no_data_editorials.append(name)
+            continue
+        # orden estable por Producto, con los vacíos al final (como sort_values),
+        # y por fila del maestro (records va en ese orden) entre los iguales
+        order = sorted(range(len(lines)), key=lambda k: (
+            _is_nan(producto[lines[k]]), _sort_key(producto[lines[k]]), lines[k]))
+        # mismo dtype que daría la resta columna a columna sobre pd.read_excel
+        dtype = np.result_type(*(
+            (pd.Series(dtype=columns[3 + j].dtype()) - pd.Series(dtype=bod.dtype())).dtype for j in group
+        ))
+        yield name, pd.DataFrame({
+            "Unidades a liquidar": np.array([units[k] for k in order]).astype(dtype),
+            "Producto":            np.array([producto[lines[k]] for k in order], dtype=prod.dtype()),
+            "ISBN":                np.array([isbn[lines[k]] for k in order], dtype=object),
+        }, columns=EXPORT_COLS)
+
+
+def _is_nan(value):
+    return isinstance(value, float) and math.isnan(value)
+
+
+def _sort_key(value):
+    return 0 if _is_nan(value) else value
+
+
+def master_tables(path, no_data_editorials=None):
+    """
+    Liquidaciones del maestro guardado en `path` con el motor configurado:
+    "streaming" para .xlsx (split_master_stream), si no split_master sobre
+    get_master_df (con su caché en disco).
+    """
+    full = default_storage.path(path)
+    if ENGINE == 'streaming' and master_format(full) == XLSX:
+        return split_master_stream(full, no_data_editorials)
+    return split_master(get_master_df(path), no_data_editorials)
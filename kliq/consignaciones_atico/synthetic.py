@@ -0,0 +1,76 @@
+# WEB/kliq/consignaciones_atico/synthetic.py
+"""
+Maestros sintéticos para medir el pipeline de consignaciones.
+
+Imitan la planilla del ERP: Producto, Código (a veces con sufijo " / H6"),
+"BODEGA GENERAL BARI" con algunas existencias negativas y N columnas
+"Consignacion <EDITORIAL>" mayormente en cero.
+"""
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+
+def editorial_label(k):
+    """Nombre de editorial sin dígitos (editorial_name los borra): A, B, ..., Z, AA, AB..."""
+    label = ''
+    k += 1
+    while k:
+        k, r = divmod(k - 1, 26)
+        label = chr(65 + r) + label
+    return f"EDITORIAL {label}"
+
+
+def synthetic_master_df(rows=50_000, editorials=80, seed=0):
+    """DataFrame ya limpio (como read_master), con `rows` filas y `editorials` consignaciones."""
+    rng = np.random.default_rng(seed)
+
+    isbn   = rng.integers(10**9, 10**10, rows).astype(str)
+    codigo = np.char.add("978", isbn).astype(object)
+    suffix = rng.random(rows) < 0.2
+    codigo[suffix] = [f"{c} / H{i % 9}" for i, c in zip(np.flatnonzero(suffix), codigo[suffix])]
+
+    data = {
+        "Producto":            [f"Libro {i:06d} - Autor {i % 997}" for i in rng.permutation(rows)],
+        "Codigo":              codigo,
+        "Estado":              "Vigente",
+        "BODEGA GENERAL BARI": rng.integers(-3, 40, rows),
+    }
+    for k in range(editorials):
+        col = rng.integers(0, 45, rows)
+        col[rng.random(rows) < 0.9] = 0
+        data[f"Consignacion {editorial_label(k)}"] = col
+    return pd.DataFrame(data)
+
+
+def write_synthetic_master(dest, rows=30_000, editorials=20, seed=0, fmt='xlsx'):
+    """
+    Escribe un maestro con el formato del ERP en `dest` (ruta o file-like).
+    En .xlsx: 5 filas de preámbulo, encabezados en la fila 6 (Producto, Código,
+    "BODEGA GENERAL BARI", "Consignacion <EDITORIAL>"...) y `rows` filas de
+    datos. Con fmt="csv" o "parquet", las mismas columnas sin preámbulo, como
+    las exporta el ERP.
+    """
+    df = synthetic_master_df(rows, editorials, seed)
+    df = df.rename(columns={"Codigo": "Código"})
+    df.insert(0, "Ubicación", "BODEGA GENERAL BARI:")
+    df.insert(1, "Categoría", "LIBRO IMPRESO")
+
+    if fmt == 'csv':
+        df.to_csv(dest, index=False)
+        return
+    if fmt == 'parquet':
+        df.to_parquet(dest, index=False)
+        return
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Stock")
+    ws.append(["Stock actual"])
+    ws.append(["Empresa: Librería Virtual y Distribuidora El Ático Ltda."])
+    ws.append(["Bodega: todas"])
+    ws.append([])
+    ws.append([])
+    ws.append(list(df.columns))
+    for row in df.itertuples(index=False):
+        ws.append([v.item() if hasattr(v, "item") else v for v in row])
+    wb.save(dest)
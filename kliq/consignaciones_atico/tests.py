@@ -1,3 +1,993 @@
-from django.test import TestCase
+# WEB/kliq/consignaciones_atico/tests.py
+import io
+import os
+import re
+import base64
+import shutil
+import zipfile
+import hashlib
+import tempfile
+import importlib
+from datetime import timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+import openpyxl
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+from django.contrib.auth.models import User
+from django.core.cache          import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.storage import default_storage
+from django.test               import TestCase, TransactionTestCase, override_settings
+from django.urls               import resolve, clear_url_caches
+from django.utils              import timezone
+
+from . import (
+    jobs, history, views, api, render_cache, master_cache, diff, metrics, uploads, async_views, urls as app_urls,
+)
+from .archive   import stream_zip, STRATEGIES
+from .render    import create_export_excel_write_only, Skeleton
+from .engine    import (
+    split_master, split_master_loop, editorial_counts, consign_columns, editorial_name, compact_dtypes,
+    BODEGA_COL,
+)
+from .formats   import MasterFormatError
+from .streaming import split_master_stream
+from .synthetic import synthetic_master_df, write_synthetic_master
+from .master_cache import read_master, read_master_header
+from .contacts  import load_contacts, save_contacts
+from .models    import LiquidacionJob, LiquidacionRun, EditorialContact
+from .streaming import master_tables
+
+MASTER_CSV = (
+    "Codigo,Producto,BODEGA GENERAL BARI,Consignacion PLANETA,Consignacion ZIGZAG\n"
+    "9780001,Libro A,1,5,0\n"
+    "9780002,Libro B,0,3,2\n"
+    "9780003,Libro C,4,4,9\n"
+).encode()
+
+CONTACT = {
+    'PROVEEDOR': 'Planeta SA', 'CONTACTO': 'Ana', 'FONO / MAIL': 'ana@planeta.cl',
+    'DESCUENTO': '40%', 'PAGO': '30 días', 'FECHA': '2026-10-01',
+}
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class MediaTestCase(TestCase):
+    """TestCase con MEDIA_ROOT en una carpeta temporal propia."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media = tempfile.mkdtemp(prefix='consignaciones_test_')
+        cls._media_override = override_settings(MEDIA_ROOT=cls.media)
+        cls._media_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._media_override.disable()
+        shutil.rmtree(cls.media, ignore_errors=True)
+        super().tearDownClass()
+
+    def write(self, path, content=b'x', age=0):
+        """Crea `path` en default_storage con un mtime de hace `age` segundos."""
+        full = default_storage.path(path)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        with open(full, 'wb') as f:
+            f.write(content)
+        if age:
+            t = timezone.now().timestamp() - age
+            os.utime(full, (t, t))
+        return full
+
+
+class JobQueueTests(MediaTestCase):
+
+    def test_requeue_stale_running_jobs(self):
+        old   = timezone.now() - timedelta(seconds=jobs.JOB_TIMEOUT + 60)
+        stale = LiquidacionJob.objects.create(master_path='temp/a.xlsx', status=LiquidacionJob.RUNNING,
+                                              heartbeat_at=old, done=3)
+        alive = LiquidacionJob.objects.create(master_path='temp/b.xlsx', status=LiquidacionJob.RUNNING,
+                                              heartbeat_at=timezone.now())
+
+        self.assertEqual(jobs.requeue_stale(), 1)
+        stale.refresh_from_db()
+        alive.refresh_from_db()
+        self.assertEqual((stale.status, stale.done, stale.heartbeat_at), (LiquidacionJob.PENDING, 0, None))
+        self.assertEqual(alive.status, LiquidacionJob.RUNNING)
+        self.assertTrue(jobs.claim(stale.pk))
+
+    def test_purge_old_jobs_and_results(self):
+        max_age  = jobs.JOB_MAX_AGE
+        finished = timezone.now() - timedelta(seconds=max_age + 60)
+        old = LiquidacionJob.objects.create(master_path='temp/a.xlsx', status=LiquidacionJob.DONE,
+                                            result_path='liquidaciones/old.zip', finished_at=finished)
+        new = LiquidacionJob.objects.create(master_path='temp/a.xlsx', status=LiquidacionJob.DONE,
+                                            result_path='liquidaciones/new.zip', finished_at=timezone.now())
+        old_zip    = self.write(old.result_path, age=max_age + 60)
+        new_zip    = self.write(new.result_path)
+        orphan     = self.write('liquidaciones/orphan.zip', age=max_age + 60)
+        cached     = self.write('liquidaciones/cache/x.xlsx', age=max_age + 60)
+
+        n_jobs, files, _ = jobs.purge()
+        self.assertEqual((n_jobs, files), (1, 2))
+        self.assertFalse(LiquidacionJob.objects.filter(pk=old.pk).exists())
+        self.assertFalse(os.path.exists(old_zip))
+        self.assertFalse(os.path.exists(orphan))
+        self.assertTrue(os.path.exists(new_zip))
+        self.assertTrue(os.path.exists(cached))
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ContactCacheTests(TestCase):
+
+    def test_every_write_changes_the_cached_version(self):
+        save_contacts({'A': {'PROVEEDOR': 'uno'}})
+        self.assertEqual(load_contacts()['A']['PROVEEDOR'], 'uno')
+
+        # escrituras que no pasan por save_contacts (admin, otro proceso)
+        EditorialContact.objects.filter(editorial='A').update(proveedor='dos', updated_at=timezone.now())
+        self.assertEqual(load_contacts()['A']['PROVEEDOR'], 'dos')
+        EditorialContact.objects.create(editorial='B')
+        self.assertEqual(sorted(load_contacts()), ['A', 'B'])
+        EditorialContact.objects.filter(editorial='B').delete()
+        self.assertEqual(sorted(load_contacts()), ['A'])
+
+    def test_lost_cache_entries_never_serve_old_data(self):
+        save_contacts({'A': {'PROVEEDOR': 'uno'}})
+        load_contacts()
+        save_contacts({'A': {'PROVEEDOR': 'dos'}})
+        cache.clear()
+        self.assertEqual(load_contacts()['A']['PROVEEDOR'], 'dos')
+        with self.assertNumQueries(1):
+            load_contacts()
+
+
+class HistoryTests(MediaTestCase):
+
+    def generate(self, path, source=LiquidacionRun.WEB):
+        rec = history.Recording(source, path)
+        return [name for name, _ in rec.files(rec.tables(master_tables(path)))]
+
+    def units(self):
+        return {(r['editorial'], r['lines']): r['units'] for r in history.totals()}
+
+    def test_regenerating_a_master_keeps_the_totals(self):
+        self.write('temp/maestro.csv', MASTER_CSV)
+        self.assertEqual(self.generate('temp/maestro.csv'), ['PLANETA', 'ZIGZAG'])
+        first = self.units()
+        self.assertEqual(first, {('PLANETA', 2): 7.0, ('ZIGZAG', 2): 7.0})
+
+        # el mismo maestro otra vez, con otro nombre y desde un job
+        self.write('temp/copia.csv', MASTER_CSV)
+        self.generate('temp/copia.csv', LiquidacionRun.JOB)
+        self.assertEqual(self.units(), first)
+        self.assertEqual(LiquidacionRun.objects.count(), 1)
+        self.assertEqual(LiquidacionRun.objects.get().source, LiquidacionRun.JOB)
+
+    def test_interrupted_generation_is_not_recorded(self):
+        self.write('temp/maestro.csv', MASTER_CSV)
+        self.generate('temp/maestro.csv')
+        before = self.units()
+
+        rec   = history.Recording(LiquidacionRun.WEB, 'temp/maestro.csv')
+        files = rec.files(rec.tables(master_tables('temp/maestro.csv')))
+        next(files)
+        files.close()   # el cliente cortó la descarga
+        self.assertEqual(self.units(), before)
+        self.assertEqual(LiquidacionRun.objects.count(), 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class LiquidacionesApiTests(MediaTestCase):
+
+    url = '/consignaciones-atico/api/liquidaciones/'
+
+    def setUp(self):
+        User.objects.create_user('api', password='pw')
+        self.auth = {'HTTP_AUTHORIZATION': 'Basic ' + base64.b64encode(b'api:pw').decode()}
+
+    def post(self, masters, **data):
+        files = [SimpleUploadedFile(name, content) for name, content in masters]
+        return self.client.post(self.url, {'master': files, **data}, **self.auth)
+
+    def test_requires_basic_auth(self):
+        resp = self.client.post(self.url, {'master': SimpleUploadedFile('m.csv', MASTER_CSV)})
+        self.assertEqual(resp.status_code, 401)
+        self.assertIn('Basic', resp['WWW-Authenticate'])
+
+    def test_zip_mode_records_history_in_the_request_process(self):
+        resp = self.post([('uno.csv', MASTER_CSV), ('dos.csv', MASTER_CSV.replace(b'Libro A', b'Libro Z'))],
+                         mode='zip')
+        self.assertEqual(resp.status_code, 200)
+        zf = zipfile.ZipFile(io.BytesIO(b''.join(resp.streaming_content)))
+        self.assertEqual(sorted(zf.namelist()), [
+            'dos/Liquidacion_Consignaciones_PLANETA.xlsx', 'dos/Liquidacion_Consignaciones_ZIGZAG.xlsx',
+            'uno/Liquidacion_Consignaciones_PLANETA.xlsx', 'uno/Liquidacion_Consignaciones_ZIGZAG.xlsx',
+        ])
+        runs = LiquidacionRun.objects.filter(source=LiquidacionRun.API, finished_at__isnull=False)
+        self.assertEqual(sorted(runs.values_list('line_count', flat=True)), [4, 4])
+
+        # el mismo maestro otra vez reemplaza su corrida
+        resp = self.post([('uno.csv', MASTER_CSV)], mode='zip')
+        b''.join(resp.streaming_content)
+        self.assertEqual(runs.count(), 2)
+
+    def test_process_master_returns_only_paths(self):
+        path   = uploads.save_upload(SimpleUploadedFile('uno.csv', MASTER_CSV))
+        folder = tempfile.mkdtemp(dir=self.media)
+        files, no_data, tables_path = api.process_master(path, {}, folder)
+        self.assertEqual([os.path.dirname(full) for _, full in files], [folder, folder])
+        self.assertEqual(os.path.dirname(tables_path), folder)
+        expected = list(master_tables(path))
+        got      = list(api._load_tables(tables_path))
+        self.assertEqual([n for n, _ in got], [n for n, _ in expected])
+        for (name, a), (_, b) in zip(expected, got):
+            pd.testing.assert_frame_equal(b, a, obj=name)
+
+    def test_job_mode_enqueues_one_job_per_master(self):
+        resp = self.post([('uno.csv', MASTER_CSV)], mode='job')
+        self.assertEqual(resp.status_code, 202)
+        job = LiquidacionJob.objects.get()
+        self.assertEqual(resp.json()['jobs'][0]['id'], str(job.pk))
+        self.assertEqual(job.status, LiquidacionJob.PENDING)
+
+    def test_invalid_master_is_rejected_before_processing(self):
+        resp = self.post([('uno.csv', MASTER_CSV), ('malo.csv', b'a,b\n1,2\n')], mode='zip')
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(list(resp.json()['files']), ['malo.csv'])
+        self.assertFalse(LiquidacionRun.objects.exists())
+
+
+def sheet_snapshot(xlsx_bytes):
+    """Valores, estilos, fusiones, anchos e imágenes de la hoja, para comparar celda a celda."""
+    ws = openpyxl.load_workbook(io.BytesIO(xlsx_bytes)).active
+    cells = {}
+    for row in ws.iter_rows():
+        for c in row:
+            if c.value is None and not c.has_style:
+                continue
+            cells[c.coordinate] = (
+                c.value, c.number_format,
+                c.font.name, c.font.b, c.font.sz,
+                c.alignment.horizontal, c.alignment.vertical, c.alignment.wrap_text,
+                c.border.left.style, c.border.right.style, c.border.top.style, c.border.bottom.style,
+            )
+    return {
+        'title':   ws.title,
+        'grid':    ws.sheet_view.showGridLines,
+        'merged':  sorted(str(r) for r in ws.merged_cells.ranges),
+        'widths':  {k: d.width for k, d in ws.column_dimensions.items()},
+        'height1': ws.row_dimensions[1].height,
+        'images':  [(img.anchor._from.col, img.anchor._from.row, img.width, img.height) for img in ws._images],
+        'cells':   cells,
+    }
+
+
+def export_df(units, productos, isbns):
+    return pd.DataFrame({
+        "Unidades a liquidar": units,
+        "Producto":            np.array(productos, dtype=object),
+        "ISBN":                np.array(isbns, dtype=object),
+    })
+
+
+class WriteOnlyRendererTests(TestCase):
+    """render.create_export_excel_write_only debe dar la misma hoja que views.create_export_excel."""
+
+    def assertSameSheet(self, df, logo=None, contact=None):
+        expected = sheet_snapshot(views.create_export_excel(df, 'PLANETA', logo, contact))
+        got      = sheet_snapshot(create_export_excel_write_only(df, 'PLANETA', logo, contact))
+        self.assertEqual(got['cells'], expected['cells'])
+        self.assertEqual(got, expected)
+
+    def test_contact_info(self):
+        self.assertSameSheet(export_df([4, 3], ['Libro A', 'Libro B'], ['9780001', '9780002']), contact=CONTACT)
+
+    def test_without_contact_info(self):
+        self.assertSameSheet(export_df([4, 3], ['Libro A', 'Libro B'], ['9780001', '9780002']))
+
+    def test_nan_units(self):
+        self.assertSameSheet(export_df([4.0, np.nan, 2.5], ['A', 'B', 'C'], ['1', '2', '3']), contact=CONTACT)
+
+    def test_non_numeric_isbn(self):
+        self.assertSameSheet(export_df([1, 2, 3], ['A', 'B', 'C'], ['978-0-01', 'SIN ISBN', None]), contact=CONTACT)
+
+    def test_empty_frame(self):
+        self.assertSameSheet(export_df([], [], []), contact=CONTACT)
+
+    @skipUnless(Image, "el logo necesita Pillow")
+    def test_logo(self):
+        buf = io.BytesIO()
+        Image.new('RGB', (160, 100), 'red').save(buf, format='PNG')
+        self.assertSameSheet(export_df([4, 3], ['Libro A', 'Libro B'], ['1', '2']), buf.getvalue(), CONTACT)
+
+
+class StreamZipTests(TestCase):
+
+    entries = [
+        ('Liquidacion_Consignaciones_PLANETA.xlsx', os.urandom(50_000)),
+        ('Liquidacion_Consignaciones_ÑANDÚ.xlsx',   b'texto que se comprime ' * 2_000),
+        ('vacia.xlsx',                              b''),
+    ]
+
+    def test_every_strategy_writes_a_valid_zip(self):
+        for strategy in STRATEGIES:
+            with self.subTest(strategy=strategy):
+                zf = zipfile.ZipFile(io.BytesIO(b''.join(stream_zip(iter(self.entries), strategy))))
+                self.assertIsNone(zf.testzip())
+                self.assertEqual([(n, zf.read(n)) for n in zf.namelist()], self.entries)
+
+    def test_entries_are_consumed_as_the_zip_is_read(self):
+        consumed = []
+
+        def entries():
+            for name, content in self.entries:
+                consumed.append(name)
+                yield name, content
+
+        chunks = stream_zip(entries(), 'stored')
+        next(chunks)
+        self.assertEqual(len(consumed), 1)
+
+
+class RenderWorkersTests(MediaTestCase):
+
+    def render(self, tables, workers):
+        stats = {}
+        files = list(views.render_liquidaciones(tables, None, {'EDITORIAL A': CONTACT}, workers, stats))
+        self.assertEqual(stats['misses'], len(tables))
+        # sin la caché, para que la próxima pasada vuelva a renderizar
+        shutil.rmtree(default_storage.path(render_cache.CACHE_DIR), ignore_errors=True)
+        return files
+
+    def test_process_pool_gives_the_same_files_in_the_same_order(self):
+        tables   = list(split_master(synthetic_master_df(rows=400, editorials=6)))
+        serial   = self.render(tables, 0)
+        parallel = self.render(tables, 2)
+        self.assertEqual([name for name, _ in parallel], [name for name, _ in serial])
+        for (name, a), (_, b) in zip(serial, parallel):
+            self.assertEqual(sheet_snapshot(b), sheet_snapshot(a), name)
+
+
+def write_master(path, header, rows):
+    """.xlsx con el formato del ERP: 5 filas de preámbulo y los encabezados en la fila 6."""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    for _ in range(5):
+        ws.append([None])
+    ws.append(list(header))
+    for row in rows:
+        ws.append(list(row))
+    wb.save(path)
+
+
+def editoriales_full_read(full):
+    """Como lo hacía extract_editoriales antes: leyendo toda la hoja con pandas."""
+    df = pd.read_excel(full, sheet_name=0, header=5)
+    edits = []
+    for c in df.columns.str.strip():
+        if re.search(r'consignacion', c, re.IGNORECASE):
+            ed = re.sub(r'(?i)consignacion(es)?', '', c)
+            ed = re.sub(r'\s+', ' ', ed)
+            ed = re.sub(r'[:]+', '', ed)
+            ed = re.sub(r'[0-9-]+', '', ed)
+            edits.append(ed.strip().upper() or 'SIN EDITORIAL')
+    return sorted(set(edits))
+
+
+class HeaderOnlyEditorialesTests(MediaTestCase):
+
+    def assertSameEditoriales(self, path):
+        self.assertEqual(views.extract_editoriales(read_master_header(path)),
+                         editoriales_full_read(default_storage.path(path)))
+
+    def test_synthetic_master(self):
+        full = self.write('temp/sintetico.xlsx')
+        write_synthetic_master(full, rows=300, editorials=12)
+        self.assertSameEditoriales('temp/sintetico.xlsx')
+
+    def test_irregular_headers(self):
+        full = self.write('temp/irregular.xlsx')
+        write_master(full, [
+            'Ubicación', ' Producto ', 'Código', 'BODEGA GENERAL BARI', 'Consignacion  Planeta ',
+            'consignaciones zig zag:', 'CONSIGNACION B 2024', 'Consignacion-', 'Otra columna',
+        ], [('x', 'Libro', '978', 1, 2, 3, 4, 5, 6)])
+        self.assertSameEditoriales('temp/irregular.xlsx')
+
+
+EDGE_HEADER = ("Ubicación", "Producto", "Código", "BODEGA GENERAL BARI",
+               "Consignacion A", "Consignacion B 2024", "consignaciones c:")
+DUP_HEADER  = ("Ubicación", "Producto", "Código", "BODEGA GENERAL BARI",
+               "Consignacion A 1", "Consignacion B", "Consignacion A 2")
+EDGE_CASES = {
+    'blank_mid':  (EDGE_HEADER, [("x", "Zeta", "978111/H", 1, 5, 0, 0), (None,) * 7,
+                                 ("x", "Alfa", "9782222222222", 0, 3, 2, "1")]),
+    'blank_tail': (EDGE_HEADER, [("x", "Zeta", "978111/H", 1, 5, 0, 0), ("x", "Alfa", 9782222222222, 0, 3, 2, 1),
+                                 (None,) * 7, (None,) * 7]),
+    'na_float':   (EDGE_HEADER, [("x", "Beta", 9781.5, 1, 5.5, 0, "NA"), ("x", None, "978", 0, 3, 2, 1),
+                                 ("x", "Alfa", 12, -1, 3, 2, 1), ("x", "N/A", 13, 0, 4, None, None)]),
+    'numstr':     (EDGE_HEADER, [("x", "b", " 12 ", "3", "7", 0, 0), ("x", "a", "0012", 0, "3", 2, 1)]),
+    'intprod':    (EDGE_HEADER, [("x", 1984, "1", 0, 5, 0, 0), ("x", 12, "2", 0, 3, 2, 1)]),
+    'no_lines':   (EDGE_HEADER, [("x", "a", "1", 5, 1, 1, 1)]),
+    'bool':       (EDGE_HEADER, [("x", "a", "1", 0, True, 1, 1), ("x", "b", "2", 0, False, True, 1),
+                                 ("x", "c", "3", -1, True, 2, False)]),
+    'errors':     (EDGE_HEADER, [("x", "a", "#N/A", 0, "#DIV/0!", 1, 1), ("x", "b", "2", 0, 2, 1, 1)]),
+    'dup':        (DUP_HEADER,  [("x", "b", "1", 0, 5, 1, 2), ("x", "a", "2", 0, 3, 0, 4),
+                                 ("x", "b", "3", 1, 0, 7, 9), ("x", None, "4", 0, 2, 2, 2)]),
+    'dup_float':  (DUP_HEADER,  [("x", "b", "1", 0, 5, 1.5, 2), ("x", "a", "2", 0, 3, 0, 4),
+                                 ("x", "b", "3", 1, 0, 7, "NA")]),
+}
+
+
+class StreamingEngineTests(MediaTestCase):
+    """split_master_stream y split_master_loop deben dar lo mismo que split_master sobre read_master."""
+
+    def assertSameTables(self, full):
+        expected_nd, loop_nd, stream_nd = [], [], []
+        expected = list(split_master(read_master(full), expected_nd))
+        for label, got, nd in (
+            ('loop',      list(split_master_loop(read_master(full), loop_nd)), loop_nd),
+            ('streaming', list(split_master_stream(full, stream_nd)), stream_nd),
+        ):
+            self.assertEqual([n for n, _ in got], [n for n, _ in expected], label)
+            self.assertEqual(nd, expected_nd, label)
+            for (name, a), (_, b) in zip(expected, got):
+                pd.testing.assert_frame_equal(b.reset_index(drop=True), a.reset_index(drop=True),
+                                              obj=f"{label} {name}")
+
+    def test_synthetic_master(self):
+        full = self.write('temp/sintetico.xlsx')
+        write_synthetic_master(full, rows=2_000, editorials=15)
+        self.assertSameTables(full)
+
+    def test_edge_cases(self):
+        for case, (header, rows) in EDGE_CASES.items():
+            with self.subTest(case=case):
+                full = self.write(f'temp/{case}.xlsx')
+                write_master(full, header, rows)
+                self.assertSameTables(full)
+
+
+class MasterFormatsTests(MediaTestCase):
+    """Las exportaciones CSV y Parquet del ERP dan las mismas liquidaciones que el .xlsx."""
+
+    def tables(self, full):
+        return list(split_master(read_master(full)))
+
+    def test_csv_and_parquet_match_xlsx(self):
+        xlsx     = self.write('temp/maestro.xlsx')
+        write_synthetic_master(xlsx, rows=1_000, editorials=8)
+        expected = self.tables(xlsx)
+        for fmt in ('csv', 'parquet'):
+            with self.subTest(fmt=fmt):
+                full = self.write(f'temp/maestro.{fmt}')
+                write_synthetic_master(full, rows=1_000, editorials=8, fmt=fmt)
+                got = self.tables(full)
+                self.assertEqual([n for n, _ in got], [n for n, _ in expected])
+                for (name, a), (_, b) in zip(expected, got):
+                    pd.testing.assert_frame_equal(b.reset_index(drop=True), a.reset_index(drop=True), obj=name)
+
+
+class TemplateTests(MediaTestCase):
+
+    def test_editing_the_template_changes_fingerprint_and_letterhead(self):
+        path = os.path.join(self.media, 'plantilla.xlsx')
+        df   = export_df([4, 3], ['Libro A', 'Libro B'], ['1', '2'])
+
+        def render():
+            fp = render_cache.fingerprint(df, 'PLANETA', CONTACT, '', 'write_only')
+            ws = openpyxl.load_workbook(io.BytesIO(create_export_excel_write_only(df, 'PLANETA', None, CONTACT))).active
+            return fp, ws['B3'].value
+
+        with override_settings(CONSIGNACIONES_TEMPLATE_PATH=path):
+            sk = Skeleton.default()
+            sk.cells[(3, 2)] = ('Cliente de antes', sk.cells[(3, 2)][1])
+            sk.save(path)
+            before = render()
+            self.assertEqual(before[1], 'Cliente de antes')
+
+            sk.cells[(3, 2)] = ('Cliente nuevo', sk.cells[(3, 2)][1])
+            sk.save(path)
+            t = os.path.getmtime(path) + 10
+            os.utime(path, (t, t))
+            after = render()
+
+        self.assertEqual(after[1], 'Cliente nuevo')
+        self.assertNotEqual(after[0], before[0])
+
+
+class IndexFlowMixin:
+    """Subir un maestro y generar por el formulario de index, como el navegador."""
+
+    index_url = '/consignaciones-atico/'
+
+    def upload(self, content=MASTER_CSV, name='maestro.csv', client=None):
+        resp = (client or self.client).post(self.index_url, {
+            'upload': '1', 'file': SimpleUploadedFile(name, content),
+        })
+        self.assertEqual(resp.status_code, 200)
+        return resp.context['editorial_list']
+
+    def generate_data(self, editorials, contacts=None):
+        data = {
+            'form-TOTAL_FORMS':       len(editorials),
+            'form-INITIAL_FORMS':     len(editorials),
+            'generate_liquidaciones': '1',
+        }
+        for i, ed in enumerate(editorials):
+            data[f'form-{i}-editorial'] = ed
+            for field, value in (contacts or {}).get(ed, {}).items():
+                data[f'form-{i}-{field}'] = value
+        return data
+
+    def generate(self, editorials, contacts=None, client=None):
+        """POST de generar sin jobs en segundo plano: (respuesta, ZipFile)."""
+        with mock.patch.object(views, 'BACKGROUND_JOBS', False):
+            resp = (client or self.client).post(self.index_url, self.generate_data(editorials, contacts))
+        self.assertEqual(resp.status_code, 200)
+        return resp, zipfile.ZipFile(io.BytesIO(b''.join(resp.streaming_content)))
+
+    def flashed(self):
+        return [str(m) for m in self.client.get(self.index_url).context['messages']]
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class RenderCacheReuseTests(IndexFlowMixin, MediaTestCase):
+
+    def test_one_changed_contact_renders_one_workbook(self):
+        full = self.write('maestro.csv')
+        write_synthetic_master(full, rows=300, editorials=5, fmt='csv')
+        with open(full, 'rb') as f:
+            content = f.read()
+        editorials = self.upload(content)
+        n        = len(editorials)
+        contacts = {ed: {'PROVEEDOR': f'Proveedor {ed}'} for ed in editorials}
+
+        _, first = self.generate(editorials, contacts)
+        self.assertEqual(self.flashed(), [f"Liquidaciones reutilizadas sin cambios: 0; generadas de nuevo: {n}."])
+
+        self.upload(content)
+        contacts[editorials[2]] = {'PROVEEDOR': 'Otro proveedor'}
+        with mock.patch.object(views, 'render_liquidacion', wraps=views.render_liquidacion) as rendered:
+            _, second = self.generate(editorials, contacts)
+        self.assertEqual(self.flashed(), [f"Liquidaciones reutilizadas sin cambios: {n - 1}; generadas de nuevo: 1."])
+        self.assertEqual([c.args[1] for c in rendered.call_args_list], [editorials[2]])
+
+        changed = views.liquidacion_filename(editorials[2])
+        for name in first.namelist():
+            same = sheet_snapshot(first.read(name)) == sheet_snapshot(second.read(name))
+            self.assertEqual(same, name != changed, name)
+
+    def test_cache_preview_matches_the_render(self):
+        tables   = list(split_master(synthetic_master_df(rows=300, editorials=4)))
+        contacts = {name: CONTACT for name, _ in tables}
+        stats    = {}
+        list(views.render_liquidaciones(tables, None, contacts, 0, stats))
+        contacts[tables[0][0]] = {**CONTACT, 'PAGO': 'contado'}
+        preview = views.cache_preview(tables, None, contacts)
+        list(views.render_liquidaciones(tables, None, contacts, 0, stats))
+        self.assertEqual(preview, stats)
+        self.assertEqual(stats, {'hits': len(tables) - 1, 'misses': 1})
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class EditorialEndpointsTests(IndexFlowMixin, MediaTestCase):
+
+    master = (
+        "Codigo,Producto,BODEGA GENERAL BARI,Consignacion PLANETA,Consignacion ZIGZAG,Consignacion VACIA\n"
+        "9780001,Libro A,1,5,0,0\n"
+        "9780002,Libro B,0,3,2,0\n"
+        "9780003,Libro C,4,4,9,1\n"
+    ).encode()
+
+    def setUp(self):
+        save_contacts({'PLANETA': {'PROVEEDOR': 'Planeta SA'}})
+        self.editorials = self.upload(self.master)
+
+    def url(self, editorial):
+        return f'/consignaciones-atico/editoriales/{editorial}/'
+
+    def test_rows_match_editorial_counts(self):
+        rows = self.client.get('/consignaciones-atico/editoriales/').json()['editoriales']
+        df   = read_master(io.BytesIO(self.master))
+        self.assertEqual([(r['editorial'], r['rows']) for r in rows], editorial_counts(df))
+        self.assertEqual([r['editorial'] for r in rows if r['download_url'] is None], ['VACIA'])
+
+    def test_download_matches_the_zip_entry(self):
+        resp = self.client.get(self.url('PLANETA'))
+        self.assertEqual(resp.status_code, 200)
+        _, zf = self.generate(self.editorials, {'PLANETA': {'PROVEEDOR': 'Planeta SA'}})
+        self.assertEqual(sheet_snapshot(resp.content),
+                         sheet_snapshot(zf.read(views.liquidacion_filename('PLANETA'))))
+
+    def test_etag_follows_the_contact(self):
+        etag = self.client.get(self.url('PLANETA'))['ETag']
+        self.assertEqual(self.client.get(self.url('PLANETA'))['ETag'], etag)
+        save_contacts({'PLANETA': {'PROVEEDOR': 'Planeta Chile'}})
+        self.assertNotEqual(self.client.get(self.url('PLANETA'))['ETag'], etag)
+
+    def test_if_none_match_skips_the_render(self):
+        etag = self.client.get(self.url('PLANETA'))['ETag']
+        with mock.patch.object(views, 'render_liquidaciones') as rendered:
+            resp = self.client.get(self.url('PLANETA'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+        rendered.assert_not_called()
+
+    def test_unknown_or_empty_editorial(self):
+        self.assertEqual(self.client.get(self.url('NOEXISTE')).status_code, 404)
+        self.assertEqual(self.client.get(self.url('VACIA')).status_code, 404)
+
+    def test_without_a_master_in_session(self):
+        self.client.get(self.index_url)   # el GET inicial limpia la sesión
+        self.assertEqual(self.client.get('/consignaciones-atico/editoriales/').status_code, 404)
+        self.assertEqual(self.client.get(self.url('PLANETA')).status_code, 404)
+
+
+def reference_diff(old, new):
+    """
+    master_diff fila a fila: {(ISBN, editorial): Estado} de los pares cuya
+    consignación o unidades a liquidar cambiaron.
+    """
+    def positions(df):
+        out = {}
+        for _, r in df.iterrows():
+            isbn = str(r['Codigo']).split('/')[0][:13]
+            for col in consign_columns(df.columns):
+                cons  = float(r[col]) if pd.notna(r[col]) else 0.0
+                bod   = r[BODEGA_COL]
+                units = cons - bod if pd.notna(bod) and bod >= 0 and cons - bod > 0 else 0.0
+                c, u  = out.get((isbn, editorial_name(col)), (0.0, 0.0))
+                out[(isbn, editorial_name(col))] = (c + cons, u + units)
+        return out
+
+    a, b = positions(old), positions(new)
+    isbns_a, isbns_b = {k[0] for k in a}, {k[0] for k in b}
+    return {
+        k: diff.NEW if k[0] not in isbns_a else diff.REMOVED if k[0] not in isbns_b else diff.CHANGED
+        for k in a.keys() | b.keys() if a.get(k, (0.0, 0.0)) != b.get(k, (0.0, 0.0))
+    }
+
+
+class MasterDiffTests(IndexFlowMixin, MediaTestCase):
+
+    def changes(self, old, new):
+        _, changes = diff.master_diff(old, new)
+        return dict(zip(zip(changes['ISBN'], changes['Editorial']), changes['Estado']))
+
+    def test_matches_row_by_row_reference(self):
+        old = synthetic_master_df(rows=600, editorials=5, seed=1)
+        new = old.copy()
+        rng = np.random.default_rng(2)
+        for i, col in zip(rng.choice(len(new), 40, replace=False), consign_columns(new.columns) * 8):
+            new.at[i, col] = int(rng.integers(0, 45))
+        new.loc[rng.choice(len(new), 10, replace=False), BODEGA_COL] = 0
+        new = pd.concat([new.iloc[6:], synthetic_master_df(rows=6, editorials=5, seed=3)], ignore_index=True)
+
+        expected = reference_diff(old, new)
+        self.assertEqual(self.changes(old, new), expected)
+        self.assertEqual(set(expected.values()), {diff.NEW, diff.REMOVED, diff.CHANGED})
+
+    def test_duplicate_isbn_rows_and_editorial_columns_are_summed(self):
+        old = read_master(io.BytesIO((
+            "Codigo,Producto,BODEGA GENERAL BARI,Consignacion PLANETA 1,Consignacion PLANETA 2\n"
+            "9780001,Libro A,0,2,1\n"
+            "9780001/X,Libro A,0,1,0\n"
+            "9780002,Libro B,0,3,0\n"
+        ).encode()))
+        new = read_master(io.BytesIO((
+            "Codigo,Producto,BODEGA GENERAL BARI,Consignacion PLANETA\n"
+            "9780001,Libro A,0,4\n"
+            "9780002,Libro B,0,5\n"
+        ).encode()))
+        summary, changes = diff.master_diff(old, new)
+        self.assertEqual(changes[['ISBN', 'Estado', 'Consignación anterior', 'Consignación actual']].values.tolist(),
+                         [['9780002', diff.CHANGED, 3.0, 5.0]])
+        self.assertEqual(self.changes(old, new), reference_diff(old, new))
+        self.assertEqual(list(summary.columns), diff.SUMMARY_COLS)
+        self.assertEqual(summary.loc[0, ['Editorial', 'ISBN con cambios', 'Consignación anterior', 'Consignación actual']].tolist(),
+                         ['PLANETA', 1, 7.0, 9.0])
+
+    def test_non_numeric_consignacion_is_a_format_error(self):
+        old = read_master(io.BytesIO(MASTER_CSV))
+        new = read_master(io.BytesIO(MASTER_CSV.replace(b'9780002,Libro B,0,3,2', b'9780002,Libro B,0,3,abc')))
+        with self.assertRaisesMessage(MasterFormatError, 'Consignacion ZIGZAG'):
+            diff.master_diff(old, new)
+
+        resp = self.client.post('/consignaciones-atico/diferencias/', {
+            'anterior': SimpleUploadedFile('anterior.csv', MASTER_CSV),
+            'actual':   SimpleUploadedFile('actual.csv', new.to_csv(index=False).encode()),
+        })
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn('Consignacion ZIGZAG', [str(m) for m in resp.context['messages']][0])
+
+    def test_non_numeric_consignacion_on_generate(self):
+        bad = MASTER_CSV.replace(b'9780002,Libro B,0,3,2', b'9780002,Libro B,0,3,abc')
+        editorials = self.upload(bad)
+        with mock.patch.object(views, 'BACKGROUND_JOBS', False):
+            resp = self.client.post(self.index_url, self.generate_data(editorials))
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn('Consignacion ZIGZAG', [str(m) for m in resp.context['messages']][0])
+        self.assertFalse(LiquidacionRun.objects.exists())
+
+
+class MetricsTests(IndexFlowMixin, MediaTestCase):
+
+    def test_generate_sends_server_timing(self):
+        resp, _ = self.generate(self.upload())
+        stages  = dict(part.split(';dur=') for part in resp['Server-Timing'].split(', '))
+        self.assertLessEqual({'split', 'fingerprint', 'render'}, stages.keys())
+        self.assertTrue(all(float(ms) >= 0 for ms in stages.values()))
+
+    def test_metrics_only_for_staff(self):
+        self.assertEqual(self.client.get('/metrics/').status_code, 302)
+        user = User.objects.create_user('ana', password='x')
+        self.client.force_login(user)
+        self.assertIn(self.client.get('/metrics/').status_code, (302, 403))
+
+        user.is_staff = True
+        user.save()
+        resp = self.client.get('/metrics/')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        self.assertIn('# TYPE consignaciones_stage_seconds histogram', resp.content.decode())
+
+    def test_render_prometheus(self):
+        with mock.patch.object(metrics, '_histograms', {}), mock.patch.object(metrics, '_counters', {}):
+            metrics.observe('split', 0.03)
+            metrics.observe('split', 7.0)
+            metrics.inc('rows_read', 5)
+            metrics.inc('rows_read')
+            lines = metrics.render_prometheus().splitlines()
+        self.assertIn('consignaciones_stage_seconds_bucket{stage="split",le="0.025"} 0', lines)
+        self.assertIn('consignaciones_stage_seconds_bucket{stage="split",le="0.05"} 1', lines)
+        self.assertIn('consignaciones_stage_seconds_bucket{stage="split",le="10.0"} 2', lines)
+        self.assertIn('consignaciones_stage_seconds_bucket{stage="split",le="+Inf"} 2', lines)
+        self.assertIn('consignaciones_stage_seconds_sum{stage="split"} 7.030000', lines)
+        self.assertIn('consignaciones_stage_seconds_count{stage="split"} 2', lines)
+        self.assertIn('# TYPE consignaciones_rows_read_total counter', lines)
+        self.assertIn('consignaciones_rows_read_total 6', lines)
+
+
+def reload_urls():
+    """Vuelve a importar las URLs para que tomen CONSIGNACIONES_ASYNC_VIEWS."""
+    from kliq import urls as root_urls
+    importlib.reload(app_urls)
+    importlib.reload(root_urls)
+    clear_url_caches()
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class AsyncViewsTests(IndexFlowMixin, TransactionTestCase):
+    """
+    Las vistas de async_views con AsyncClient. TransactionTestCase: los hilos
+    del pool de offload usan su propia conexión y tienen que ver lo que
+    escribe la prueba.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media = tempfile.mkdtemp(prefix='consignaciones_test_')
+        cls._overrides = override_settings(MEDIA_ROOT=cls.media, CONSIGNACIONES_ASYNC_VIEWS=True)
+        cls._overrides.enable()
+        reload_urls()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._overrides.disable()
+        reload_urls()
+        shutil.rmtree(cls.media, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+
+    def offloaded(self):
+        return metrics._counters.get('async_offloaded', 0)
+
+    def test_urls_switch_with_the_setting(self):
+        job = '/consignaciones-atico/jobs/00000000-0000-0000-0000-000000000000/'
+        self.assertIs(resolve(job).func, async_views.job_status)
+        self.assertIs(resolve(self.index_url).func, async_views.index)
+        with override_settings(CONSIGNACIONES_ASYNC_VIEWS=False):
+            reload_urls()
+            try:
+                self.assertIs(resolve(job).func, views.job_status)
+                self.assertIs(resolve(self.index_url).func, views.index)
+            finally:
+                reload_urls()
+
+    async def test_upload_and_generate_stream_the_zip(self):
+        before = self.offloaded()
+        resp   = await self.async_client.post(self.index_url, {
+            'upload': '1', 'file': SimpleUploadedFile('maestro.csv', MASTER_CSV),
+        })
+        self.assertEqual(resp.status_code, 200)
+        editorials = resp.context['editorial_list']
+        self.assertEqual(editorials, ['PLANETA', 'ZIGZAG'])
+
+        with mock.patch.object(views, 'BACKGROUND_JOBS', False):
+            resp = await self.async_client.post(self.index_url, self.generate_data(editorials))
+        self.assertTrue(resp.streaming)
+        self.assertTrue(resp.is_async)
+        zf = zipfile.ZipFile(io.BytesIO(b''.join([chunk async for chunk in resp.streaming_content])))
+        self.assertEqual(sorted(zf.namelist()), sorted(views.liquidacion_filename(e) for e in editorials))
+        # las dos vistas y cada bloque del ZIP pasan por el pool
+        self.assertGreater(self.offloaded() - before, 2)
+
+    async def test_job_status_is_native_async(self):
+        job    = await LiquidacionJob.objects.acreate(master_path='temp/a.xlsx', total=4, done=1)
+        before = self.offloaded()
+        resp   = await self.async_client.get(f'/consignaciones-atico/jobs/{job.pk}/')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json(), views.job_payload(job))
+        missing = await self.async_client.get('/consignaciones-atico/jobs/00000000-0000-0000-0000-000000000000/')
+        self.assertEqual(missing.status_code, 404)
+        self.assertEqual(self.offloaded(), before)
+
+
+class UploadStoreTests(MediaTestCase):
+
+    def setUp(self):
+        shutil.rmtree(default_storage.path(uploads.UPLOAD_DIR), ignore_errors=True)
+
+    def stored(self):
+        return sorted(e.name for e in os.scandir(default_storage.path(uploads.UPLOAD_DIR)) if e.is_file())
+
+    def test_same_bytes_same_path(self):
+        digest = hashlib.sha256(MASTER_CSV).hexdigest()
+        first  = uploads.save_upload(SimpleUploadedFile('maestro.CSV', MASTER_CSV))
+        again  = uploads.save_upload(SimpleUploadedFile('otro nombre.csv', MASTER_CSV))
+        self.assertEqual(first, f'temp/{digest}.csv')
+        self.assertEqual(again, first)
+        self.assertEqual(uploads.stored_digest(first), digest)
+        self.assertEqual(self.stored(), [f'{digest}.csv'])
+
+        other = uploads.save_upload(SimpleUploadedFile('maestro.csv', MASTER_CSV + b'9780004,Libro D,0,1,1\n'))
+        self.assertNotEqual(other, first)
+        self.assertEqual(len(self.stored()), 2)
+
+    def test_sweep_by_age_then_least_recently_used(self):
+        self.write('temp/vencido.csv', b'x' * 10, age=7200)
+        self.write('temp/a.csv', b'x' * 10, age=300)
+        self.write('temp/b.csv', b'x' * 10, age=200)
+        self.write('temp/c.csv', b'x' * 10, age=100)
+        self.write('temp/cache/parseado.pkl', b'x' * 100, age=7200)
+
+        self.assertEqual(uploads.sweep(max_age=3600, max_bytes=25), (2, 20))
+        self.assertEqual(self.stored(), ['b.csv', 'c.csv'])
+        self.assertTrue(default_storage.exists('temp/cache/parseado.pkl'))
+
+        uploads.touch('temp/b.csv')   # usado recién: c pasa a ser el más antiguo
+        self.assertEqual(uploads.sweep(max_age=3600, max_bytes=15), (1, 10))
+        self.assertEqual(self.stored(), ['b.csv'])
+
+    def test_sweep_keeps_masters_of_pending_and_running_jobs(self):
+        for status in (LiquidacionJob.PENDING, LiquidacionJob.RUNNING, LiquidacionJob.DONE, LiquidacionJob.FAILED):
+            path = f'temp/{status}.csv'
+            self.write(path, b'x' * 10, age=7200)
+            LiquidacionJob.objects.create(master_path=path, status=status)
+
+        self.assertEqual(uploads.sweep(max_age=3600, max_bytes=0), (2, 20))
+        self.assertEqual(self.stored(), sorted([f'{LiquidacionJob.PENDING}.csv', f'{LiquidacionJob.RUNNING}.csv']))
+
+
+class MasterCacheTests(MediaTestCase):
+
+    def setUp(self):
+        shutil.rmtree(default_storage.path(master_cache.CACHE_DIR), ignore_errors=True)
+
+    def cached(self):
+        return sorted(os.listdir(default_storage.path(master_cache.CACHE_DIR)))
+
+    def test_second_call_skips_the_parse(self):
+        path  = uploads.save_upload(SimpleUploadedFile('maestro.csv', MASTER_CSV))
+        first = master_cache.get_master_df(path)
+        self.assertEqual(self.cached(), [uploads.stored_digest(path) + '.pkl'])
+
+        with mock.patch.object(master_cache, 'read_master', wraps=master_cache.read_master) as parse:
+            again = master_cache.get_master_df(path)
+            # el mismo contenido fuera de temp/<sha256>: la huella se calcula y también acierta
+            self.write('otros/maestro.csv', MASTER_CSV)
+            copy  = master_cache.get_master_df('otros/maestro.csv')
+        parse.assert_not_called()
+        pd.testing.assert_frame_equal(again, first)
+        pd.testing.assert_frame_equal(copy, first)
+
+    def test_unreadable_entry_is_parsed_again(self):
+        path = uploads.save_upload(SimpleUploadedFile('maestro.csv', MASTER_CSV))
+        self.write(f'{master_cache.CACHE_DIR}/{uploads.stored_digest(path)}.pkl', b'no es un pickle')
+        with mock.patch.object(master_cache, 'read_master', wraps=master_cache.read_master) as parse:
+            df = master_cache.get_master_df(path)
+        parse.assert_called_once()
+        pd.testing.assert_frame_equal(df, master_cache.get_master_df(path))
+
+    def test_evict_by_ttl_then_least_recently_used(self):
+        folder = master_cache.CACHE_DIR
+        self.write(f'{folder}/vencida.pkl', b'x' * 10, age=7200)
+        self.write(f'{folder}/a.pkl', b'x' * 10, age=300)
+        self.write(f'{folder}/b.pkl', b'x' * 10, age=200)
+        self.write(f'{folder}/c.pkl', b'x' * 10, age=100)
+        self.write(f'{folder}/c.pkl.1.2.tmp', b'x' * 10, age=7200)   # escritura en curso
+
+        with mock.patch.object(master_cache, 'CACHE_TTL', 3600), \
+             mock.patch.object(master_cache, 'CACHE_MAX_ENTRIES', 2):
+            self.assertEqual(master_cache.evict(), (2, 20))
+            self.assertEqual(self.cached(), ['b.pkl', 'c.pkl', 'c.pkl.1.2.tmp'])
+
+            os.utime(default_storage.path(f'{folder}/b.pkl'))   # lo que hace un acierto
+            self.write(f'{folder}/d.pkl', b'x' * 10, age=50)
+            self.assertEqual(master_cache.evict(), (1, 10))
+            self.assertEqual(self.cached(), ['b.pkl', 'c.pkl.1.2.tmp', 'd.pkl'])
+
+
+def read_excel_like_master(rows=500, seed=0):
+    """Maestro con los dtypes de pd.read_excel: float64 con vacíos y Producto repetido como object."""
+    rng = np.random.default_rng(seed)
+
+    def with_blanks(values):
+        values = values.astype('float64')
+        values[rng.random(rows) < 0.1] = np.nan
+        return values
+
+    return pd.DataFrame({
+        "Codigo":                   [f"978{i:010d}" for i in rng.integers(0, 10**9, rows)],
+        "Producto":                 np.array([f"Libro {i}" for i in range(40)], dtype=object)[rng.integers(0, 40, rows)],
+        BODEGA_COL:                 with_blanks(rng.integers(-2, 20, rows)),
+        "Consignacion PLANETA":     with_blanks(rng.integers(0, 60, rows)),
+        "Consignacion ZIGZAG":      with_blanks(rng.integers(0, 400, rows)),
+        "Consignacion PLANETA 2":   with_blanks(rng.integers(0, 5, rows)),
+    })
+
+
+class CompactDtypesTests(TestCase):
+
+    def test_integer_columns_with_blanks_become_nullable_ints(self):
+        df = compact_dtypes(pd.DataFrame({
+            BODEGA_COL:             [0.0, np.nan, 3.0],
+            "Consignacion A":       [-5.0, np.nan, 120.0],
+            "Consignacion B":       [300.0, np.nan, 1.0],
+            "Consignacion C":       [70_000.0, 1.0, np.nan],
+            "Consignacion D":       [2.0 ** 40, np.nan, 0.0],
+            "Consignacion E":       [1.5, np.nan, 2.0],
+            "Consignacion F":       [np.nan, np.nan, np.nan],
+            "Otra":                 [1.0, 2.0, np.nan],
+        }))
+        self.assertEqual({c: str(t) for c, t in df.dtypes.items()}, {
+            BODEGA_COL:       'Int8',
+            "Consignacion A": 'Int8',
+            "Consignacion B": 'Int16',
+            "Consignacion C": 'Int32',
+            "Consignacion D": 'Int64',
+            "Consignacion E": 'float64',
+            "Consignacion F": 'Int8',
+            "Otra":           'float64',
+        })
+        self.assertEqual(df[BODEGA_COL].tolist(), [0, pd.NA, 3])
+        self.assertEqual(df["Consignacion D"].tolist(), [2 ** 40, pd.NA, 0])
+
+    def test_producto_categorical_below_half_distinct(self):
+        repeated = compact_dtypes(pd.DataFrame({"Producto": ["A", "B", "A", "A", "B", "A"]}))
+        distinct = compact_dtypes(pd.DataFrame({"Producto": ["A", "B", "C", "A", "D", "E"]}))
+        self.assertIsInstance(repeated["Producto"].dtype, pd.CategoricalDtype)
+        self.assertEqual(distinct["Producto"].dtype, object)
+
+    def test_split_master_and_fingerprints_match_uncompacted(self):
+        raw     = read_excel_like_master()
+        compact = compact_dtypes(raw.copy())
+        self.assertIsInstance(compact["Producto"].dtype, pd.CategoricalDtype)
+        self.assertEqual(str(compact["Consignacion ZIGZAG"].dtype), 'Int16')
+
+        expected = list(split_master(raw))
+        got      = list(split_master(compact))
+        self.assertEqual([n for n, _ in got], [n for n, _ in expected])
+        for (name, a), (_, b) in zip(expected, got):
+            pd.testing.assert_frame_equal(b.reset_index(drop=True), a.reset_index(drop=True), obj=name)
+            self.assertEqual(render_cache.fingerprint(b, name, CONTACT, None, 'write_only'),
+                             render_cache.fingerprint(a, name, CONTACT, None, 'write_only'))
@@ -0,0 +1,168 @@
+# WEB/kliq/consignaciones_atico/uploads.py
+"""
+Almacén de maestros subidos (MEDIA_ROOT/temp).
+
+Cada subida se guarda como temp/<sha256><ext>: el hash se calcula mientras
+se copian los chunks, así que subir dos veces el mismo maestro deja un solo
+archivo (y master_cache puede usar el nombre como huella sin volver a leerlo).
+
+Los archivos se borran por antigüedad (CONSIGNACIONES_UPLOAD_MAX_AGE, según
+el mtime, que se renueva en cada uso) y, si el directorio pasa de
+CONSIGNACIONES_UPLOAD_MAX_BYTES, los menos usados primero. Nunca se borra el
+maestro de un LiquidacionJob pendiente o en proceso. La limpieza corre con
+`manage.py limpiar_temp` y, a lo más cada CONSIGNACIONES_UPLOAD_SWEEP_INTERVAL
+segundos, después de una subida (maybe_sweep), junto con la poda de la caché
+de liquidaciones renderizadas (render_cache.evict).
+"""
+import os
+import re
+import time
+import hashlib
+import threading
+
+from django.conf               import settings
+from django.core.files.storage import default_storage
+
+from . import render_cache
+from .fsutil  import remove_file
+from .metrics import inc, log_event
+
+UPLOAD_DIR     = 'temp'
+MAX_AGE        = getattr(settings, 'CONSIGNACIONES_UPLOAD_MAX_AGE', 24 * 60 * 60)
+MAX_BYTES      = getattr(settings, 'CONSIGNACIONES_UPLOAD_MAX_BYTES', 500 * 1024 * 1024)
+SWEEP_INTERVAL = getattr(settings, 'CONSIGNACIONES_UPLOAD_SWEEP_INTERVAL', 5 * 60)
+
+_DIGEST_NAME = re.compile(r'^([0-9a-f]{64})(\.\w{1,10})?$')
+_TMP_SUFFIX  = '.upload.tmp'
+
+_sweep_lock = threading.Lock()
+_last_sweep = 0.0
+
+
+def _upload_dir():
+    path = default_storage.path(UPLOAD_DIR)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _extension(name):
+    ext = os.path.splitext(name or '')[1].lower()
+    return ext if re.fullmatch(r'\.\w{1,10}', ext) else ''
+
+
+def save_upload(f):
+    """
+    Guarda el UploadedFile `f` por chunks() y devuelve su ruta en default_storage
+    (temp/<sha256><ext>). Si ya había un archivo con el mismo contenido, se
+    reutiliza y se descarta la copia nueva.
+    """
+    folder = _upload_dir()
+    tmp    = os.path.join(folder, f".{os.getpid()}.{threading.get_ident()}{_TMP_SUFFIX}")
+    h      = hashlib.sha256()
+    try:
+        with open(tmp, 'wb') as out:
+            for chunk in f.chunks():
+                h.update(chunk)
+                out.write(chunk)
+        name = h.hexdigest() + _extension(f.name)
+        full = os.path.join(folder, name)
+        if os.path.exists(full):
+            os.remove(tmp)
+            os.utime(full)
+            inc('uploads_deduplicated')
+        else:
+            os.replace(tmp, full)
+    except BaseException:
+        remove_file(tmp)
+        raise
+    inc('uploads_stored')
+    return f"{UPLOAD_DIR}/{name}"
+
+
+def stored_digest(path):
+    """sha256 de un archivo guardado por save_upload (sale del nombre); None si no es uno."""
+    folder, name = os.path.split(path)
+    m = _DIGEST_NAME.match(name)
+    return m.group(1) if m and folder == UPLOAD_DIR else None
+
+
+def touch(path):
+    """Marca el archivo como recién usado, para que la limpieza lo conserve."""
+    try:
+        os.utime(default_storage.path(path))
+    except OSError:
+        pass
+
+
+def _in_use():
+    """Maestros que todavía necesita algún LiquidacionJob."""
+    from .models import LiquidacionJob
+    return set(
+        LiquidacionJob.objects
+        .filter(status__in=[LiquidacionJob.PENDING, LiquidacionJob.RUNNING])
+        .values_list('master_path', flat=True)
+    )
+
+
+def sweep(max_age=None, max_bytes=None, now=None):
+    """
+    Borra de temp/ los archivos vencidos y, si el total sigue sobre
+    `max_bytes`, los de uso más antiguo. Las subcarpetas (temp/cache es de
+    master_cache) no se tocan. Devuelve (archivos_borrados, bytes_liberados).
+    """
+    max_age   = MAX_AGE if max_age is None else max_age
+    max_bytes = MAX_BYTES if max_bytes is None else max_bytes
+    now       = now or time.time()
+    keep      = _in_use()
+
+    removed = reclaimed = 0
+    entries = []
+    with os.scandir(_upload_dir()) as it:
+        for entry in it:
+            if not entry.is_file() or f"{UPLOAD_DIR}/{entry.name}" in keep:
+                continue
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            if now - st.st_mtime > max_age:
+                freed = remove_file(entry.path)
+                if freed is not None:
+                    removed   += 1
+                    reclaimed += freed
+            elif not entry.name.endswith(_TMP_SUFFIX):  # subidas en curso
+                entries.append((st.st_mtime, st.st_size, entry.path))
+
+    total = 0
+    for _, size, full in sorted(entries, reverse=True):
+        total += size
+        if total > max_bytes:
+            freed = remove_file(full)
+            if freed is not None:
+                removed   += 1
+                reclaimed += freed
+
+    inc('upload_files_evicted', removed)
+    inc('upload_bytes_reclaimed', reclaimed)
+    log_event('upload_sweep', files=removed, bytes=reclaimed)
+    return removed, reclaimed
+
+
+def maybe_sweep():
+    """
+    sweep() y render_cache.evict() si pasaron SWEEP_INTERVAL segundos desde
+    la última vez en este proceso. Devuelve lo de sweep().
+    """
+    global _last_sweep
+    now = time.monotonic()
+    if now - _last_sweep < SWEEP_INTERVAL or not _sweep_lock.acquire(blocking=False):
+        return None
+    try:
+        _last_sweep = now
+        result = sweep()
+        files, freed = render_cache.evict()
+        inc('render_cache_files_evicted', files)
+        log_event('render_cache_evict', files=files, bytes=freed)
+        return result
+    finally:
+        _sweep_lock.release()
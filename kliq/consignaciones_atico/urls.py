@@ -1,9 +1,31 @@
 # WEB/kliq/consignaciones_atico/urls.py
+from django.conf import settings
 from django.urls import path
-from . import views
+
+# bajo ASGI (kliq/asgi.py), las mismas vistas en versión async
+if getattr(settings, 'CONSIGNACIONES_ASYNC_VIEWS', False):
+    from .async_views import (
+        index, job_status, job_download, editoriales, editorial_download, liquidaciones_api,
+        history_totals, history_runs, history_download, master_diff,
+    )
+else:
+    from .views import (
+        index, job_status, job_download, editoriales, editorial_download,
+        history_totals, history_runs, history_download, master_diff,
+    )
+    from .api   import liquidaciones_api
 
 app_name = 'consignaciones_atico'
 
 urlpatterns = [
-    path('', views.index, name='index'),
+    path('', index, name='index'),
+    path('jobs/<uuid:pk>/',          job_status,   name='job_status'),
+    path('jobs/<uuid:pk>/download/', job_download, name='job_download'),
+    path('api/liquidaciones/',       liquidaciones_api, name='api_liquidaciones'),
+    path('editoriales/',             editoriales,       name='editoriales'),
+    path('editoriales/<path:editorial>/', editorial_download, name='editorial_download'),
+    path('historial/',                             history_totals,   name='history_totals'),
+    path('historial/corridas/',                    history_runs,     name='history_runs'),
+    path('historial/corridas/<int:pk>/descargar/', history_download, name='history_download'),
+    path('diferencias/',                           master_diff,      name='master_diff'),
 ]
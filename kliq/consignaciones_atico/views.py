@@ -1,49 +1,45 @@
-import re
-import json
-import zipfile
-import pandas as pd
-from io import BytesIO
-from openpyxl import Workbook
-from openpyxl.drawing.image import Image as OpenpyxlImage
-from openpyxl.styles import Alignment, Font, Border, Side
-from openpyxl.utils import get_column_letter
-
-import os, json, re, zipfile
+import os, time, itertools
 from io import BytesIO
+from collections        import deque
+from concurrent.futures import ProcessPoolExecutor, Future
 
-import pandas as pd
+import django
 from django import forms
-from django.shortcuts          import render
+from django.shortcuts          import render, get_object_or_404
+from django.urls               import reverse
 from django.conf               import settings
 from django.contrib            import messages
-from django.http               import HttpResponse
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http               import HttpResponse, StreamingHttpResponse, JsonResponse, FileResponse, Http404
 from django.core.files.storage import default_storage
-from django.core.files.base    import ContentFile
+from django.utils.cache         import get_conditional_response, patch_cache_control
+from django.utils.dateparse     import parse_date
 
 from openpyxl import Workbook
 from openpyxl.drawing.image   import Image as OpenpyxlImage
 from openpyxl.styles          import Alignment, Font, Border, Side
 from openpyxl.utils           import get_column_letter
 
-from .forms import UploadFileForm, ContactInfoForm
+from .forms import UploadFileForm, ContactInfoForm, MasterDiffForm
+from .models import LiquidacionJob, LiquidacionRun
+from . import jobs, render_cache, metrics, uploads, history, diff
+from .contacts import load_contacts, save_contacts, contact_info
+from .master_cache import get_master_df, read_master_header
+from .formats      import MasterFormatError
+from .archive      import stream_zip, resolve_strategy
+from .engine       import split_master, consign_columns, editorial_name, editorial_counts, select_editorial
+from .render       import create_export_excel_write_only
+from .streaming    import master_tables
 
 APP_DIR       = os.path.join(settings.BASE_DIR, 'consignaciones_atico')
-CONTACTS_FILE = os.path.join(APP_DIR, 'contact_data.json')
 LOGO_PATH     = os.path.join(APP_DIR, 'static', 'consignaciones_atico', 'logo.png')
 
-def load_contact_data():
-    try:
-        with open(CONTACTS_FILE,'r',encoding='utf-8') as f:
-            return json.load(f)
-    except:
-        return {}
-
-def save_contact_data(data):
-    try:
-        with open(CONTACTS_FILE,'w',encoding='utf-8') as f:
-            json.dump(data,f,indent=4,ensure_ascii=False)
-    except Exception as e:
-        messages.error(None, f"Error guardando contactos: {e}")
+# procesos para renderizar liquidaciones en paralelo (0 o 1 = en el mismo proceso)
+RENDER_WORKERS = getattr(settings, 'CONSIGNACIONES_RENDER_WORKERS', 0)
+# "write_only" (render.py) o "classic" (create_export_excel)
+RENDER_BACKEND = getattr(settings, 'CONSIGNACIONES_RENDER_BACKEND', 'write_only')
+# generar en un LiquidacionJob (jobs.py) en vez de dentro de la petición
+BACKGROUND_JOBS = getattr(settings, 'CONSIGNACIONES_BACKGROUND_JOBS', True)
 
 def load_logo_bytes():
     try:
@@ -52,17 +48,9 @@ def load_logo_bytes():
     except:
         return None
 
-def extract_editoriales(file_bytes):
-    df = pd.read_excel(BytesIO(file_bytes), sheet_name=0, header=5)
-    df.columns = df.columns.str.strip()
-    edits = []
-    for c in df.columns:
-        if re.search(r'consignacion', c, re.IGNORECASE):
-            ed = re.sub(r'(?i)consignacion(es)?','',c)
-            ed = re.sub(r'\s+',' ',ed)
-            ed = re.sub(r'[:]+','',ed)
-            ed = re.sub(r'[0-9-]+','',ed)
-            edits.append(ed.strip().upper() or 'SIN EDITORIAL')
+def extract_editoriales(columns):
+    """Editoriales (ordenadas, sin repetir) a partir de los encabezados del maestro."""
+    edits = [editorial_name(c) for c in consign_columns(columns)]
     return sorted(set(edits))
 
 # — Asegúrate de copiar aquí EXACTAMENTE create_export_excel(...) y process_master_file(...) de tu lógica OpenPyXL —
@@ -177,66 +165,131 @@ def create_export_excel(df, editorial, logo_content=None, contact_info=None):
 
     # Serializar a bytes
     out = BytesIO()
-    wb.save(out)
+    with metrics.timer('save', rows=len(df)):
+        wb.save(out)
     return out.getvalue()
 
-def process_master_file(file_bytes, logo_content=None, contact_infos=None):
+RENDERERS = {
+    'classic':    create_export_excel,
+    'write_only': create_export_excel_write_only,
+}
+
+def liquidacion_filename(name):
+    return f"Liquidacion_Consignaciones_{name}.xlsx"
+
+def render_liquidacion(export_df, name, logo_content=None, contact_info=None):
+    """Renderiza una editorial y devuelve (nombre.xlsx, bytes_contenido)."""
+    renderer    = RENDERERS[RENDER_BACKEND]
+    # "render" incluye el wb.save, que además se mide aparte como "save"
+    with metrics.timer('render', editorial=name, rows=len(export_df)):
+        excel_bytes = renderer(export_df, name, logo_content, contact_info)
+    return liquidacion_filename(name), excel_bytes
+
+def _done(result):
+    f = Future()
+    f.set_result(result)
+    return f
+
+def render_liquidaciones(tables, logo_content=None, contact_infos=None, workers=None, cache_stats=None):
+    """
+    Renderiza los pares (editorial, DataFrame) de split_master y produce
+    (nombre.xlsx, bytes_contenido) de a uno, en el mismo orden.
+    Las tablas se consumen de a una: se calcula su huella (filas, contacto,
+    logo, renderizador) y, si ya está en render_cache, se reutiliza sin
+    renderizar. `cache_stats`, si se pasa, va sumando {'hits': n, 'misses': m}
+    a medida que avanza; queda completo al agotar el generador.
+    Con `workers` > 1 (por defecto settings.CONSIGNACIONES_RENDER_WORKERS) el
+    renderizado se reparte entre procesos; la salida y su orden no cambian.
+    A cada proceso solo viajan la tabla filtrada, el contacto y el logo, y
+    como mucho hay 2*workers liquidaciones en vuelo (ni más tablas en memoria).
+    """
+    workers   = RENDER_WORKERS if workers is None else workers
+    logo_hash = render_cache.logo_digest(logo_content)
+    if cache_stats is None:
+        cache_stats = {}
+    cache_stats.update(hits=0, misses=0)
+
+    t0        = time.perf_counter()
+    rows      = 0
+    pool      = None
+    in_flight = 2 * max(workers or 1, 1)
+    pending   = deque()
+
+    def collect():
+        fp, hit, fut = pending.popleft()
+        filename, content = fut.result()
+        if not hit:
+            render_cache.put(fp, content)
+        return filename, content
+
+    try:
+        for name, export_df in tables:
+            # recuperamos contacto para esta editorial
+            ci = contact_infos.get(name, {}) if contact_infos else {}
+            with metrics.timer('fingerprint'):
+                fp = render_cache.fingerprint(export_df, name, ci, logo_hash, RENDER_BACKEND)
+            rows   += len(export_df)
+            content = render_cache.get(fp)
+            hit     = content is not None
+            cache_stats['hits' if hit else 'misses'] += 1
+            if hit:
+                fut = _done((liquidacion_filename(name), content))
+            elif workers and workers > 1:
+                if pool is None:
+                    pool = ProcessPoolExecutor(max_workers=workers, initializer=django.setup)
+                fut = pool.submit(render_liquidacion, export_df, name, logo_content, ci)
+            else:
+                fut = _done(render_liquidacion(export_df, name, logo_content, ci))
+            pending.append((fp, hit, fut))
+            if len(pending) >= in_flight:
+                yield collect()
+        while pending:
+            yield collect()
+    finally:
+        if pool:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    metrics.inc('liquidaciones_rendered', cache_stats['misses'])
+    metrics.inc('liquidaciones_reused',   cache_stats['hits'])
+    metrics.log_event(
+        'liquidaciones',
+        editorials=cache_stats['hits'] + cache_stats['misses'],
+        rows=rows,
+        cache_hits=cache_stats['hits'],
+        cache_misses=cache_stats['misses'],
+        workers=workers or 0,
+        seconds=f"{time.perf_counter() - t0:.3f}",
+    )
+
+def process_master_file(df, logo_content=None, contact_infos=None, no_data_editorials=None, workers=None):
     """
-    Procesa el maestro (bytes) y devuelve:
-      - output_files: dict {nombre.xlsx: bytes_contenido}
-      - no_data_editorials: lista de editoriales sin datos a liquidar
+    Procesa el maestro (DataFrame ya limpio, ver master_cache.read_master).
+    Es un generador: produce un par (nombre.xlsx, bytes_contenido) por editorial,
+    de a uno, para no mantener todas las liquidaciones en memoria.
+    Si se pasa la lista `no_data_editorials`, se le agregan las editoriales
+    sin datos a liquidar.
     """
-    # 1) Leemos de bytes
-    df = pd.read_excel(BytesIO(file_bytes), sheet_name=0, header=5)
-    df.columns = df.columns.str.strip()
-    if "Código" in df.columns:
-        df.rename(columns={"Código": "Codigo"}, inplace=True)
-
-    # 2) Detectamos columnas de consignación
-    consign_cols = [c for c in df.columns if re.search(r'consignacion', c, re.IGNORECASE)]
-    output_files       = {}
-    no_data_editorials = []
-
-    for col in consign_cols:
-        # limpiamos nombre editorial
-        name = re.sub(r'(?i)consignacion(es)?', '', col)
-        name = re.sub(r'\s+', ' ', name)
-        name = re.sub(r'[:]+', '', name)
-        name = re.sub(r'[0-9-]+', '', name)
-        name = (name.strip().upper() or "SIN EDITORIAL")
-
-        # chequeo columnas necesarias
-        required = ["Producto", "Codigo", "BODEGA GENERAL BARI"]
-        if not all(x in df.columns for x in required):
-            # faltan columnas -> devolvemos vacío
-            return {}, []
-
-        # construimos temp_df
-        temp = df[["Producto", "Codigo", "BODEGA GENERAL BARI", col]].copy()
-        temp.rename(columns={col: "Consignaciones"}, inplace=True)
-        temp = temp[temp["BODEGA GENERAL BARI"] >= 0]
-        temp["Unidades a liquidar"] = temp["Consignaciones"] - temp["BODEGA GENERAL BARI"]
-        temp = temp[temp["Unidades a liquidar"] > 0]
-        temp = temp.sort_values("Producto")
-
-        if temp.empty:
-            no_data_editorials.append(name)
-            continue
-
-        export_df = temp[["Unidades a liquidar", "Producto", "Codigo"]].copy()
-        export_df.rename(columns={"Codigo": "ISBN"}, inplace=True)
-        export_df["ISBN"] = export_df["ISBN"].astype(str).apply(lambda x: x.split("/")[0][:13])
-
-        # recuperamos contacto para esta editorial
-        ci = contact_infos.get(name, {}) if contact_infos else {}
-        excel_bytes = create_export_excel(export_df, name, logo_content, ci)
-        filename    = f"Liquidacion_Consignaciones_{name}.xlsx"
-        output_files[filename] = excel_bytes
-
-    return output_files, no_data_editorials
+    tables = split_master(df, no_data_editorials)
+    yield from render_liquidaciones(tables, logo_content, contact_infos, workers)
+
+
+def cache_preview(tables, logo_content=None, contact_infos=None):
+    """{'hits': n, 'misses': m}: cuántas de `tables` ya están en render_cache, antes de renderizar."""
+    logo_hash = render_cache.logo_digest(logo_content)
+    hits = sum(
+        render_cache.cached(render_cache.fingerprint(
+            export_df, name, (contact_infos or {}).get(name, {}), logo_hash, RENDER_BACKEND,
+        ))
+        for name, export_df in tables
+    )
+    return {'hits': hits, 'misses': len(tables) - hits}
 
 
+def cache_message(stats):
+    return (f"Liquidaciones reutilizadas sin cambios: {stats.get('hits', 0)}; "
+            f"generadas de nuevo: {stats.get('misses', 0)}.")
 
+@metrics.server_timing
 def index(request):
     # FASE 0: al GET inicial, limpiamos la sesión
     if request.method == 'GET':
@@ -248,18 +301,27 @@ def index(request):
     # FASE 1: subir Excel
     if request.method=='POST' and 'upload' in request.POST and upload_form.is_valid():
         f = upload_form.cleaned_data['file']
-        temp_path = default_storage.save('temp/'+f.name, ContentFile(f.read()))
-        request.session['uploaded_file_path'] = temp_path
-
-        # reconstruimos lista de editoriales y formset inicial
-        bytes_ = default_storage.open(temp_path).read()
-        editorial_list = extract_editoriales(bytes_)
-        initial = []
-        for ed in editorial_list:
-            d = load_contact_data().get(ed, {}).copy()
-            d['editorial'] = ed
-            initial.append(d)
-        formset = ContactFS(initial=initial)
+        # se copia por chunks() a temp/<sha256>: nunca está completo en
+        # memoria y el mismo maestro subido dos veces ocupa un solo archivo
+        temp_path = uploads.save_upload(f)
+        # el mismo maestro otra vez no vuelve a escribir la sesión en la base
+        if request.session.get('uploaded_file_path') != temp_path:
+            request.session['uploaded_file_path'] = temp_path
+        uploads.maybe_sweep()
+
+        # para el formset basta la fila de encabezados; el maestro completo
+        # se parsea (una vez, vía get_master_df) recién al generar
+        try:
+            editorial_list = extract_editoriales(read_master_header(temp_path))
+        except MasterFormatError as e:
+            request.session.pop('uploaded_file_path', None)
+            messages.error(request, str(e))
+            return render(request, 'consignaciones_atico/index.html', {
+                'upload_form': upload_form,
+            })
+        contacts = load_contacts()
+        initial  = [{**contacts.get(ed, {}), 'editorial': ed} for ed in editorial_list]
+        formset  = ContactFS(initial=initial)
 
         return render(request, 'consignaciones_atico/index.html', {
             'upload_form':    upload_form,
@@ -271,16 +333,13 @@ def index(request):
     stored = request.session.get('uploaded_file_path')
     editorial_list = []
     if stored and default_storage.exists(stored):
-        bytes_ = default_storage.open(stored).read()
-        editorial_list = extract_editoriales(bytes_)
+        uploads.touch(stored)
+        editorial_list = extract_editoriales(read_master_header(stored))
 
     # preparamos el formset ligado a POST o con initial si es GET post-upload
-    initial = []
-    for ed in editorial_list:
-        d = load_contact_data().get(ed, {}).copy()
-        d['editorial'] = ed
-        initial.append(d)
-    formset = ContactFS(request.POST or None, initial=initial)
+    contacts = load_contacts() if editorial_list else {}
+    initial  = [{**contacts.get(ed, {}), 'editorial': ed} for ed in editorial_list]
+    formset  = ContactFS(request.POST or None, initial=initial)
 
     # FASE 2: guardar contactos
     if request.method=='POST' and 'save_contacts' in request.POST:
@@ -290,7 +349,7 @@ def index(request):
                 cd = frm.cleaned_data
                 ed = cd.pop('editorial')
                 newd[ed] = cd
-            save_contact_data(newd)
+            save_contacts(newd)
             messages.success(request, "Contactos guardados correctamente.")
         else:
             messages.error(request, "Corrige los errores de contacto antes de guardar.")
@@ -307,6 +366,8 @@ def index(request):
             messages.error(request, "Debes procesar primero el archivo.")
         elif not formset.is_valid():
             messages.error(request, "Corrige los errores de contacto antes de generar.")
+        elif not _valid_compression(request):
+            messages.error(request, "Compresión no válida: use stored, deflate, deflate-N o parallel.")
         else:
             ci = {
                 frm.cleaned_data['editorial']: {
@@ -319,10 +380,41 @@ def index(request):
                 }
                 for frm in formset
             }
-            logo = load_logo_bytes()
-            files, _ = process_master_file(bytes_, logo, ci)
+            # en segundo plano: la página consulta el avance en job_status
+            if BACKGROUND_JOBS:
+                job = jobs.enqueue(stored, ci)
+                return render(request, 'consignaciones_atico/index.html', {
+                    'upload_form':    upload_form,
+                    'formset':        formset,
+                    'editorial_list': editorial_list,
+                    'job':            job,
+                })
 
-            if not files:
+            # la corrida queda en el historial cuando sale la última liquidación del ZIP
+            rec    = history.Recording(LiquidacionRun.WEB, stored, ci)
+            logo   = load_logo_bytes()
+            # las tablas pesan lo que las liquidaciones: se arman antes del
+            # ZIP para avisar cuántas se reutilizan de render_cache
+            try:
+                tables = list(rec.tables(master_tables(stored)))
+            except MasterFormatError as e:
+                rec.discard()
+                messages.error(request, str(e))
+                return render(request, 'consignaciones_atico/index.html', {
+                    'upload_form':    upload_form,
+                    'formset':        formset,
+                    'editorial_list': editorial_list,
+                })
+            except BaseException:
+                rec.discard()
+                raise
+            if tables:
+                messages.info(request, cache_message(cache_preview(tables, logo, ci)))
+            files  = rec.files(render_liquidaciones(tables, logo, ci))
+
+            # adelantamos la primera liquidación para saber si hay algo que enviar
+            first = next(files, None)
+            if first is None:
                 messages.error(request, "No se generaron liquidaciones.")
                 return render(request, 'consignaciones_atico/index.html', {
                     'upload_form':    upload_form,
@@ -330,11 +422,10 @@ def index(request):
                     'editorial_list': editorial_list,
                 })
 
-            buf = BytesIO()
-            with zipfile.ZipFile(buf,'w',zipfile.ZIP_DEFLATED) as zp:
-                for name,content in files.items():
-                    zp.writestr(name,content)
-            resp = HttpResponse(buf.getvalue(), content_type='application/zip')
+            resp = StreamingHttpResponse(
+                stream_zip(itertools.chain([first], files), *_compression(request)),
+                content_type='application/zip',
+            )
             resp['Content-Disposition'] = 'attachment; filename=Liquidaciones.zip'
             return resp
 
@@ -344,3 +435,198 @@ def index(request):
         'formset':        formset,
         'editorial_list': editorial_list,
     })
+
+def _compression(request):
+    """(estrategia, nivel) del ZIP pedidos con `compression` y `level` (POST o GET)."""
+    params = request.POST if request.method == 'POST' else request.GET
+    return resolve_strategy(
+        params.get('compression') or request.GET.get('compression'),
+        params.get('level') or request.GET.get('level'),
+    )
+
+def _valid_compression(request):
+    try:
+        _compression(request)
+    except ValueError:
+        return False
+    return True
+
+def _session_master(request):
+    """Maestro subido en esta sesión (fase 1); 404 si no hay."""
+    stored = request.session.get('uploaded_file_path')
+    if not stored or not default_storage.exists(stored):
+        raise Http404("Debes procesar primero el archivo.")
+    uploads.touch(stored)
+    return stored
+
+def editoriales(request):
+    """Editoriales del maestro en sesión con sus filas a liquidar, en JSON."""
+    df = get_master_df(_session_master(request))
+    return JsonResponse({'editoriales': [
+        {
+            'editorial':    name,
+            'rows':         rows,
+            'download_url': reverse('consignaciones_atico:editorial_download', args=[name]) if rows else None,
+        }
+        for name, rows in editorial_counts(df)
+    ]})
+
+def editorial_download(request, editorial):
+    """
+    Liquidación de una sola editorial del maestro en sesión. El ETag es la
+    huella de render_cache (filas, contacto, logo, renderizador): si no cambió,
+    responde 304 sin renderizar ni leer el .xlsx guardado.
+    """
+    df    = get_master_df(_session_master(request))
+    table = next(split_master(select_editorial(df, editorial)), None)
+    if table is None:
+        raise Http404("La editorial no tiene datos a liquidar.")
+
+    name, export_df = table
+    logo = load_logo_bytes()
+    ci   = contact_info(load_contacts().get(name, {}))
+    etag = '"%s"' % render_cache.fingerprint(export_df, name, ci, render_cache.logo_digest(logo), RENDER_BACKEND)
+
+    resp = get_conditional_response(request, etag=etag)
+    if resp is None:
+        filename, content = next(render_liquidaciones([table], logo, {name: ci}))
+        resp = HttpResponse(content, content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        resp['Content-Disposition'] = f'attachment; filename="{filename}"'
+    resp['ETag'] = etag
+    patch_cache_control(resp, private=True, no_cache=True)
+    return resp
+
+def master_diff(request):
+    """
+    Compara dos maestros subidos (anterior y actual) y devuelve un .xlsx con
+    los cambios de consignación y de unidades a liquidar por editorial.
+    """
+    form = MasterDiffForm(request.POST or None, request.FILES or None)
+    if request.method == 'POST' and form.is_valid():
+        old = uploads.save_upload(form.cleaned_data['anterior'])
+        new = uploads.save_upload(form.cleaned_data['actual'])
+        uploads.maybe_sweep()
+        try:
+            summary, changes = diff.master_diff(get_master_df(old), get_master_df(new))
+        except MasterFormatError as e:
+            messages.error(request, str(e))
+        else:
+            if not len(changes):
+                messages.info(request, "Los maestros no tienen diferencias de consignación.")
+            else:
+                resp = HttpResponse(
+                    diff.diff_workbook(summary, changes),
+                    content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                )
+                resp['Content-Disposition'] = 'attachment; filename="Diferencias_Maestros.xlsx"'
+                return resp
+    return render(request, 'consignaciones_atico/diferencias.html', {'form': form})
+
+def job_payload(job):
+    """Avance de un LiquidacionJob como dict para JSON."""
+    return {
+        'id':           str(job.pk),
+        'status':       job.status,
+        'done':         job.done,
+        'total':        job.total,
+        'no_data':      job.no_data,
+        'cache_hits':   job.cache_hits,
+        'cache_misses': job.cache_misses,
+        'error':        job.error,
+        'download_url': reverse('consignaciones_atico:job_download', args=[job.pk])
+                        if job.status == LiquidacionJob.DONE else None,
+    }
+
+def job_status(request, pk):
+    """Avance de un LiquidacionJob en JSON, para el polling de la página."""
+    job = get_object_or_404(LiquidacionJob, pk=pk)
+    return JsonResponse(job_payload(job))
+
+def _history_date(request, param):
+    value = request.GET.get(param)
+    if not value:
+        return None
+    date = parse_date(value)
+    if date is None:
+        raise ValueError(f"{param} debe ser una fecha AAAA-MM-DD")
+    return date
+
+def _history_filters(request):
+    """(desde, hasta, editorial) de los parámetros GET; ValueError si una fecha no es válida."""
+    return _history_date(request, 'desde'), _history_date(request, 'hasta'), request.GET.get('editorial') or None
+
+def history_totals(request):
+    """
+    Totales del historial por editorial y período (`periodo`: day, week,
+    month o year), opcionalmente entre `desde` y `hasta` y para una `editorial`.
+    """
+    period = request.GET.get('periodo', 'month')
+    if period not in history.PERIODS:
+        return JsonResponse({'error': f"periodo debe ser {', '.join(history.PERIODS)}"}, status=400)
+    try:
+        since, until, editorial = _history_filters(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({'periodo': period, 'totales': [
+        {**row, 'period': row['period'].isoformat()}
+        for row in history.totals(period, since, until, editorial)
+    ]})
+
+def history_runs(request):
+    """Corridas guardadas (las más nuevas primero), con los mismos filtros que history_totals."""
+    try:
+        since, until, editorial = _history_filters(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    runs = LiquidacionRun.objects.filter(finished_at__isnull=False)
+    if since:
+        runs = runs.filter(run_date__gte=since)
+    if until:
+        runs = runs.filter(run_date__lte=until)
+    if editorial:
+        runs = runs.filter(lines__editorial=editorial).distinct()
+    return JsonResponse({'corridas': [
+        {
+            'id':           run.pk,
+            'source':       run.source,
+            'run_date':     run.run_date.isoformat(),
+            'editorials':   run.editorials,
+            'lines':        run.line_count,
+            'download_url': reverse('consignaciones_atico:history_download', args=[run.pk]),
+        }
+        for run in runs[:200]
+    ]})
+
+def history_download(request, pk):
+    """
+    ZIP de una corrida del historial (o solo de `editorial`), renderizado de
+    nuevo desde sus líneas y contactos guardados: no necesita el maestro.
+    """
+    run    = get_object_or_404(LiquidacionRun, pk=pk, finished_at__isnull=False)
+    files  = render_liquidaciones(history.run_tables(run, request.GET.get('editorial')), load_logo_bytes(), run.contacts)
+    first  = next(files, None)
+    if first is None:
+        raise Http404("Esa corrida no tiene liquidaciones para esa editorial.")
+    resp = StreamingHttpResponse(
+        stream_zip(itertools.chain([first], files), *_compression(request)),
+        content_type='application/zip',
+    )
+    resp['Content-Disposition'] = f'attachment; filename=Liquidaciones_{run.run_date.isoformat()}.zip'
+    return resp
+
+@staff_member_required
+def prometheus_metrics(request):
+    """Tiempos por etapa y contadores de este proceso, en formato de Prometheus."""
+    return HttpResponse(metrics.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def job_download(request, pk):
+    """ZIP de un LiquidacionJob terminado."""
+    job = get_object_or_404(LiquidacionJob, pk=pk, status=LiquidacionJob.DONE)
+    if not job.result_path or not default_storage.exists(job.result_path):
+        raise Http404("El archivo de este job ya no existe.")
+    return FileResponse(
+        default_storage.open(job.result_path, 'rb'),
+        as_attachment=True,
+        filename='Liquidaciones.zip',
+        content_type='application/zip',
+    )
@@ -4,3 +4,7 @@ class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
     verbose_name = "Core"
+
+    def ready(self):
+        from . import portal  # noqa: F401  (conecta las señales que invalidan el portal)
+        from . import db      # noqa: F401  (pragmas de SQLite en cada conexión)
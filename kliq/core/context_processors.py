@@ -0,0 +1,16 @@
+# WEB/kliq/core/context_processors.py
+from .portal import user_applications, portal_version, CACHE_TIMEOUT
+
+
+def portal(request):
+    """
+    Menú de aplicaciones para base.html. Las plantillas llaman a los callables
+    recién al usarlos: si el fragmento {% cache %} del menú está vigente, no
+    se consulta la base de datos.
+    """
+    user = getattr(request, 'user', None)
+    return {
+        'portal_apps':          (lambda: user_applications(user)) if user is not None else [],
+        'portal_version':       portal_version,
+        'portal_cache_timeout': CACHE_TIMEOUT,
+    }
@@ -0,0 +1,44 @@
+# WEB/kliq/core/db.py
+"""
+Ajustes de SQLite para cada conexión nueva.
+
+Con varios workers de gunicorn sobre el mismo db.sqlite3, el modo por defecto
+(journal "delete", sincronizar el disco en cada commit) hace que una sola
+escritura, como guardar la sesión tras subir un maestro, bloquee también a
+los lectores. SQLITE_PRAGMAS se aplica al abrir cada conexión (señal
+connection_created, conectada en CoreConfig.ready):
+  - journal_mode=WAL: los lectores no esperan al que escribe; solo con
+    settings.SQLITE_WAL, porque queda guardado en el encabezado del archivo
+    y no debe cambiarlo cualquier manage.py sobre el db.sqlite3 del repo;
+  - synchronous=NORMAL: con WAL no se pierde consistencia, solo puede
+    perderse el último commit si se corta la luz;
+  - busy_timeout: milisegundos esperando el lock antes de "database is locked";
+  - mmap_size: lecturas desde el archivo mapeado en memoria.
+"""
+from django.conf                 import settings
+from django.db.backends.signals import connection_created
+from django.dispatch            import receiver
+
+DEFAULT_PRAGMAS = {
+    'synchronous':  'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size':    64 * 1024 * 1024,
+}
+
+
+def sqlite_pragmas():
+    """Pragmas a aplicar (se leen en cada conexión: override_settings funciona)."""
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', DEFAULT_PRAGMAS)
+    if getattr(settings, 'SQLITE_WAL', False):
+        # primero: synchronous=NORMAL solo es seguro ya en WAL
+        pragmas = {'journal_mode': 'WAL', **pragmas}
+    return pragmas
+
+
+@receiver(connection_created)
+def _tune_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in sqlite_pragmas().items():
+            cursor.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,62 @@
+# WEB/kliq/core/portal.py
+"""
+Aplicaciones que ve cada usuario en el portal (Application.users).
+
+user_applications() resuelve la lista con una sola consulta y la guarda en el
+caché de Django por usuario, bajo una versión global. Cualquier cambio en
+Application o en su relación users sube la versión (señales conectadas en
+CoreConfig.ready), así que ni la lista ni los fragmentos de plantilla que la
+usan ({% cache ... portal_version %}) quedan viejos.
+"""
+from django.conf                import settings
+from django.core.cache          import cache
+from django.db.models.signals   import post_save, post_delete, m2m_changed
+from django.dispatch            import receiver
+
+from .models import Application
+
+CACHE_KEY     = 'core:portal:apps:%s'
+VERSION_KEY   = 'core:portal:version'
+CACHE_TIMEOUT = getattr(settings, 'PORTAL_CACHE_TIMEOUT', 10 * 60)
+
+
+def portal_version():
+    return cache.get_or_set(VERSION_KEY, 1, timeout=None)
+
+
+def user_applications(user):
+    """[{name, slug, description, url}] de las aplicaciones permitidas a `user`, por nombre."""
+    if not user.is_authenticated:
+        return []
+    version = portal_version()
+    apps = cache.get(CACHE_KEY % user.pk, version=version)
+    if apps is None:
+        apps = list(
+            Application.objects
+            .filter(users=user)
+            .order_by('name')
+            .values('name', 'slug', 'description', 'url')
+        )
+        cache.set(CACHE_KEY % user.pk, apps, timeout=CACHE_TIMEOUT, version=version)
+    return apps
+
+
+def invalidate():
+    """Descarta las listas y fragmentos cacheados de todos los usuarios."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        # la clave expiró o el caché se reinició: cualquier versión nueva sirve
+        cache.set(VERSION_KEY, portal_version() + 1, timeout=None)
+
+
+@receiver(post_save, sender=Application)
+@receiver(post_delete, sender=Application)
+def _application_changed(sender, **kwargs):
+    invalidate()
+
+
+@receiver(m2m_changed, sender=Application.users.through)
+def _application_users_changed(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate()
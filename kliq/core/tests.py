@@ -1,3 +1,82 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache           import cache
+from django.db                   import connection
+from django.test                 import TestCase, override_settings
+from django.test.utils           import CaptureQueriesContext
 
-# Create your tests here.
+from .db     import sqlite_pragmas
+from .models import Application
+from .portal import user_applications
+
+
+class SqlitePragmaTests(TestCase):
+
+    @override_settings(SQLITE_WAL=False)
+    def test_wal_only_when_serving(self):
+        self.assertNotIn('journal_mode', sqlite_pragmas())
+
+    @override_settings(SQLITE_WAL=True)
+    def test_wal_goes_first(self):
+        self.assertEqual(next(iter(sqlite_pragmas().items())), ('journal_mode', 'WAL'))
+
+    def test_pragmas_applied_on_connect(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], sqlite_pragmas()['busy_timeout'])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class PortalCacheTests(TestCase):
+    """La lista de aplicaciones y los fragmentos {% cache %} del portal."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('ana', password='x')
+        self.app  = Application.objects.create(name='Consignaciones', slug='consignaciones',
+                                               url='/consignaciones-atico/')
+        self.app.users.add(self.user)
+        self.client.force_login(self.user)
+
+    def application_queries(self, path='/'):
+        with CaptureQueriesContext(connection) as ctx:
+            content = self.client.get(path).content.decode()
+        return content, [q['sql'] for q in ctx.captured_queries if 'core_application' in q['sql']]
+
+    def test_warm_cache_runs_no_application_query(self):
+        content, queries = self.application_queries()
+        self.assertEqual(content.count('Consignaciones'), 2)   # menú de base.html y lista de home.html
+        self.assertEqual(len(queries), 1)
+        content, queries = self.application_queries()
+        self.assertEqual(content.count('Consignaciones'), 2)
+        self.assertEqual(queries, [])
+        with self.assertNumQueries(0):
+            self.assertEqual([a['name'] for a in user_applications(self.user)], ['Consignaciones'])
+
+    def test_post_save_refreshes_the_fragments(self):
+        self.application_queries()
+        self.app.name = 'Liquidaciones'
+        self.app.save()
+        content, _ = self.application_queries()
+        self.assertEqual(content.count('Liquidaciones'), 2)
+        self.assertNotIn('Consignaciones', content)
+
+    def test_post_delete_refreshes_the_fragments(self):
+        self.application_queries()
+        self.app.delete()
+        content, _ = self.application_queries()
+        self.assertNotIn('Consignaciones', content)
+        self.assertIn('No tienes aplicaciones asignadas.', content)
+
+    def test_m2m_changes_refresh_the_fragments(self):
+        other = Application.objects.create(name='Inventario', slug='inventario', url='/inventario/')
+        self.application_queries()
+        for change, visible in (
+            (lambda: other.users.add(self.user),      {'Consignaciones', 'Inventario'}),
+            (lambda: self.app.users.remove(self.user), {'Inventario'}),
+            (lambda: other.users.clear(),              set()),
+            (lambda: self.user.applications.add(self.app), {'Consignaciones'}),
+        ):
+            change()
+            content, _ = self.application_queries()
+            self.assertEqual({n for n in ('Consignaciones', 'Inventario') if n in content}, visible)
+            self.assertEqual([a['name'] for a in user_applications(self.user)], sorted(visible))
@@ -12,5 +12,9 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'kliq.settings')
+# este proceso sirve peticiones: SQLite en modo WAL (core/db.py)
+os.environ.setdefault('SQLITE_WAL', '1')
+# vistas de consignaciones en versión async (consignaciones_atico/async_views.py)
+os.environ.setdefault('CONSIGNACIONES_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -64,6 +65,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'core.context_processors.portal',
             ],
         },
     },
@@ -79,9 +81,31 @@ DATABASES = {
     'default': {
         'ENGINE':   'django.db.backends.sqlite3',
         'NAME':     BASE_DIR / 'db.sqlite3',
+        # una conexión por worker que se reutiliza entre peticiones (y se
+        # revisa antes de usarla), en vez de abrir una nueva cada vez
+        'CONN_MAX_AGE':       600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # las transacciones toman el lock de escritura al empezar: si
+            # otro worker escribe, esperan busy_timeout en vez de fallar con
+            # "database is locked" al pasar de lectura a escritura
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# Pragmas de SQLite en cada conexión nueva (core.db): synchronous=NORMAL,
+# busy_timeout (ms) y mmap_size (bytes)
+SQLITE_PRAGMAS = {
+    'synchronous':  'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size':    64 * 1024 * 1024,
+}
+# journal_mode=WAL queda escrito en el archivo de la base, así que solo lo
+# activan los procesos que sirven peticiones (wsgi.py y asgi.py ponen
+# SQLITE_WAL=1); manage.py check, migrate o test no tocan db.sqlite3
+SQLITE_WAL = os.environ.get('SQLITE_WAL') == '1'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -132,6 +156,91 @@ LOGOUT_REDIRECT_URL = '/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-import os
 MEDIA_URL  = '/media/'
-MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
\ No newline at end of file
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Caché de Django en disco, compartido por todos los procesos de gunicorn: así
+# la invalidación por señales (portal, contactos) llega a todos
+CACHES = {
+    'default': {
+        'BACKEND':  'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+    },
+}
+# Portal (core.portal): lista de aplicaciones por usuario y fragmentos del menú
+PORTAL_CACHE_TIMEOUT = 10 * 60  # segundos
+# Sesiones: se leen del caché de arriba y se escriben también en la base
+# ("cached_db"), así la mayoría de las peticiones no consultan django_session
+SESSION_ENGINE      = 'django.contrib.sessions.backends.cached_db'
+SESSION_CACHE_ALIAS = 'default'
+
+# Consignaciones Ático: caché en disco del maestro parseado (MEDIA_ROOT/temp/cache)
+CONSIGNACIONES_MASTER_CACHE_MAX_ENTRIES = 20
+CONSIGNACIONES_MASTER_CACHE_TTL         = 24 * 60 * 60  # segundos
+
+# Procesos para renderizar liquidaciones en paralelo (0 o 1 = sin paralelismo)
+CONSIGNACIONES_RENDER_WORKERS = 0
+# Renderizador de liquidaciones: "write_only" (rápido) o "classic"
+CONSIGNACIONES_RENDER_BACKEND = 'write_only'
+# Motor para generar liquidaciones: "pandas" (maestro en DataFrame, con caché en
+# disco) o "streaming" (recorre el .xlsx una vez sin cargarlo; para maestros muy grandes)
+CONSIGNACIONES_ENGINE = 'pandas'
+# Liquidaciones ya renderizadas (MEDIA_ROOT/liquidaciones/cache): se borran tras
+# este tiempo sin uso o, sobre el tamaño máximo, las menos usadas
+CONSIGNACIONES_RENDER_CACHE_MAX_AGE   = 7 * 24 * 60 * 60    # segundos
+CONSIGNACIONES_RENDER_CACHE_MAX_BYTES = 200 * 1024 * 1024   # bytes
+# Membrete de la liquidación en .xlsx (ver manage.py plantilla_liquidacion); None = el de código
+CONSIGNACIONES_TEMPLATE_PATH = None
+# Generación en segundo plano (LiquidacionJob) y cantidad de hilos que la ejecutan
+CONSIGNACIONES_BACKGROUND_JOBS = True
+CONSIGNACIONES_JOB_WORKERS     = 1
+# Un job RUNNING sin avance en este tiempo vuelve a la cola (procesar_liquidaciones);
+# los terminados se borran, con su ZIP, tras JOB_MAX_AGE (limpiar_temp)
+CONSIGNACIONES_JOB_TIMEOUT     = 30 * 60               # segundos
+CONSIGNACIONES_JOB_MAX_AGE     = 7 * 24 * 60 * 60      # segundos
+# Maestros subidos (MEDIA_ROOT/temp): se borran tras este tiempo sin uso o, si
+# el directorio pasa del tamaño máximo, los menos usados (manage.py limpiar_temp)
+CONSIGNACIONES_UPLOAD_MAX_AGE        = 24 * 60 * 60          # segundos
+CONSIGNACIONES_UPLOAD_MAX_BYTES      = 500 * 1024 * 1024     # bytes
+CONSIGNACIONES_UPLOAD_SWEEP_INTERVAL = 5 * 60                # limpieza tras una subida, a lo más cada N segundos
+# API de liquidaciones: sobre este tamaño (suma de maestros) responde con jobs
+# en vez del ZIP, y procesos para varios maestros en una misma llamada
+CONSIGNACIONES_API_SYNC_MAX_BYTES = 20 * 1024 * 1024
+CONSIGNACIONES_API_WORKERS        = 4
+# ZIP de liquidaciones: "stored" (sin comprimir; los .xlsx ya vienen comprimidos),
+# "deflate" al nivel indicado o "parallel" (deflate en varios hilos).
+# Se puede cambiar por petición con el parámetro compression (y level)
+CONSIGNACIONES_ZIP_STRATEGY = 'stored'
+CONSIGNACIONES_ZIP_LEVEL    = 6
+CONSIGNACIONES_ZIP_THREADS  = 4
+# Vistas async (bajo ASGI; kliq/asgi.py define la variable de entorno) y hilos
+# por worker para leer maestros y renderizar sin bloquear el event loop
+CONSIGNACIONES_ASYNC_VIEWS   = os.environ.get('CONSIGNACIONES_ASYNC_VIEWS') == '1'
+CONSIGNACIONES_ASYNC_WORKERS = 4
+# Historial de liquidaciones (consignaciones_atico.history): guardar las líneas
+# de cada generación, de a tantas filas por INSERT. Las corridas que quedaron
+# a medias (el proceso murió) se borran tras UNFINISHED_AGE (limpiar_temp)
+CONSIGNACIONES_HISTORY                = True
+CONSIGNACIONES_HISTORY_BATCH_SIZE     = 2000
+CONSIGNACIONES_HISTORY_UNFINISHED_AGE = 24 * 60 * 60   # segundos
+
+# Subidas: sobre 1 MB el archivo se escribe a un temporal en disco en vez de
+# quedar en memoria (los maestros pesan decenas de MB)
+FILE_UPLOAD_MAX_MEMORY_SIZE = 1 * 1024 * 1024
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+# Resumen de cada generación de liquidaciones en consola (consignaciones_atico.metrics);
+# con DEBUG se ven además los tiempos por etapa
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'consignaciones_atico.metrics': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
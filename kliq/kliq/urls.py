@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.urls import path, include
 from core.views import home, register
 from core.views import debug_users
+from consignaciones_atico.views import prometheus_metrics
 
 urlpatterns = [
     path("debug-users/", debug_users),
@@ -15,4 +16,7 @@ urlpatterns = [
     path('accounts/register/', register, name='register'),
     
     path('consignaciones-atico/', include('consignaciones_atico.urls')),
+
+    # métricas de consignaciones (solo staff)
+    path('metrics/', prometheus_metrics, name='metrics'),
 ]
@@ -12,5 +12,7 @@ import os
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'kliq.settings')
+# este proceso sirve peticiones: SQLite en modo WAL (core/db.py)
+os.environ.setdefault('SQLITE_WAL', '1')
 
 application = get_wsgi_application()